@@ -0,0 +1,119 @@
+"""
+Benchmark de concorrência do SQLite: leitores (dashboard) x escritor (motor).
+
+Compara a engine padrão (journal DELETE, sem pragmas, uma sessão por operação)
+com `create_db_engine` (WAL + pragmas + pool + retry em "database is locked").
+
+Uso:
+    python benchmarks/db_concurrency.py --seconds 5 --readers 8 --writers 2
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('CI', '1')  # dispensa a validação de segredos do Settings
+
+from src.config.database import Base, create_db_engine, is_lock_error, retry_on_lock
+from src.models.schema import PublishedArticle
+
+
+def _baseline(url):
+    engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 0.5})
+    return sessionmaker(bind=engine), sessionmaker(bind=engine), False
+
+
+def _tuned(url):
+    writer = create_db_engine(url)
+    reader = create_db_engine(url, read_only=True)
+    return sessionmaker(bind=writer), sessionmaker(bind=reader), True
+
+
+def run(label, factory, seconds, readers, writers, rows_per_commit):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        WriteSession, ReadSession, retry = factory(url)
+        Base.metadata.create_all(WriteSession.kw['bind'])
+
+        stop = threading.Event()
+        counts = {'reads': 0, 'writes': 0, 'lock_errors': 0}
+        lock = threading.Lock()
+
+        def write_batch(worker, seq):
+            db = WriteSession()
+            try:
+                now = datetime.now()
+                db.add_all(PublishedArticle(hash=f"{label}-{worker}-{seq}-{i}", title=f"t{i}",
+                                            full_content="x" * 2000, source="bench", published_date=now)
+                           for i in range(rows_per_commit))
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        write = retry_on_lock(base_delay=0.01)(write_batch) if retry else write_batch
+
+        def writer(worker):
+            seq = 0
+            while not stop.is_set():
+                try:
+                    write(worker, seq)
+                    with lock: counts['writes'] += rows_per_commit
+                except OperationalError as e:
+                    if not is_lock_error(e): raise
+                    with lock: counts['lock_errors'] += 1
+                seq += 1
+
+        def reader():
+            while not stop.is_set():
+                db = ReadSession()
+                try:
+                    db.query(func.count(PublishedArticle.id)).scalar()
+                    db.query(PublishedArticle.title).order_by(PublishedArticle.id.desc()).limit(20).all()
+                    with lock: counts['reads'] += 1
+                except OperationalError as e:
+                    if not is_lock_error(e): raise
+                    with lock: counts['lock_errors'] += 1
+                finally:
+                    db.close()
+
+        threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+        threads += [threading.Thread(target=reader) for _ in range(readers)]
+        for t in threads: t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads: t.join()
+
+        WriteSession.kw['bind'].dispose()
+        ReadSession.kw['bind'].dispose()
+
+    print(f"{label:<9} leituras/s={counts['reads'] / seconds:>9.1f}  linhas gravadas/s={counts['writes'] / seconds:>9.1f}  "
+          f"erros de lock={counts['lock_errors']}")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--rows-per-commit', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"⏱️  {args.seconds:.0f}s, {args.readers} leitores, {args.writers} escritores")
+    run('baseline', _baseline, args.seconds, args.readers, args.writers, args.rows_per_commit)
+    run('tuned', _tuned, args.seconds, args.readers, args.writers, args.rows_per_commit)
+
+
+if __name__ == '__main__':
+    main()
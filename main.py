@@ -7,7 +7,12 @@ import os
 # Garante que o diretório raiz esteja no path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from src.config.database import init_db, get_db
+import threading
+
+from src.config.database import init_db
+from src.config.settings_cache import settings_cache
+from src.services.cache_manager import cache_manager
+from src.config.settings import settings
 from src.services.content_engine import ContentEngine
 
 # Configuração de Logs Robusta
@@ -29,6 +34,13 @@ def safe_run_cycle(engine):
         logger.error(f"❌ CRITICAL ERROR no Ciclo: {e}", exc_info=True)
         # Não mata o processo, apenas registra e aguarda o próximo agendamento
 
+def safe_poll_feeds(engine):
+    """Processa feeds RSS vencidos entre ciclos (agendamento adaptativo por feed)."""
+    try:
+        engine.run_feed_poll()
+    except Exception as e:
+        logger.error(f"❌ Erro no poll de feeds: {e}", exc_info=True)
+
 def main():
     print("🤖 CONTENT ROBOT v7.1 (Robust) STARTING...")
     
@@ -39,45 +51,48 @@ def main():
         return
 
     try:
+        boot_start = time.perf_counter()
         engine = ContentEngine()
+        # Clientes de API (Gemini, Imagen, YouTube) só são criados na primeira chamada
+        logger.info(f"⏱️ Motor pronto em {time.perf_counter() - boot_start:.2f}s")
         
         # Ciclo de Boot (Executa imediatamente)
         safe_run_cycle(engine)
         
         # Agendamento Inicial
-        from src.models.schema import SystemSettings
-        
         def get_cycle_interval():
-            try:
-                db = next(get_db())
-                s = db.query(SystemSettings).filter_by(key='cycle_interval').first()
-                return int(s.value) if s and s.value.isdigit() else 120
-            except:
-                return 120
+            interval = settings_cache.get_int('cycle_interval', 120)
+            return interval if interval > 0 else 120
+
+        # O watcher roda em outra thread; `schedule` não é thread-safe, então só sinaliza o loop
+        interval_changed = threading.Event()
+        settings_cache.subscribe(lambda key, old, new: interval_changed.set(), keys=['cycle_interval'])
+        settings_cache.start_watcher()
+        # Varredura periódica dos caches (TTL, orçamentos, órfãos) e gravação das métricas
+        cache_manager.start()
 
         current_interval = get_cycle_interval()
-        schedule.every(current_interval).minutes.do(safe_run_cycle, engine)
+        schedule.every(current_interval).minutes.do(safe_run_cycle, engine).tag('cycle')
+        schedule.every(settings.FEED_POLL_TICK_MINUTES).minutes.do(safe_poll_feeds, engine).tag('feeds')
         logger.info(f"✅ Motor iniciado. Ciclo: {current_interval} min. Aguardando agendamento...")
         
-        last_check = time.time()
-        
         while True:
             try:
                 schedule.run_pending()
                 
-                # Checa mudanças de config a cada 30s
-                if time.time() - last_check > 30:
+                if interval_changed.is_set():
+                    interval_changed.clear()
                     new_interval = get_cycle_interval()
                     if new_interval != current_interval:
                         logger.info(f"🔄 Atualizando ciclo: {current_interval} -> {new_interval} min")
-                        schedule.clear()
-                        schedule.every(new_interval).minutes.do(safe_run_cycle, engine)
+                        schedule.clear('cycle')
+                        schedule.every(new_interval).minutes.do(safe_run_cycle, engine).tag('cycle')
                         current_interval = new_interval
-                    last_check = time.time()
                     
                 time.sleep(1)
             except KeyboardInterrupt:
                 logger.info("🛑 Parada manual solicitada.")
+                engine.shutdown(wait=False)
                 break
             except Exception as e:
                 logger.error(f"❌ Erro no Loop Principal: {e}")
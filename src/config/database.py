@@ -1,22 +1,126 @@
 import os
-from sqlalchemy import create_engine
+import time
+import random
+import logging
+import functools
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-DB_PATH = os.path.join(BASE_DIR, "content_robot.db")
-DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}, echo=False)
+def resolve_database_url(uri: str) -> str:
+    """Caminhos SQLite relativos (ex.: `sqlite:///content_robot.db`) são resolvidos a partir da raiz do projeto."""
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:' \
+            and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(BASE_DIR, url.database))
+    return url.render_as_string(hide_password=False)
+
+DATABASE_URL = resolve_database_url(settings.DATABASE_URI)
+DB_PATH = make_url(DATABASE_URL).database if DATABASE_URL.startswith('sqlite') else None
+
+_SYNCHRONOUS_MODES = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+
+def _apply_sqlite_pragmas(dbapi_conn, read_only: bool = False):
+    """Pragmas por conexão: WAL deixa leitores (dashboard) e o escritor (motor) trabalharem ao mesmo tempo."""
+    synchronous = settings.SQLITE_SYNCHRONOUS if settings.SQLITE_SYNCHRONOUS in _SYNCHRONOUS_MODES else 'NORMAL'
+    cursor = dbapi_conn.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        if settings.SQLITE_WAL:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+def create_db_engine(url: str, read_only: bool = False, pool_size: int = None):
+    """
+    Engine com pool dimensionado por processo (motor e dashboard têm pools próprios).
+    SQLite: pragmas em cada conexão nova; `read_only` liga `query_only`.
+    Servidores (PostgreSQL/MySQL): pre-ping e reciclagem das conexões; no PostgreSQL
+    `read_only` abre as transações como READ ONLY.
+    """
+    pool_size = pool_size or settings.DB_POOL_SIZE
+    backend = make_url(url).get_backend_name()
+    kwargs = {}
+    if backend == 'sqlite':
+        kwargs['connect_args'] = {
+            "check_same_thread": False,
+            "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+        in_memory = make_url(url).database in (None, '', ':memory:')
+        if not in_memory:
+            kwargs.update(pool_size=pool_size, max_overflow=pool_size, pool_timeout=settings.DB_POOL_TIMEOUT)
+    else:
+        kwargs.update(pool_size=pool_size, max_overflow=pool_size, pool_timeout=settings.DB_POOL_TIMEOUT,
+                      pool_pre_ping=True, pool_recycle=settings.DB_POOL_RECYCLE)
+        if backend == 'postgresql' and read_only:
+            kwargs['connect_args'] = {"options": "-c default_transaction_read_only=on"}
+
+    db_engine = create_engine(url, echo=False, **kwargs)
+    if db_engine.dialect.name == 'sqlite':
+        event.listen(db_engine, 'connect', lambda conn, _record: _apply_sqlite_pragmas(conn, read_only))
+    return db_engine
+
+engine = create_db_engine(DATABASE_URL, pool_size=settings.DB_POOL_SIZE)
+read_engine = create_db_engine(DATABASE_URL, read_only=True, pool_size=settings.DB_READ_POOL_SIZE)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
+if settings.SQL_AUDIT:
+    from src.config.query_audit import QueryPlanAuditor
+    QueryPlanAuditor(log_findings=True).install()
+
 def get_db():
     return SessionLocal()
 
+def get_read_db():
+    """Sessão somente leitura (pool separado); use para consultas que não gravam."""
+    return ReadSessionLocal()
+
+def is_lock_error(exc: Exception) -> bool:
+    if not isinstance(exc, OperationalError):
+        return False
+    message = str(exc.orig if exc.orig is not None else exc).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+def retry_on_lock(func=None, *, retries: int = None, base_delay: float = 0.05, max_delay: float = 2.0):
+    """
+    Reexecuta a unidade de trabalho inteira quando o SQLite responde "database is locked"
+    (backoff exponencial com jitter). A função decorada deve abrir e fechar a própria sessão.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            attempts = settings.DB_LOCK_RETRIES if retries is None else retries
+            for attempt in range(attempts + 1):
+                try:
+                    return fn(*args, **kwargs)
+                except OperationalError as e:
+                    if attempt >= attempts or not is_lock_error(e):
+                        raise
+                    delay = min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.5)
+                    logger.warning(f"🔒 Banco ocupado em {fn.__name__}; nova tentativa em {delay:.2f}s ({attempt + 1}/{attempts})")
+                    time.sleep(delay)
+        return wrapper
+    return decorator(func) if func is not None else decorator
+
 def init_db():
+    """Cria as tabelas novas e aplica as migrações pendentes (ver src/models/migrations.py)."""
     try:
-        from src.models import schema
-        Base.metadata.create_all(bind=engine)
-        print(f"✅ Banco de dados inicializado: {DB_PATH}")
+        from src.models.migrations import run_migrations
+        applied = run_migrations(engine)
+        target = DB_PATH or engine.url.render_as_string(hide_password=True)
+        print(f"✅ Banco de dados inicializado: {target} ({len(applied)} migração(ões) aplicada(s))")
     except Exception as e:
-        print(f"❌ Erro ao inicializar DB: {e}")
\ No newline at end of file
+        print(f"❌ Erro ao inicializar DB: {e}")
@@ -0,0 +1,117 @@
+import re
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Tabelas que crescem sem limite em produção; um SCAN nelas é sempre suspeito,
+# mesmo que no banco de teste tenham poucas linhas.
+LARGE_TABLES: Set[str] = {
+    'published_articles', 'pending_articles', 'cached_content', 'youtube_cache',
+    'image_cache', 'api_usage_logs', 'threads', 'messages',
+}
+
+# Leituras em massa intencionais (carga de índices em memória) declaram
+# `.execution_options(full_scan_ok=True)` e não são reportadas.
+FULL_SCAN_OK = 'full_scan_ok'
+
+_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+_AUDITED_RE = re.compile(r'^\s*(SELECT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+
+@dataclass(frozen=True)
+class ScanFinding:
+    table: str
+    detail: str
+    statement: str
+
+    def __str__(self):
+        statement = ' '.join(self.statement.split())
+        return f"{self.table}: {self.detail}\n    {statement[:300]}"
+
+class QueryPlanAuditor:
+    """
+    Roda `EXPLAIN QUERY PLAN` (SQLite) para cada SELECT/UPDATE/DELETE emitido pelo
+    engine observado e registra varreduras completas de tabelas grandes.
+
+    Uso em testes:  `with QueryPlanAuditor() as audit: ...; assert not audit.findings`
+    Em produção, `SQL_AUDIT=True` instala um auditor no engine que só registra em log.
+    """
+
+    def __init__(self, target=Engine, large_tables: Optional[Iterable[str]] = None, log_findings: bool = False):
+        self.target = target
+        self.large_tables = set(large_tables) if large_tables is not None else set(LARGE_TABLES)
+        self.log_findings = log_findings
+        self.findings: List[ScanFinding] = []
+        self.queries = 0
+        self._seen: Set[str] = set()
+        self._lock = threading.Lock()
+        self._installed = False
+
+    # --- Ciclo de vida ------------------------------------------------------
+    def install(self):
+        if not self._installed:
+            event.listen(self.target, 'before_cursor_execute', self._before_execute)
+            self._installed = True
+        return self
+
+    def uninstall(self):
+        if self._installed:
+            event.remove(self.target, 'before_cursor_execute', self._before_execute)
+            self._installed = False
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+    def reset(self):
+        with self._lock:
+            self.findings = []
+            self.queries = 0
+
+    # --- Auditoria ----------------------------------------------------------
+    def explain(self, dbapi_connection, statement: str, parameters) -> List[str]:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+            # Linhas: (id, parent, notused, detail)
+            return [row[-1] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or conn.dialect.name != 'sqlite' or not _AUDITED_RE.match(statement):
+            return
+        if context is not None and context.execution_options.get(FULL_SCAN_OK):
+            return
+        try:
+            details = self.explain(cursor.connection, statement, parameters)
+        except Exception as e:
+            logger.debug(f"EXPLAIN falhou: {e}")
+            return
+
+        found = []
+        for detail in details:
+            match = _SCAN_RE.match(detail)
+            if match and match.group(1) in self.large_tables:
+                found.append(ScanFinding(match.group(1), detail, statement))
+
+        with self._lock:
+            self.queries += 1
+            for finding in found:
+                self.findings.append(finding)
+                if self.log_findings and finding.statement not in self._seen:
+                    self._seen.add(finding.statement)
+                    logger.warning(f"🐢 Full scan em tabela grande: {finding}")
+
+    def report(self) -> str:
+        if not self.findings:
+            return f"✅ {self.queries} consulta(s) auditada(s), nenhum full scan em tabela grande"
+        unique = list(dict.fromkeys(str(f) for f in self.findings))
+        return f"{len(unique)} consulta(s) com full scan em tabela grande:\n" + "\n".join(unique)
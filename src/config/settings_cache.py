@@ -0,0 +1,188 @@
+import time
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import update, cast, Integer, String
+
+from src.config.database import retry_on_lock
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = '_settings_version'
+
+Subscriber = Callable[[str, Optional[str], Optional[str]], None]
+
+class SettingsCache:
+    """
+    Cache em processo da tabela SystemSettings.
+
+    Todas as escritas passam por `set()`, que incrementa uma linha de versão
+    (`_settings_version`) na mesma transação. Os leitores só consultam essa linha
+    (no máximo a cada `check_interval` segundos) e recarregam a tabela inteira
+    quando ela muda; mudanças feitas por outro processo (dashboard -> motor)
+    chegam assim sem re-consultar cada chave. Assinantes recebem (chave, antigo, novo).
+    """
+
+    def __init__(self, session_factory: Optional[Callable] = None, check_interval: float = 5.0):
+        self._session_factory = session_factory
+        self.check_interval = check_interval
+        self._values: Dict[str, str] = {}
+        self._version: Optional[str] = None
+        self._loaded = False
+        self._last_check = 0.0
+        self._lock = threading.RLock()
+        self._subscribers: List[Tuple[Optional[Set[str]], Subscriber]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _session(self, read_only: bool = False):
+        if self._session_factory:
+            return self._session_factory()
+        from src.config.database import get_db, get_read_db
+        return get_read_db() if read_only else get_db()
+
+    # --- Sincronização ------------------------------------------------------
+    def refresh(self, force: bool = False) -> bool:
+        """Verifica a versão e recarrega se necessário. Retorna True se houve recarga."""
+        now = time.monotonic()
+        if not force and self._loaded and now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+
+        from src.models.schema import SystemSettings
+        db = self._session(read_only=True)
+        try:
+            version = db.query(SystemSettings.value).filter(SystemSettings.key == VERSION_KEY).scalar() or '0'
+            if self._loaded and version == self._version and not force:
+                return False
+            values = {s.key: s.value for s in db.query(SystemSettings).all()}
+        except Exception as e:
+            logger.debug(f"SettingsCache indisponível: {e}")
+            return False
+        finally:
+            db.close()
+
+        values.pop(VERSION_KEY, None)
+        self._apply(values, version)
+        return True
+
+    def _apply(self, values: Dict[str, str], version: str):
+        with self._lock:
+            old = self._values
+            changed = [k for k in set(old) | set(values) if old.get(k) != values.get(k)]
+            self._values = values
+            self._version = version
+            first_load = not self._loaded
+            self._loaded = True
+        if not first_load:
+            for key in changed:
+                self._notify(key, old.get(key), values.get(key))
+
+    def _notify(self, key: str, old: Optional[str], new: Optional[str]):
+        for keys, callback in list(self._subscribers):
+            if keys is None or key in keys:
+                try:
+                    callback(key, old, new)
+                except Exception as e:
+                    logger.error(f"Erro em assinante de configuração ({key}): {e}")
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+
+    # --- Leitura tipada -----------------------------------------------------
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        self.refresh()
+        value = self._values.get(key)
+        return default if value is None else value
+
+    def get_str(self, key: str, default: str = '') -> str:
+        value = self.get(key)
+        return value if value else default
+
+    def get_int(self, key: str, default: int = 0) -> int:
+        try:
+            return int(self.get(key))
+        except (TypeError, ValueError):
+            return default
+
+    def get_float(self, key: str, default: float = 0.0) -> float:
+        try:
+            return float(self.get(key))
+        except (TypeError, ValueError):
+            return default
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        value = self.get(key)
+        if value is None:
+            return default
+        return value.strip().lower() in ("true", "1", "yes", "on")
+
+    def snapshot(self) -> Dict[str, str]:
+        self.refresh()
+        return dict(self._values)
+
+    # --- Escrita ------------------------------------------------------------
+    def set(self, key: str, value) -> None:
+        """Grava a chave e incrementa a versão na mesma transação; notifica assinantes locais."""
+        value = None if value is None else str(value)
+        self.refresh()
+        version = self._write(key, value)
+
+        with self._lock:
+            values = dict(self._values)
+        values[key] = value
+        if self._loaded:
+            self._apply(values, version)
+        else:
+            self.refresh(force=True)
+
+    @retry_on_lock
+    def _write(self, key: str, value: Optional[str]) -> str:
+        from src.models.schema import SystemSettings
+        db = self._session()
+        try:
+            row = db.query(SystemSettings).filter(SystemSettings.key == key).first()
+            if row:
+                row.value = value
+            else:
+                db.add(SystemSettings(key=key, value=value))
+
+            bumped = db.execute(
+                update(SystemSettings)
+                .where(SystemSettings.key == VERSION_KEY)
+                .values(value=cast(cast(SystemSettings.value, Integer) + 1, String))
+            ).rowcount
+            if not bumped:
+                db.add(SystemSettings(key=VERSION_KEY, value='1', description='Versão do cache de configurações'))
+            db.commit()
+            version = db.query(SystemSettings.value).filter(SystemSettings.key == VERSION_KEY).scalar()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return version
+
+    # --- Assinaturas --------------------------------------------------------
+    def subscribe(self, callback: Subscriber, keys: Optional[Iterable[str]] = None) -> None:
+        self._subscribers.append((set(keys) if keys else None, callback))
+
+    def start_watcher(self, interval: Optional[float] = None) -> None:
+        """Thread que detecta mudanças de outros processos e dispara os assinantes."""
+        if self._watcher and self._watcher.is_alive():
+            return
+        interval = interval or self.check_interval
+        self._stop.clear()
+
+        def _watch():
+            while not self._stop.wait(interval):
+                self.refresh(force=False)
+
+        self._watcher = threading.Thread(target=_watch, name='settings-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+
+settings_cache = SettingsCache()
@@ -20,7 +20,8 @@ from flask_limiter.util import get_remote_address
 import hashlib
 from sqlalchemy import text
 
-from src.config.database import get_db, init_db
+from src.config.database import get_db, get_read_db, init_db
+from src.config.settings_cache import settings_cache
 from src.models.schema import (
     PublishedArticle, SystemSettings, RSSFeed,
     CachedContent, PendingArticle, Thread, Message
@@ -30,6 +31,10 @@ from src.services.validators import (
     InputValidator, SecurityFlags, validate_request_data
 )
 from src.services.deployment_service import DeploymentService
+from src.services.rate_limiter import rate_limiter
+from src.services.cache_manager import cache_manager
+from src.services.usage_tracker import usage_tracker
+from src.services.ai.router import MODES, POLICY_KEY, RoutingPolicy, model_router
 
 # ------------------------------------------------------------------------------
 # App & Security Setup
@@ -138,49 +143,104 @@ def toggle_provider():
     if provider not in provider_key_map:
         return jsonify({'success': False, 'error': 'Unknown provider'}), 400
 
-    db = get_db()
+    if enabled:
+        api_key = settings_cache.get(provider_key_map[provider])
+        if not api_key:
+            return jsonify({
+                'success': False,
+                'error': 'API key not configured',
+                'blocked': True
+            }), 403
+
+        valid, error = InputValidator.validate_api_key(api_key, provider)
+        if not valid:
+            return jsonify({
+                'success': False,
+                'error': error,
+                'blocked': True
+            }), 403
+
+    settings_cache.set(f'enable_{provider}', str(enabled).lower())
+    return jsonify({'success': True, 'provider': provider, 'enabled': enabled})
+
+
+@app.route('/api/ratelimits', methods=['GET'])
+def rate_limits():
+    """Saldo dos token buckets por serviço (estado compartilhado com o motor via banco)."""
     try:
-        if enabled:
-            key_setting = provider_key_map[provider]
-            setting = db.query(SystemSettings).filter(
-                SystemSettings.key == key_setting
-            ).first()
-
-            api_key = setting.value if setting else None
-            if not api_key:
-                return jsonify({
-                    'success': False,
-                    'error': 'API key not configured',
-                    'blocked': True
-                }), 403
-
-            valid, error = InputValidator.validate_api_key(api_key, provider)
-            if not valid:
-                return jsonify({
-                    'success': False,
-                    'error': error,
-                    'blocked': True
-                }), 403
-
-        state_key = f'enable_{provider}'
-        state = db.query(SystemSettings).filter(
-            SystemSettings.key == state_key
-        ).first()
-
-        if state:
-            state.value = str(enabled).lower()
-        else:
-            db.add(SystemSettings(key=state_key, value=str(enabled).lower()))
+        return jsonify({'success': True, 'services': rate_limiter.status()})
+    except Exception:
+        logger.exception("Rate limit status failed")
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
 
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit ratio, linhas e bytes de cada cache (métricas gravadas pelo motor)."""
+    try:
+        days = min(max(request.args.get('days', 7, type=int), 1), 90)
+        return jsonify({'success': True, 'days': days, 'caches': cache_manager.stats(days)})
+    except Exception:
+        logger.exception("Cache stats failed")
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+
+@app.route('/api/usage', methods=['GET'])
+def usage_report():
+    """Tokens e custo por dia/modelo, total do mês, estado do orçamento e custo por artigo publicado."""
+    try:
+        days = min(max(request.args.get('days', 30, type=int), 1), 366)
+        return jsonify({'success': True, **usage_tracker.report(days)})
+    except Exception:
+        logger.exception("Usage report failed")
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+
+def _review_pending(article_id, status, allowed, content=None):
+    """Muda o status de um PendingArticle da fila de aprovação; o motor publica os APPROVED no próximo ciclo."""
+    db = get_db()
+    try:
+        row = db.query(PendingArticle).filter(PendingArticle.id == article_id).first()
+        if row is None:
+            return jsonify({'success': False, 'error': 'Article not found'}), 404
+        if row.status not in allowed:
+            return jsonify({'success': False, 'error': f'Article is {row.status}'}), 409
+        if content is not None:
+            # Texto final revisado pelo editor no painel
+            data = json.loads(row.content_json or '{}')
+            data['conteudo_completo'] = content
+            row.content_json = json.dumps(data)
+        row.status = status
+        row.publish_attempts = 0
         db.commit()
-        return jsonify({'success': True, 'provider': provider, 'enabled': enabled})
+        return jsonify({'success': True, 'id': article_id, 'status': status})
+    except Exception:
+        db.rollback()
+        logger.exception("Review of pending article %s failed", article_id)
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
     finally:
         db.close()
 
 
+@app.route('/api/approve', methods=['POST'])
+@validate_request_data({'id': int})
+def approve_article():
+    content = request.json.get('content')
+    if content is not None and not isinstance(content, str):
+        return jsonify({'success': False, 'error': 'Invalid type for content: expected str'}), 400
+    # FAILED volta para a fila: o editor aprovou de novo depois de corrigir a causa
+    return _review_pending(request.json['id'], 'APPROVED', ('PENDING', 'FAILED'), content)
+
+
+@app.route('/api/reject', methods=['POST'])
+@validate_request_data({'id': int})
+def reject_article():
+    return _review_pending(request.json['id'], 'REJECTED', ('PENDING', 'APPROVED', 'FAILED'))
+
+
 @app.route('/api/history/<session_id>', methods=['GET'])
 def get_history_detail(session_id):
-    db = get_db()
+    db = get_read_db()
     try:
         thread = db.query(Thread).filter(Thread.session_id == session_id).first()
         if not thread:
@@ -217,34 +277,29 @@ def get_history_detail(session_id):
 
 @app.route('/api/model', methods=['GET', 'POST'])
 def model_config():
-    db = get_db()
     try:
         if request.method == 'POST':
             mode = request.json.get('mode', 'pro').lower()
-            if mode not in ['pro', 'flash']:
+            if mode not in MODES:
                 return jsonify({'success': False, 'error': 'Invalid mode'}), 400
 
-            setting = db.query(SystemSettings).filter_by(
-                key='ai_model_mode'
-            ).first()
-
-            if setting:
-                setting.value = mode
-            else:
-                db.add(SystemSettings(key='ai_model_mode', value=mode))
+            # Limiares do modo auto (opcional); o motor relê a política sem reiniciar
+            policy = request.json.get('policy')
+            if policy is not None:
+                try:
+                    RoutingPolicy.from_json(json.dumps(policy))
+                except (ValueError, TypeError) as e:
+                    return jsonify({'success': False, 'error': f'Invalid policy: {e}'}), 400
+                settings_cache.set(POLICY_KEY, json.dumps(policy))
 
-            db.commit()
+            settings_cache.set('ai_model_mode', mode)
             return jsonify({'success': True, 'mode': mode})
 
-        setting = db.query(SystemSettings).filter_by(
-            key='ai_model_mode'
-        ).first()
-        return jsonify({'success': True, 'mode': setting.value if setting else 'pro'})
+        return jsonify({'success': True, 'mode': settings_cache.get_str('ai_model_mode', 'pro'),
+                        'routing': model_router.status()})
     except Exception:
         logger.exception("Model configuration failed")
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
-    finally:
-        db.close()
 
 
 @app.route('/api/gemini/validate', methods=['POST'])
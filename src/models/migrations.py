@@ -0,0 +1,139 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+
+from src.config.database import Base
+from src.models import schema
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# MIGRAÇÕES VERSIONADAS DO SCHEMA
+# ==============================================================================
+# `create_all` só cria tabelas inexistentes; toda mudança em tabela existente
+# (coluna, índice) entra aqui como um passo numerado. Os passos são idempotentes
+# (verificam o catálogo antes de alterar) porque bancos novos já nascem com o
+# schema atual via `create_all`. A versão aplicada fica em `schema_migrations`.
+# ==============================================================================
+
+MIGRATIONS_TABLE = 'schema_migrations'
+_ADVISORY_LOCK_ID = 0x53314D30  # "S1M0" — serializa workers migrando ao mesmo tempo no PostgreSQL
+
+_metadata = MetaData()
+schema_migrations = Table(
+    MIGRATIONS_TABLE, _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(255)),
+    Column('applied_at', DateTime),
+)
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable  # upgrade(conn)
+
+def add_column(conn, model, column_name: str):
+    """ALTER TABLE ADD COLUMN a partir da definição da coluna no modelo (se ainda não existir)."""
+    table = model.__table__
+    existing = {c['name'] for c in inspect(conn).get_columns(table.name)}
+    if column_name in existing:
+        return
+    column = table.columns[column_name]
+    col_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+
+def create_index(conn, model, index_name: str):
+    """Cria um índice declarado no modelo (`index=True` ou `__table_args__`), se ainda não existir."""
+    table = model.__table__
+    existing = {i['name'] for i in inspect(conn).get_indexes(table.name)}
+    if index_name in existing:
+        return
+    index = next(i for i in table.indexes if i.name == index_name)
+    index.create(bind=conn)
+
+def _add_columns(model, *names):
+    def upgrade(conn):
+        for name in names:
+            add_column(conn, model, name)
+    return upgrade
+
+def _create_indexes(*indexes):
+    def upgrade(conn):
+        for model, name in indexes:
+            create_index(conn, model, name)
+    return upgrade
+
+def _steps(*upgrades):
+    def upgrade(conn):
+        for step in upgrades:
+            step(conn)
+    return upgrade
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, 'RSSFeed: validadores de GET condicional',
+              _add_columns(schema.RSSFeed, 'etag', 'last_modified', 'content_digest')),
+    Migration(2, 'RSSFeed: estado do agendamento adaptativo',
+              _add_columns(schema.RSSFeed, 'poll_interval', 'avg_update_interval', 'next_poll_at',
+                           'last_polled_at', 'last_success_at', 'last_entry_at',
+                           'consecutive_failures', 'total_polls', 'total_items')),
+    Migration(3, 'RateLimitLog: token bucket persistido',
+              _add_columns(schema.RateLimitLog, 'tokens', 'version')),
+    Migration(4, 'PublishedArticle: assinaturas MinHash',
+              _add_columns(schema.PublishedArticle, 'source_signature', 'content_sketch')),
+    Migration(5, 'Índices para os padrões de acesso (datas, fila de aprovação, histórico, TTL do cache)',
+              _create_indexes((schema.PublishedArticle, 'ix_published_articles_published_date'),
+                              (schema.PendingArticle, 'ix_pending_articles_status_created'),
+                              (schema.Message, 'ix_messages_thread_timestamp'),
+                              (schema.RSSFeed, 'ix_rss_feeds_active_next_poll'),
+                              (schema.CachedContent, 'ix_cached_content_expires_at'))),
+    Migration(6, 'Caches de imagem e YouTube: índice de expiração (TTL)',
+              _create_indexes((schema.YouTubeCache, 'ix_youtube_cache_expires_at'),
+                              (schema.ImageCache, 'ix_image_cache_expires_at'))),
+    Migration(7, 'CacheMetric: contadores do cache semântico',
+              _add_columns(schema.CacheMetric, 'semantic_hits', 'near_hits')),
+    Migration(8, 'APIUsageLog: tokens de entrada/saída, modelo e custo por dia',
+              _steps(_add_columns(schema.APIUsageLog, 'model', 'prompt_tokens', 'response_tokens', 'cost_usd'),
+                     _create_indexes((schema.APIUsageLog, 'ix_api_usage_logs_date_service_model')))),
+    Migration(9, 'PublishedArticle: imagem anexada pela fila de imagens',
+              _add_columns(schema.PublishedArticle, 'image_path')),
+    Migration(10, 'PublishedArticle: índice de image_path (imagens protegidas na varredura do cache)',
+              _create_indexes((schema.PublishedArticle, 'ix_published_articles_image_path'))),
+    Migration(11, 'PendingArticle: assinatura da fonte e tentativas de publicação',
+              _add_columns(schema.PendingArticle, 'source_signature', 'publish_attempts')),
+    Migration(12, 'PendingArticle: entrada do cache de artigos (cache semântico)',
+              _steps(_add_columns(schema.PendingArticle, 'content_hash'),
+                     _create_indexes((schema.PendingArticle, 'ix_pending_articles_content_hash')))),
+]
+
+def head() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+def current_version(engine) -> int:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(MIGRATIONS_TABLE):
+            return 0
+        return conn.execute(select(schema_migrations.c.version).order_by(
+            schema_migrations.c.version.desc()).limit(1)).scalar() or 0
+
+def run_migrations(engine) -> List[int]:
+    """Cria tabelas novas e aplica, numa única transação, as migrações ainda não registradas."""
+    applied = []
+    with engine.begin() as conn:
+        if conn.dialect.name == 'postgresql':
+            conn.execute(text(f"SELECT pg_advisory_xact_lock({_ADVISORY_LOCK_ID})"))
+        Base.metadata.create_all(bind=conn)
+        _metadata.create_all(bind=conn)
+
+        done = set(conn.execute(select(schema_migrations.c.version)).scalars())
+        for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+            if migration.version in done:
+                continue
+            migration.upgrade(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=migration.version, description=migration.description, applied_at=datetime.now()))
+            applied.append(migration.version)
+            logger.info(f"🗄️ Migração {migration.version} aplicada: {migration.description}")
+    return applied
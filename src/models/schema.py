@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, LargeBinary, Index
 from src.config.database import Base
 
 # ==============================================================================
@@ -21,6 +21,25 @@ class RSSFeed(Base):
     theme = Column(String(100), default="Geral")
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.now)
+    # GET condicional: validadores HTTP e digest do último corpo baixado
+    etag = Column(String(255), nullable=True)
+    last_modified = Column(String(100), nullable=True)
+    content_digest = Column(String(64), nullable=True)
+    # Agendamento adaptativo (FeedScheduler): intervalo aprendido e saúde do feed
+    poll_interval = Column(Integer, nullable=True)  # segundos
+    avg_update_interval = Column(Float, nullable=True)  # segundos entre entradas (EWMA)
+    next_poll_at = Column(DateTime, nullable=True)
+    last_polled_at = Column(DateTime, nullable=True)
+    last_success_at = Column(DateTime, nullable=True)
+    last_entry_at = Column(DateTime, nullable=True)
+    consecutive_failures = Column(Integer, default=0)
+    total_polls = Column(Integer, default=0)
+    total_items = Column(Integer, default=0)
+
+    __table_args__ = (
+        # Feeds ativos e o próximo a vencer no agendador
+        Index('ix_rss_feeds_active_next_poll', 'is_active', 'next_poll_at'),
+    )
 
 # ==============================================================================
 # CONTEÚDO E FLUXO
@@ -31,14 +50,20 @@ class PublishedArticle(Base):
     hash = Column(String(32), unique=True, index=True)
     url = Column(String(500))
     title = Column(String(500))
-    content_hash = Column(String(32), index=True)
+    content_hash = Column(String(32), index=True)  # CachedContent.content_hash do texto publicado
     content_snippet = Column(Text)
     full_content = Column(Text)
     source = Column(String(200))
-    published_date = Column(DateTime, default=datetime.now)
+    published_date = Column(DateTime, default=datetime.now, index=True)
     quality_score = Column(Float)
     originality_score = Column(Float)
     wordpress_url = Column(String(500))
+    # Anexada pela fila de imagens quando a geração termina depois da publicação
+    image_path = Column(String(500), nullable=True, index=True)
+    # Assinatura MinHash (uint32[]) do título + resumo da fonte, para o índice LSH de quase-duplicatas
+    source_signature = Column(LargeBinary, nullable=True)
+    # Esboço MinHash do conteúdo publicado, usado pelo OriginalityIndex (auto-plágio)
+    content_sketch = Column(LargeBinary, nullable=True)
 
 class PendingArticle(Base):
     __tablename__ = 'pending_articles'
@@ -50,7 +75,18 @@ class PendingArticle(Base):
     image_path = Column(String(500), nullable=True)
     video_url = Column(String(500), nullable=True)
     created_at = Column(DateTime, default=datetime.now)
-    status = Column(String(20), default='PENDING')
+    status = Column(String(20), default='PENDING')  # PENDING, APPROVED, REJECTED, PUBLISHED ou FAILED
+    # Mesma assinatura MinHash de PublishedArticle.source_signature, levada adiante na aprovação
+    source_signature = Column(LargeBinary, nullable=True)
+    # Tentativas de publicação que falharam; ao chegar em WP_MAX_PUBLISH_ATTEMPTS vira FAILED
+    publish_attempts = Column(Integer, default=0)
+    # Entrada do cache de artigos (CachedContent.content_hash) que gerou este texto
+    content_hash = Column(String(32), nullable=True, index=True)
+
+    __table_args__ = (
+        # Fila de aprovação: filtra por status, mais antigos primeiro
+        Index('ix_pending_articles_status_created', 'status', 'created_at'),
+    )
 
 # ==============================================================================
 # LOGS E CACHE
@@ -60,14 +96,26 @@ class RateLimitLog(Base):
     id = Column(Integer, primary_key=True)
     service = Column(String(50), index=True)
     last_request = Column(DateTime, default=datetime.now)
+    # Estado do token bucket compartilhado entre processos (main.py e dashboard)
+    tokens = Column(Float, nullable=True)
+    version = Column(Integer, nullable=True)  # controle otimista de concorrência
 
 class APIUsageLog(Base):
+    """Consumo diário por serviço e modelo (uma linha por dia; o mês é a soma dos dias)."""
     __tablename__ = 'api_usage_logs'
     id = Column(Integer, primary_key=True)
     service = Column(String(50))
     calls = Column(Integer, default=0)
     tokens_used = Column(Integer, default=0)
-    date = Column(DateTime, default=datetime.now)
+    date = Column(DateTime, default=datetime.now)  # dia (00:00)
+    model = Column(String(100))
+    prompt_tokens = Column(Integer, default=0)
+    response_tokens = Column(Integer, default=0)
+    cost_usd = Column(Float, default=0.0)
+
+    __table_args__ = (
+        Index('ix_api_usage_logs_date_service_model', 'date', 'service', 'model', unique=True),
+    )
 
 class CachedContent(Base):
     __tablename__ = 'cached_content'
@@ -81,7 +129,7 @@ class CachedContent(Base):
     hit_count = Column(Integer, default=0)
     last_hit = Column(DateTime)
     created_at = Column(DateTime, default=datetime.now)
-    expires_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
     is_valid = Column(Boolean, default=True)
 
 class YouTubeCache(Base):
@@ -94,7 +142,7 @@ class YouTubeCache(Base):
     hit_count = Column(Integer, default=0)
     last_hit = Column(DateTime)
     created_at = Column(DateTime, default=datetime.now)
-    expires_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
 
 class ImageCache(Base):
     __tablename__ = 'image_cache'
@@ -105,7 +153,24 @@ class ImageCache(Base):
     hit_count = Column(Integer, default=0)
     last_hit = Column(DateTime)
     created_at = Column(DateTime, default=datetime.now)
-    expires_at = Column(DateTime)
+    expires_at = Column(DateTime, index=True)
+
+class CacheMetric(Base):
+    """Contadores diários por cache (gravados pelo motor, lidos pelo dashboard)."""
+    __tablename__ = 'cache_metrics'
+    id = Column(Integer, primary_key=True)
+    cache_name = Column(String(50))
+    date = Column(DateTime)  # dia (00:00)
+    hits = Column(Integer, default=0)
+    misses = Column(Integer, default=0)
+    evictions = Column(Integer, default=0)
+    expired = Column(Integer, default=0)
+    semantic_hits = Column(Integer, default=0)  # mesma história já gerada: reaproveitada ou pulada (se já publicada/na fila)
+    near_hits = Column(Integer, default=0)  # similares, mas abaixo do limiar semântico
+
+    __table_args__ = (
+        Index('ix_cache_metrics_cache_date', 'cache_name', 'date', unique=True),
+    )
 
 # ==============================================================================
 # HISTÓRICO E SESSÕES (v8.2)
@@ -126,3 +191,8 @@ class Message(Base):
     content = Column(Text)
     tokens_count = Column(Integer, default=0)
     timestamp = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        # Histórico de uma sessão em ordem cronológica
+        Index('ix_messages_thread_timestamp', 'thread_id', 'timestamp'),
+    )
@@ -1,8 +1,9 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, List, Optional
 import hashlib
+import threading
 
 @dataclass
 class NewsItem:
@@ -12,11 +13,61 @@ class NewsItem:
     published_date: datetime
     summary: Optional[str] = ""
     author: Optional[str] = None
+    # Assinatura MinHash de título + resumo (preenchida pelo NearDuplicateDetector)
+    signature: Any = field(default=None, repr=False, compare=False)
     
     def get_hash(self) -> str:
         return hashlib.md5(self.url.encode('utf-8')).hexdigest()
 
+    def get_content_hash(self) -> str:
+        """Chave do artigo gerado no cache (CachedContent.content_hash): título + resumo da fonte."""
+        return hashlib.md5(f"{self.title}|{self.summary}".encode()).hexdigest()
+
+class FetchTicket:
+    """
+    Entrega de um fetch com prazo. Provedor e consumidor disputam o ticket:
+    - o provedor chama `commit()` antes de gravar seu estado (validadores, agendamento);
+      se ganhar, o consumidor espera os itens em vez de descartá-los;
+    - o consumidor chama `abandon()` quando o prazo estoura; se ganhar, o provedor
+      descarta o que baixou sem persistir nada e as fontes voltam a vencer.
+    Depois do commit, o consumidor espera só um tempo de tolerância: `expire()` e
+    `deliver()` decidem se os itens saem agora ou ficam com o provedor para o próximo fetch.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._outcome: Optional[str] = None
+
+    def _claim(self, outcome: str) -> bool:
+        with self._lock:
+            if self._outcome is None:
+                self._outcome = outcome
+            return self._outcome == outcome
+
+    def commit(self) -> bool:
+        return self._claim('committed')
+
+    def abandon(self) -> bool:
+        return self._claim('abandoned')
+
+    def _settle(self, outcome: str) -> bool:
+        with self._lock:
+            if self._outcome == 'committed':
+                self._outcome = outcome
+            return self._outcome == outcome
+
+    def deliver(self) -> bool:
+        """Provedor, depois do commit: True se o consumidor ainda espera os itens."""
+        return self._settle('delivered')
+
+    def expire(self) -> bool:
+        """Consumidor: desiste de esperar um provedor que já fez commit; False se os itens já saíram."""
+        return self._settle('expired')
+
 class BaseNewsProvider(ABC):
+    # True: `fetch` aceita `ticket=FetchTicket` e só persiste estado depois de `ticket.commit()`
+    cancellable = False
+
     @abstractmethod
     def fetch(self, limit: int = 5) -> List[NewsItem]:
         pass
@@ -27,4 +78,8 @@ class BaseNewsProvider(ABC):
         pass
     
     def validate_config(self) -> bool:
-        return True
\ No newline at end of file
+        return True
+
+    def close(self, wait: bool = True):
+        """Libera pools/conexões do provedor (chamado no encerramento do motor)."""
+        pass
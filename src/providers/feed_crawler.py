@@ -0,0 +1,243 @@
+import time
+import calendar
+import hashlib
+import logging
+import threading
+import feedparser
+import requests
+from requests.adapters import HTTPAdapter
+from collections import deque
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor, BrokenExecutor, FIRST_COMPLETED,
+                                as_completed, wait)
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "S1M0N-Publisher/1.0 (+feed crawler)"
+
+@dataclass
+class FeedRequest:
+    feed_id: int
+    url: str
+    # Validadores conhecidos do último download (GET condicional)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_digest: Optional[str] = None
+
+@dataclass
+class FeedResult:
+    feed_id: int
+    url: str
+    status: str = 'ok'  # ok, not_modified, error
+    entries: List[Dict] = field(default_factory=list)
+    entry_times: List[float] = field(default_factory=list)  # epoch de todas as entradas do feed
+    bozo: bool = False
+    latency: float = 0.0  # segundos de download
+    parse_time: float = 0.0
+    bytes: int = 0
+    error: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_digest: Optional[str] = None
+
+def _parse_feed(content: bytes, limit: int) -> Tuple[bool, List[Dict], List[float], float]:
+    """
+    Faz o parse fora da thread de download. Retorna apenas dicts simples
+    (serializáveis) para funcionar tanto em threads quanto em processos.
+    """
+    start = time.monotonic()
+    data = feedparser.parse(content)
+    entries = []
+    for entry in data.entries[:limit]:
+        published = entry.get('published_parsed')
+        entries.append({
+            'link': entry.get('link'),
+            'title': entry.get('title'),
+            'summary': entry.get('summary', '') or entry.get('description', ''),
+            'author': entry.get('author', 'Unknown'),
+            'published_parsed': tuple(published) if published else None,
+        })
+    entry_times = []
+    for entry in data.entries:
+        published = entry.get('published_parsed') or entry.get('updated_parsed')
+        if published:
+            entry_times.append(calendar.timegm(published))
+    return bool(data.bozo), entries, entry_times, time.monotonic() - start
+
+class FeedCrawler:
+    """
+    Motor de coleta paralela de feeds RSS.
+    - Downloads em pool de threads, agendados por host (fila por domínio, no máximo
+      `per_host_limit` em voo). O semáforo por host só limita crawls simultâneos.
+    - Uma requests.Session por host com keep-alive (conexões reaproveitadas entre ciclos).
+    - Parse em um pool de workers separado (threads ou processos).
+    Os dois pools são criados no primeiro crawl e reaproveitados até `close()`.
+    Corpos acima de `max_bytes` são abortados durante a leitura.
+    """
+
+    def __init__(self, max_workers: int = 32, per_host_limit: int = 4, parse_workers: int = 4,
+                 timeout: float = 15, use_processes: bool = False, max_bytes: int = 5 * 1024 * 1024):
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.parse_workers = max(1, parse_workers)
+        self.timeout = timeout
+        self.use_processes = use_processes
+        self.max_bytes = max(1, max_bytes)
+        self._sessions: Dict[str, requests.Session] = {}
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._downloads: Optional[ThreadPoolExecutor] = None
+        self._parsers = None
+        self._lock = threading.Lock()
+
+    def _pools(self):
+        with self._lock:
+            if self._downloads is None:
+                self._downloads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='rss-dl')
+            if self._parsers is None:
+                parse_pool_cls = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+                self._parsers = parse_pool_cls(max_workers=self.parse_workers)
+            return self._downloads, self._parsers
+
+    def _discard_parsers(self, parsers):
+        """Pool de parse quebrado (processo filho morreu): o próximo crawl cria outro."""
+        with self._lock:
+            if self._parsers is parsers:
+                self._parsers = None
+        parsers.shutdown(wait=False, cancel_futures=True)
+
+    def _host_state(self, host: str) -> Tuple[requests.Session, threading.BoundedSemaphore]:
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host_limit)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = USER_AGENT
+                self._sessions[host] = session
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._sessions[host], self._host_slots[host]
+
+    def _read_body(self, resp) -> bytes:
+        """Lê o corpo (já descomprimido) em pedaços e aborta acima de `max_bytes`."""
+        declared = resp.headers.get('Content-Length', '')
+        if declared.isdigit() and int(declared) > self.max_bytes:
+            raise ValueError(f"corpo de {int(declared)} bytes excede FEED_MAX_BYTES ({self.max_bytes})")
+        chunks, size = [], 0
+        for chunk in resp.iter_content(chunk_size=64 * 1024):
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise ValueError(f"corpo excede FEED_MAX_BYTES ({self.max_bytes})")
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def _download(self, req: FeedRequest) -> Tuple[FeedResult, Optional[bytes]]:
+        result = FeedResult(feed_id=req.feed_id, url=req.url, etag=req.etag,
+                            last_modified=req.last_modified, content_digest=req.content_digest)
+        headers = {}
+        if req.etag:
+            headers['If-None-Match'] = req.etag
+        if req.last_modified:
+            headers['If-Modified-Since'] = req.last_modified
+
+        session, slot = self._host_state(urlparse(req.url).netloc.lower())
+        # Dentro de um crawl o agendamento por host já respeita o limite; o semáforo só
+        # segura crawls simultâneos (ex.: um fetch abandonado pelo prazo ainda em curso)
+        with slot:
+            start = time.monotonic()
+            try:
+                with session.get(req.url, headers=headers, timeout=self.timeout, stream=True) as resp:
+                    if resp.status_code not in (200, 304):
+                        result.latency = time.monotonic() - start
+                        result.status = 'error'
+                        result.error = f"HTTP {resp.status_code}"
+                        return result, None
+                    # 304 e 200 podem trazer validadores novos; o próximo GET condicional usa os mais recentes
+                    result.etag = resp.headers.get('ETag') or req.etag
+                    result.last_modified = resp.headers.get('Last-Modified') or req.last_modified
+                    content = self._read_body(resp) if resp.status_code == 200 else b''
+                result.latency = time.monotonic() - start
+                result.bytes = len(content)
+                if resp.status_code == 304:
+                    result.status = 'not_modified'
+                    return result, None
+                # Servidores sem suporte a 304: o digest evita o parse de um corpo idêntico
+                digest = hashlib.sha256(content).hexdigest()
+                if digest == req.content_digest:
+                    result.status = 'not_modified'
+                    return result, None
+                result.content_digest = digest
+                return result, content
+            except Exception as e:
+                result.latency = time.monotonic() - start
+                result.status = 'error'
+                result.error = str(e)
+                return result, None
+
+    def crawl(self, feeds: List[FeedRequest], limit: int = 3) -> List[FeedResult]:
+        """
+        Baixa e interpreta todos os feeds em paralelo, na mesma ordem de `feeds`.
+        Feeds sem mudança (304 ou digest igual) voltam como 'not_modified', sem parse.
+        Cada host tem sua fila: no máximo `per_host_limit` downloads dele ficam no pool
+        e o próximo só é enviado quando um termina, então um host lento com muitos
+        feeds não prende os workers enquanto os outros hosts esperam.
+        """
+        if not feeds:
+            return []
+
+        results: List[Optional[FeedResult]] = [None] * len(feeds)
+        queues: Dict[str, deque] = {}
+        for i, req in enumerate(feeds):
+            queues.setdefault(urlparse(req.url).netloc.lower(), deque()).append(i)
+
+        downloads, parsers = self._pools()
+        dl_futures = {}
+
+        def submit_next(host):
+            idx = queues[host].popleft()
+            dl_futures[downloads.submit(self._download, feeds[idx])] = (idx, host)
+
+        # Rodízio entre hosts: os primeiros workers livres se espalham por todos eles
+        for _ in range(self.per_host_limit):
+            for host, queue in queues.items():
+                if queue:
+                    submit_next(host)
+
+        parse_futures = {}
+        pending = set(dl_futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                idx, host = dl_futures.pop(f)
+                result, content = f.result()
+                results[idx] = result
+                if content is not None:
+                    parse_futures[parsers.submit(_parse_feed, content, limit)] = idx
+                if queues[host]:
+                    submit_next(host)
+            pending = set(dl_futures)
+
+        for f in as_completed(parse_futures):
+            result = results[parse_futures[f]]
+            try:
+                result.bozo, result.entries, result.entry_times, result.parse_time = f.result()
+            except Exception as e:
+                result.status = 'error'
+                result.error = f"parse: {e}"
+                if isinstance(e, BrokenExecutor):
+                    self._discard_parsers(parsers)
+
+        return results
+
+    def close(self, wait: bool = True):
+        """Encerra os pools de download/parse e as sessões HTTP."""
+        with self._lock:
+            pools = [p for p in (self._downloads, self._parsers) if p is not None]
+            self._downloads = self._parsers = None
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._host_slots.clear()
+        for pool in pools:
+            pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,173 @@
+import heapq
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class FeedState:
+    feed_id: int
+    url: str
+    name: str
+    poll_interval: Optional[int] = None
+    avg_update_interval: Optional[float] = None
+    next_poll_at: Optional[datetime] = None
+    last_polled_at: Optional[datetime] = None
+    last_success_at: Optional[datetime] = None
+    last_entry_at: Optional[datetime] = None
+    consecutive_failures: int = 0
+    total_polls: int = 0
+    total_items: int = 0
+
+    @classmethod
+    def from_row(cls, row) -> 'FeedState':
+        return cls(
+            feed_id=row.id, url=row.url, name=row.name,
+            poll_interval=row.poll_interval, avg_update_interval=row.avg_update_interval,
+            next_poll_at=row.next_poll_at, last_polled_at=row.last_polled_at,
+            last_success_at=row.last_success_at, last_entry_at=row.last_entry_at,
+            consecutive_failures=row.consecutive_failures or 0,
+            total_polls=row.total_polls or 0, total_items=row.total_items or 0,
+        )
+
+class FeedScheduler:
+    """
+    Agendador adaptativo por feed.
+    - Aprende o intervalo médio entre entradas (EWMA) e faz polling na metade dele.
+    - Feeds sem novidades recuam gradualmente; feeds com erro recuam exponencialmente.
+    - O próximo vencimento de cada feed fica em uma fila de prioridade (heap).
+    O estado é persistido nas colunas de RSSFeed, então sobrevive a reinícios.
+    """
+    EWMA_ALPHA = 0.3
+    MAX_GAPS = 20
+
+    def __init__(self, min_interval: int = 300, max_interval: int = 86400, default_interval: int = 3600,
+                 failure_backoff: float = 2.0, idle_backoff: float = 1.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.failure_backoff = failure_backoff
+        self.idle_backoff = idle_backoff
+        self._states: Dict[int, FeedState] = {}
+        self._heap: List = []
+        self._lock = threading.Lock()
+        self.synced = False  # False até o primeiro sync: o heap ainda não reflete RSSFeed
+
+    def _clamp(self, seconds: float) -> int:
+        return int(min(self.max_interval, max(self.min_interval, seconds)))
+
+    def sync(self, rows) -> None:
+        """Recarrega os feeds ativos (o dashboard pode ter adicionado/removido feeds) e refaz o heap."""
+        with self._lock:
+            self._states = {row.id: FeedState.from_row(row) for row in rows}
+            self._heap = [(s.next_poll_at or datetime.min, s.feed_id) for s in self._states.values()]
+            heapq.heapify(self._heap)
+            self.synced = True
+
+    def pop_due(self, now: Optional[datetime] = None) -> List[FeedState]:
+        now = now or datetime.now()
+        due, seen = [], set()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, feed_id = heapq.heappop(self._heap)
+                # requeue após um sync pode deixar o mesmo feed duas vezes no heap
+                if feed_id in self._states and feed_id not in seen:
+                    seen.add(feed_id)
+                    due.append(self._states[feed_id])
+        return due
+
+    def requeue(self, feed_ids) -> None:
+        """Devolve ao heap feeds retirados por pop_due cujo poll foi descartado (sem record)."""
+        with self._lock:
+            for feed_id in feed_ids:
+                state = self._states.get(feed_id)
+                if state is not None:
+                    heapq.heappush(self._heap, (state.next_poll_at or datetime.min, feed_id))
+
+    def has_due(self, now: Optional[datetime] = None) -> bool:
+        next_due = self.next_due_at()
+        return next_due is not None and next_due <= (now or datetime.now())
+
+    def next_due_at(self) -> Optional[datetime]:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def record(self, state: FeedState, status: str, entry_times: List[float], now: Optional[datetime] = None) -> Dict:
+        """
+        Atualiza o estado após um poll e reagenda o feed.
+        status: 'ok', 'not_modified' ou 'error'. Retorna os campos a persistir em RSSFeed.
+        """
+        now = now or datetime.now()
+        state.total_polls += 1
+        state.last_polled_at = now
+        interval = state.poll_interval or self.default_interval
+
+        if status == 'error':
+            state.consecutive_failures += 1
+            delay = self._clamp(interval * self.failure_backoff ** state.consecutive_failures)
+        else:
+            state.consecutive_failures = 0
+            state.last_success_at = now
+            new_times = self._new_entries(state, entry_times)
+            state.total_items += len(new_times)
+            if new_times:
+                state.last_entry_at = datetime.fromtimestamp(max(new_times))
+                observed = self._mean_gap(entry_times)
+                if observed:
+                    prev = state.avg_update_interval
+                    state.avg_update_interval = observed if prev is None else (
+                        self.EWMA_ALPHA * observed + (1 - self.EWMA_ALPHA) * prev)
+                # Polling na metade do intervalo médio de publicação
+                interval = self._clamp((state.avg_update_interval or interval * 2) / 2)
+            else:
+                interval = self._clamp(interval * self.idle_backoff)
+            state.poll_interval = interval
+            delay = interval
+
+        state.next_poll_at = now + timedelta(seconds=delay)
+        with self._lock:
+            if state.feed_id in self._states:
+                heapq.heappush(self._heap, (state.next_poll_at, state.feed_id))
+
+        return {
+            'poll_interval': state.poll_interval,
+            'avg_update_interval': state.avg_update_interval,
+            'next_poll_at': state.next_poll_at,
+            'last_polled_at': state.last_polled_at,
+            'last_success_at': state.last_success_at,
+            'last_entry_at': state.last_entry_at,
+            'consecutive_failures': state.consecutive_failures,
+            'total_polls': state.total_polls,
+            'total_items': state.total_items,
+        }
+
+    def _new_entries(self, state: FeedState, entry_times: List[float]) -> List[float]:
+        if state.last_entry_at is None:
+            return list(entry_times)
+        cutoff = state.last_entry_at.timestamp()
+        return [t for t in entry_times if t > cutoff]
+
+    def _mean_gap(self, entry_times: List[float]) -> Optional[float]:
+        times = sorted(entry_times, reverse=True)[:self.MAX_GAPS + 1]
+        if len(times) < 2:
+            return None
+        span = times[0] - times[-1]
+        return span / (len(times) - 1) if span > 0 else None
+
+    def health(self) -> List[Dict]:
+        """Saúde por feed: último sucesso, falhas consecutivas e média de itens por poll."""
+        with self._lock:
+            states = list(self._states.values())
+        return [{
+            'feed_id': s.feed_id,
+            'name': s.name,
+            'url': s.url,
+            'last_success_at': s.last_success_at.isoformat() if s.last_success_at else None,
+            'consecutive_failures': s.consecutive_failures,
+            'mean_items_per_poll': round(s.total_items / s.total_polls, 2) if s.total_polls else 0.0,
+            'poll_interval': s.poll_interval or self.default_interval,
+            'next_poll_at': s.next_poll_at.isoformat() if s.next_poll_at else None,
+        } for s in states]
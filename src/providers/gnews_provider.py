@@ -4,6 +4,7 @@ from datetime import datetime
 from typing import List
 from src.providers.base_provider import BaseNewsProvider, NewsItem
 from src.config.settings import settings
+from src.services.rate_limiter import rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,8 @@ class GNewsProvider(BaseNewsProvider):
         if not settings.get_bool('enable_gnews', False): return []
         api_key = settings.get('gnews_api_key')
         if not api_key: return []
+        # Cota diária compartilhada: sem capacidade, este ciclo pula o provedor em vez de bloquear
+        if rate_limiter.try_acquire('gnews') > 0: return []
 
         try:
             resp = requests.get(self.BASE_URL, params={'token': api_key, 'lang': 'pt', 'country': 'br', 'max': limit}, timeout=10)
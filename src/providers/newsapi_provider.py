@@ -4,6 +4,7 @@ from datetime import datetime
 from typing import List
 from src.providers.base_provider import BaseNewsProvider, NewsItem
 from src.config.settings import settings
+from src.services.rate_limiter import rate_limiter
 
 class NewsAPIProvider(BaseNewsProvider):
     BASE_URL = "https://newsapi.org/v2/top-headlines"
@@ -15,6 +16,8 @@ class NewsAPIProvider(BaseNewsProvider):
         if not settings.get_bool('enable_newsapi', False): return []
         api_key = settings.get('newsapi_key')
         if not api_key: return []
+        # Cota diária compartilhada: sem capacidade, este ciclo pula o provedor em vez de bloquear
+        if rate_limiter.try_acquire('newsapi') > 0: return []
 
         try:
             resp = requests.get(self.BASE_URL, params={'apiKey': api_key, 'country': 'br', 'pageSize': limit}, timeout=10)
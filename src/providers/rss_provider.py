@@ -1,42 +1,166 @@
 import logging
-import feedparser
+import threading
 from datetime import datetime
 from time import mktime
-from typing import List
-from src.providers.base_provider import BaseNewsProvider, NewsItem
-from src.config.database import get_db
+from typing import List, Dict, Optional
+from src.providers.base_provider import BaseNewsProvider, FetchTicket, NewsItem
+from src.providers.feed_crawler import FeedCrawler, FeedRequest
+from src.providers.feed_scheduler import FeedScheduler
+from src.config.database import get_db, get_read_db, retry_on_lock
+from src.config.settings import settings
 from src.models.schema import RSSFeed
 
 logger = logging.getLogger(__name__)
 
 class RSSProvider(BaseNewsProvider):
+    cancellable = True
+
+    def __init__(self):
+        self.crawler = FeedCrawler(
+            max_workers=settings.RSS_CRAWLER_WORKERS,
+            per_host_limit=settings.RSS_PER_HOST_LIMIT,
+            parse_workers=settings.RSS_PARSE_WORKERS,
+            timeout=settings.RSS_FETCH_TIMEOUT,
+            use_processes=settings.RSS_PARSE_IN_PROCESSES,
+            max_bytes=settings.FEED_MAX_BYTES,
+        )
+        self.scheduler = FeedScheduler(
+            min_interval=settings.FEED_MIN_POLL_INTERVAL,
+            max_interval=settings.FEED_MAX_POLL_INTERVAL,
+            default_interval=settings.FEED_DEFAULT_POLL_INTERVAL,
+            failure_backoff=settings.FEED_FAILURE_BACKOFF,
+            idle_backoff=settings.FEED_IDLE_BACKOFF,
+        )
+        self.last_crawl_stats: List[Dict] = []
+        # Itens de um fetch que o NewsService parou de esperar depois do commit (ver FetchTicket)
+        self._carried: List[NewsItem] = []
+        self._carried_lock = threading.Lock()
+
     @property
     def provider_name(self) -> str: return 'rss'
 
-    def fetch(self, limit: int = 3) -> List[NewsItem]:
-        news_items = []
-        db = get_db()
+    def fetch(self, limit: int = 3, ticket: Optional[FetchTicket] = None) -> List[NewsItem]:
+        db = get_read_db()
         try:
-            active_feeds = db.query(RSSFeed).filter(RSSFeed.is_active == True).all()
-            for feed_record in active_feeds:
+            active_feeds = self._sync(db)
+            rows = {f.id: f for f in active_feeds}
+            # Apenas os feeds vencidos no agendador adaptativo são baixados neste ciclo
+            due = self.scheduler.pop_due()
+            feeds = [(state.url, state.name) for state in due]
+            feed_requests = [FeedRequest(feed_id=state.feed_id, url=state.url, etag=rows[state.feed_id].etag,
+                                         last_modified=rows[state.feed_id].last_modified,
+                                         content_digest=rows[state.feed_id].content_digest) for state in due]
+        finally:
+            db.close()
+
+        results = self.crawler.crawl(feed_requests, limit=limit)
+        if ticket is not None and not ticket.commit():
+            # O NewsService já descartou este fetch pelo prazo: sem gravar ETag/digest/agendamento,
+            # o próximo ciclo baixa os mesmos feeds de novo e as notícias não se perdem
+            self.scheduler.requeue([state.feed_id for state in due])
+            logger.warning(f"⏱️ RSS: {len(due)} feeds baixados após o prazo; estado não gravado")
+            return []
+        self._save_state(due, results)
+
+        news_items = []
+        self.last_crawl_stats = []
+        for (url, name), result in zip(feeds, results):
+            self.last_crawl_stats.append({
+                'feed_id': result.feed_id, 'url': url, 'status': result.status,
+                'latency': round(result.latency, 3), 'parse_time': round(result.parse_time, 3),
+                'bytes': result.bytes, 'entries': len(result.entries), 'error': result.error,
+            })
+            if result.status == 'not_modified': continue
+            if result.status != 'ok':
+                logger.error(f"Erro no feed {url}: {result.error}")
+                continue
+            if result.bozo and not result.entries: continue
+            for entry in result.entries:
+                if not entry.get('link') or not entry.get('title'): continue
                 try:
-                    feed_data = feedparser.parse(feed_record.url)
-                    if feed_data.bozo and not feed_data.entries: continue
-                    for entry in feed_data.entries[:limit]:
-                        pub_date = datetime.now()
-                        if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                            pub_date = datetime.fromtimestamp(mktime(entry.published_parsed))
-                        
-                        news_items.append(NewsItem(
-                            url=entry.link,
-                            title=entry.title,
-                            source_name=f"{feed_record.name} (RSS)",
-                            published_date=pub_date,
-                            summary=entry.get('summary', '') or entry.get('description', ''),
-                            author=entry.get('author', 'Unknown')
-                        ))
+                    pub_date = datetime.now()
+                    if entry.get('published_parsed'):
+                        pub_date = datetime.fromtimestamp(mktime(entry['published_parsed']))
+
+                    news_items.append(NewsItem(
+                        url=entry['link'],
+                        title=entry['title'],
+                        source_name=f"{name} (RSS)",
+                        published_date=pub_date,
+                        summary=entry.get('summary', ''),
+                        author=entry.get('author', 'Unknown')
+                    ))
                 except Exception as e:
-                    logger.error(f"Erro no feed {feed_record.url}: {e}")
+                    logger.error(f"Erro no feed {url}: {e}")
+
+        if self.last_crawl_stats:
+            total_bytes = sum(s['bytes'] for s in self.last_crawl_stats)
+            slowest = max(s['latency'] for s in self.last_crawl_stats)
+            unchanged = sum(1 for s in self.last_crawl_stats if s['status'] == 'not_modified')
+            logger.info(f"📡 RSS: {len(feeds)} feeds ({unchanged} sem mudança), {total_bytes / 1024:.0f} KB, feed mais lento {slowest:.2f}s")
+        if ticket is not None and not ticket.deliver():
+            # Estado já gravado: sem estes itens o próximo GET condicional viria 304 e as notícias se perderiam
+            with self._carried_lock:
+                self._carried.extend(news_items)
+            logger.warning(f"⏱️ RSS: {len(news_items)} itens chegaram após a espera; seguem no próximo ciclo")
+            return []
+        with self._carried_lock:
+            carried, self._carried = self._carried, []
+        return carried + news_items
+
+    def _save_state(self, states, results):
+        """
+        Reagenda cada feed e persiste o estado do agendador. ETag/Last-Modified/digest
+        são gravados para feeds baixados com sucesso, inclusive os sem mudança: um 200
+        com o mesmo digest (ou um 304) pode trazer validadores novos.
+        """
+        if not results: return
+        updates = []
+        for state, r in zip(states, results):
+            values = self.scheduler.record(state, r.status, r.entry_times)
+            if r.status != 'error':
+                values.update(etag=r.etag, last_modified=r.last_modified, content_digest=r.content_digest)
+            updates.append((r.feed_id, values))
+        try:
+            self._write_state(updates)
+        except Exception as e:
+            logger.error(f"Erro ao salvar estado dos feeds RSS: {e}")
+
+    @staticmethod
+    @retry_on_lock
+    def _write_state(updates):
+        db = get_db()
+        try:
+            for feed_id, values in updates:
+                db.query(RSSFeed).filter(RSSFeed.id == feed_id).update(
+                    {getattr(RSSFeed, k): v for k, v in values.items()}, synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
         finally:
             db.close()
-        return news_items
\ No newline at end of file
+
+    def _sync(self, db) -> List[RSSFeed]:
+        active_feeds = db.query(RSSFeed).filter(RSSFeed.is_active == True).all()
+        self.scheduler.sync(active_feeds)
+        return active_feeds
+
+    def close(self, wait: bool = True):
+        self.crawler.close(wait=wait)
+
+    def has_due_feeds(self) -> bool:
+        if not self.scheduler.synced:
+            # Após um reinício o heap está vazio: carrega os vencimentos persistidos em RSSFeed
+            db = get_read_db()
+            try:
+                self._sync(db)
+            except Exception as e:
+                logger.error(f"Erro ao carregar o agendamento dos feeds RSS: {e}")
+                return False
+            finally:
+                db.close()
+        return self.scheduler.has_due()
+
+    def feed_health(self) -> List[Dict]:
+        return self.scheduler.health()
@@ -1,60 +1,100 @@
 import google.generativeai as genai
+import asyncio
 import logging
 from .interfaces import ModelClient
+from .tokens import token_estimator
+from src.services.rate_limiter import rate_limiter
+from src.services.usage_tracker import usage_from_response, usage_tracker
 
 logger = logging.getLogger(__name__)
 
-class GeminiProClient(ModelClient):
+class _GeminiClient(ModelClient):
+    """Chamadas comuns ao Gemini: rate limit, streaming/async e registro de uso (tokens da resposta)."""
+    model_name = ''
+    label = 'Gemini'
+
     def __init__(self, api_key):
         if not api_key:
-            raise ValueError("API Key is required for Gemini Pro")
+            raise ValueError(f"API Key is required for {self.label}")
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.model = genai.GenerativeModel(self.model_name)
+
+    def _fit(self, prompt: str) -> str:
+        return prompt
+
+    def _record(self, response, prompt: str):
+        # usage_metadata vem na própria resposta: nenhuma chamada extra de count_tokens
+        prompt_tokens, response_tokens = usage_from_response(response)
+        usage_tracker.record('gemini', self.model_name, prompt_tokens, response_tokens)
+        # Cada contagem real recalibra o estimador local
+        token_estimator.observe(prompt, prompt_tokens)
 
     def generate(self, prompt: str) -> str:
         try:
+            prompt = self._fit(prompt)
+            rate_limiter.acquire('gemini')
             response = self.model.generate_content(prompt)
+            self._record(response, prompt)
             return response.text
         except Exception as e:
-            logger.error(f"Gemini Pro Generation Error: {e}")
+            logger.error(f"{self.label} Generation Error: {e}")
             raise
 
-    def count_tokens(self, text: str) -> int:
+    def stream(self, prompt: str):
+        last = None
         try:
-            return self.model.count_tokens(text).total_tokens
-        except:
-            return len(text) // 4 # Fallback
-
-class GeminiFlashClient(ModelClient):
-    def __init__(self, api_key):
-        if not api_key:
-            raise ValueError("API Key is required for Gemini Flash")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
-        self.token_limit = 8000 # Configurable limit for Flash context
+            prompt = self._fit(prompt)
+            rate_limiter.acquire('gemini')
+            for chunk in self.model.generate_content(prompt, stream=True):
+                last = chunk
+                yield chunk.text
+        except Exception as e:
+            logger.error(f"{self.label} Generation Error: {e}")
+            raise
+        finally:
+            # Também ao abandonar o stream: o último pedaço traz o uso acumulado até ali
+            if last is not None:
+                self._record(last, prompt)
 
-    def generate(self, prompt: str) -> str:
+    async def agenerate(self, prompt: str) -> str:
         try:
-            # Token Count & Truncation Logic
-            current_tokens = self.count_tokens(prompt)
-            
-            if current_tokens > self.token_limit:
-                logger.warning(f"⚠️ Prompt exceeds Flash limit ({current_tokens}/{self.token_limit}). Truncating.")
-                # Simple truncation strategy: keep beginning and instructions, truncate middle? 
-                # Or just safe cut. For stability, we cut the end but keep instructions if possible.
-                # Assuming prompt structure is Instructions + Content.
-                # Heuristic: Cut to size based on chars (~4 chars per token)
-                max_chars = self.token_limit * 4
-                prompt = prompt[:max_chars] + "\n[...TRUNCATED FOR FLASH LIMIT...]"
-            
-            response = self.model.generate_content(prompt)
+            prompt = self._fit(prompt)
+            # O rate limiter é bloqueante: fora do event loop
+            await asyncio.to_thread(rate_limiter.acquire, 'gemini')
+            response = await self.model.generate_content_async(prompt)
+            self._record(response, prompt)
             return response.text
         except Exception as e:
-            logger.error(f"Gemini Flash Generation Error: {e}")
+            logger.error(f"{self.label} Generation Error: {e}")
             raise
 
+    def estimate_tokens(self, text: str) -> int:
+        """Estimativa local calibrada (ver TokenEstimator), sem ida ao servidor."""
+        return token_estimator.estimate(text)
+
     def count_tokens(self, text: str) -> int:
         try:
             return self.model.count_tokens(text).total_tokens
         except:
-            return len(text) // 4
+            return self.estimate_tokens(text) # Fallback
+
+class GeminiProClient(_GeminiClient):
+    model_name = 'gemini-pro'
+    label = 'Gemini Pro'
+
+class GeminiFlashClient(_GeminiClient):
+    model_name = 'gemini-1.5-flash'
+    label = 'Gemini Flash'
+
+    def __init__(self, api_key):
+        super().__init__(api_key)
+        self.token_limit = 8000 # Configurable limit for Flash context
+
+    def _fit(self, prompt: str) -> str:
+        # Token Count & Truncation Logic: estimativa local (sem RPC) e corte só no conteúdo da fonte,
+        # preservando instruções e o schema JSON
+        fitted, truncated = token_estimator.fit_prompt(prompt, self.token_limit)
+        if truncated:
+            logger.warning(f"⚠️ Prompt exceeds Flash limit (~{token_estimator.upper_bound(prompt)}/{self.token_limit}). "
+                           f"Truncated to ~{token_estimator.upper_bound(fitted)}.")
+        return fitted
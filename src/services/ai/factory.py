@@ -4,23 +4,13 @@ from .interfaces import ModelClient
 
 class ModelFactory:
     @staticmethod
-    def create_client() -> ModelClient:
-        key = settings.GOOGLE_API_KEY
-        
-        # 1. Try DB setting (Dynamic)
-        from src.config.database import get_db
-        from src.models.schema import SystemSettings
-        
-        mode = settings.AI_MODEL_TYPE # Default env
-        db = get_db()
-        try:
-            s = db.query(SystemSettings).filter_by(key='ai_model_mode').first()
-            if s and s.value:
-                mode = s.value
-        except Exception:
-            pass
-        finally:
-            db.close()
+    def create_client(mode: str = None) -> ModelClient:
+        # 1. Try DB setting (Dynamic, via settings cache), unless a mode is forced
+        from src.config.settings_cache import settings_cache
+
+        key = settings_cache.get_str('google_api_key', settings.GOOGLE_API_KEY)
+
+        mode = mode or settings_cache.get_str('ai_model_mode', settings.AI_MODEL_TYPE) # Default env
         
         if mode == 'flash':
             return GeminiFlashClient(key)
@@ -0,0 +1,79 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Iterable, Optional, Union
+
+from .interfaces import ModelClient
+
+class FakeAPIError(Exception):
+    """Erro de API simulado; `code` segue o status HTTP, como em google.api_core."""
+
+    def __init__(self, code: int, message: str = ''):
+        super().__init__(message or f"HTTP {code}")
+        self.code = code
+
+class FakeModelClient(ModelClient):
+    """
+    Cliente offline para testes e benchmarks de vazão: latência simulada (com jitter),
+    falhas injetadas e contadores de chamadas/concorrência. Nenhuma rede envolvida.
+
+    `errors` é consumido em ordem, um item por chamada (None = chamada normal);
+    depois dele, `error_rate` sorteia 429s com a semente dada.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0,
+                 response: Union[str, Callable[[str], str]] = '{"titulo": "fake"}',
+                 errors: Optional[Iterable[Optional[BaseException]]] = None,
+                 error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.response = response
+        self.errors = deque(errors or [])
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _begin(self) -> float:
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            error = self.errors.popleft() if self.errors else None
+            if error is None and self.error_rate and self._rng.random() < self.error_rate:
+                error = FakeAPIError(429, 'Resource has been exhausted')
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if error is not None:
+            self._end()
+            raise error
+        return delay
+
+    def _end(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _respond(self, prompt: str) -> str:
+        return self.response(prompt) if callable(self.response) else self.response
+
+    def generate(self, prompt: str) -> str:
+        delay = self._begin()
+        try:
+            time.sleep(delay)
+            return self._respond(prompt)
+        finally:
+            self._end()
+
+    async def agenerate(self, prompt: str) -> str:
+        delay = self._begin()
+        try:
+            await asyncio.sleep(delay)
+            return self._respond(prompt)
+        finally:
+            self._end()
+
+    def count_tokens(self, text: str) -> int:
+        return len(text) // 4
@@ -1,6 +1,34 @@
+import random
+import asyncio
+import logging
 from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional, Sequence, Union
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 408/429/5xx e timeouts são transitórios; 400/401/403/404 não melhoram com nova tentativa
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+def is_retryable(exc: BaseException) -> bool:
+    """Classifica erros de API (google.api_core usa `.code` com o status HTTP)."""
+    # No Python 3.10 asyncio.TimeoutError (de wait_for) não é subclasse do TimeoutError embutido
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)):
+        return True
+    code = getattr(exc, 'code', None)
+    if not isinstance(code, int):
+        code = getattr(exc, 'status_code', None)
+    return isinstance(code, int) and code in RETRYABLE_STATUS
 
 class ModelClient(ABC):
+    # Padrões do lote assíncrono (sobrescrevíveis por instância)
+    max_concurrency: int = settings.AI_CONCURRENCY
+    request_timeout: float = settings.AI_REQUEST_TIMEOUT
+    max_retries: int = settings.AI_MAX_RETRIES
+    retry_base_delay: float = 1.0
+    retry_max_delay: float = 30.0
+
     @abstractmethod
     def generate(self, prompt: str) -> str:
         """Gera conteúdo a partir do prompt."""
@@ -10,3 +38,56 @@ class ModelClient(ABC):
     def count_tokens(self, text: str) -> int:
         """Conta tokens no texto."""
         pass
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Entrega a resposta em pedaços, à medida que chega. O padrão entrega a resposta
+        inteira de uma vez; quem para de iterar abandona o restante da geração.
+        """
+        yield self.generate(prompt)
+
+    async def agenerate(self, prompt: str) -> str:
+        """
+        Versão assíncrona de `generate`. O padrão roda a chamada bloqueante numa
+        thread; clientes com API assíncrona nativa sobrescrevem.
+        """
+        return await asyncio.to_thread(self.generate, prompt)
+
+    async def agenerate_retrying(self, prompt: str, timeout: Optional[float] = None,
+                                 retries: Optional[int] = None) -> str:
+        """`agenerate` com timeout por tentativa e backoff exponencial com jitter em erros transitórios."""
+        timeout = self.request_timeout if timeout is None else timeout
+        retries = self.max_retries if retries is None else retries
+        attempt = 0
+        while True:
+            try:
+                return await asyncio.wait_for(self.agenerate(prompt), timeout)
+            except Exception as e:
+                if attempt >= retries or not is_retryable(e):
+                    raise
+                # Full jitter: espalha as novas tentativas de um lote que levou 429 ao mesmo tempo
+                delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+                attempt += 1
+                logger.warning(f"🔁 {type(self).__name__}: {type(e).__name__} ({e}); "
+                               f"tentativa {attempt}/{retries} em {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def agenerate_many(self, prompts: Sequence[str], concurrency: Optional[int] = None,
+                             timeout: Optional[float] = None,
+                             retries: Optional[int] = None) -> List[Union[str, BaseException]]:
+        """
+        Gera todos os prompts com no máximo `concurrency` chamadas em voo.
+        Retorna na ordem dos prompts; uma falha definitiva vira a exceção na
+        posição correspondente, sem derrubar o restante do lote.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency or self.max_concurrency))
+
+        async def one(prompt):
+            async with semaphore:
+                return await self.agenerate_retrying(prompt, timeout=timeout, retries=retries)
+
+        return await asyncio.gather(*(one(p) for p in prompts), return_exceptions=True)
+
+    def generate_many(self, prompts: Sequence[str], **kwargs) -> List[Union[str, BaseException]]:
+        """Ponto de entrada síncrono de `agenerate_many` (para código em threads, fora de um event loop)."""
+        return asyncio.run(self.agenerate_many(prompts, **kwargs))
@@ -0,0 +1,170 @@
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Callable, Deque, Dict, NamedTuple, Optional, Tuple
+
+from src.config.settings import settings
+from src.config.settings_cache import settings_cache
+
+logger = logging.getLogger(__name__)
+
+MODES = ('auto', 'pro', 'flash')
+POLICY_KEY = 'ai_routing_policy'  # JSON em SystemSettings (ou AI_ROUTING_POLICY), relido sem reiniciar
+MODE_KEY = 'ai_model_mode'
+
+@dataclass(frozen=True)
+class RoutingPolicy:
+    """Limiares do modo 'auto'. Qualquer campo pode ser sobrescrito pelo JSON em `ai_routing_policy`."""
+    short_input_tokens: int = 400    # entrada até aqui (resumo curto) vai para o Flash
+    max_queue_depth: int = 4         # gerações em voo a partir das quais o Flash absorve o excesso
+    max_error_rate: float = 0.3      # modelo com mais erros que isso nas últimas chamadas é evitado
+    max_latency_s: float = 45.0      # idem para a latência mediana
+    window: int = 20                 # chamadas recentes consideradas por modelo
+    min_samples: int = 5             # antes disso o modelo é considerado saudável
+    max_sample_age_s: float = 300.0  # amostras mais velhas expiram: modelo evitado volta a ser tentado
+
+    @classmethod
+    def from_json(cls, raw: Optional[str]) -> 'RoutingPolicy':
+        policy = cls()
+        if not raw:
+            return policy
+        data = json.loads(raw)
+        if not isinstance(data, dict):
+            raise ValueError("a política deve ser um objeto JSON")
+        unknown = set(data) - {f.name for f in fields(cls)}
+        if unknown:
+            raise ValueError(f"campos desconhecidos: {', '.join(sorted(unknown))}")
+        return replace(policy, **{k: type(getattr(policy, k))(v) for k, v in data.items()})
+
+class Decision(NamedTuple):
+    model: str   # 'pro' | 'flash'
+    reason: str
+
+class ModelRouter:
+    """
+    Escolhe Pro ou Flash a cada geração. Em modo fixo ('pro'/'flash', via /api/model)
+    obedece ao modo; em 'auto' decide, nesta ordem, por: orçamento degradado, saúde
+    recente de cada modelo (taxa de erro e latência mediana), tamanho da entrada e
+    gerações em voo. Modo e política vêm do SettingsCache e são relidos quando mudam.
+    """
+
+    def __init__(self, cache=settings_cache, clock: Callable[[], float] = time.monotonic):
+        self.cache = cache
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._policy: Optional[RoutingPolicy] = None
+        self._mode: Optional[str] = None
+        self._recent: Dict[str, Deque[Tuple[float, float, bool]]] = {}  # (instante, segundos, ok)
+        self.in_flight = 0
+        cache.subscribe(lambda key, old, new: self.reload(), keys=(POLICY_KEY, MODE_KEY))
+
+    # --- Política ---------------------------------------------------------------
+    def reload(self):
+        mode = self.cache.get_str(MODE_KEY, settings.AI_MODEL_TYPE).lower()
+        if mode not in MODES:
+            logger.warning(f"⚠️ Modo de modelo inválido {mode!r}; usando 'pro'")
+            mode = 'pro'
+        try:
+            policy = RoutingPolicy.from_json(self.cache.get_str(POLICY_KEY, settings.AI_ROUTING_POLICY))
+        except (ValueError, TypeError) as e:
+            logger.warning(f"⚠️ Política de roteamento inválida ({e}); mantendo a anterior")
+            policy = self._policy or RoutingPolicy()
+        with self._lock:
+            changed = (mode, policy) != (self._mode, self._policy)
+            self._mode, self._policy = mode, policy
+        if changed:
+            logger.info(f"🧭 Roteamento: modo {mode}, política {asdict(policy)}")
+
+    def _current(self) -> Tuple[str, RoutingPolicy]:
+        if self._policy is None:
+            self.reload()
+        return self._mode, self._policy
+
+    @property
+    def mode(self) -> str:
+        return self._current()[0]
+
+    # --- Telemetria -------------------------------------------------------------
+    def observe(self, model: str, seconds: float, ok: bool):
+        _, policy = self._current()
+        with self._lock:
+            recent = self._recent.setdefault(model, deque(maxlen=policy.window))
+            if recent.maxlen != policy.window:
+                recent = self._recent[model] = deque(recent, maxlen=policy.window)
+            recent.append((self.clock(), seconds, ok))
+
+    def health(self, model: str) -> Dict:
+        """
+        Saúde pelas últimas `window` chamadas dentro de `max_sample_age_s`. Sem a expiração,
+        um modelo evitado nunca receberia amostras novas e ficaria instável até o reinício.
+        """
+        _, policy = self._current()
+        cutoff = self.clock() - policy.max_sample_age_s
+        with self._lock:
+            recent = [(s, ok) for at, s, ok in self._recent.get(model, ()) if at >= cutoff]
+        if not recent:
+            return {'samples': 0, 'error_rate': 0.0, 'p50_latency_s': None}
+        latencies = sorted(s for s, ok in recent if ok)
+        return {
+            'samples': len(recent),
+            'error_rate': sum(not ok for _, ok in recent) / len(recent),
+            'p50_latency_s': latencies[len(latencies) // 2] if latencies else None,
+        }
+
+    def _healthy(self, model: str, policy: RoutingPolicy) -> bool:
+        h = self.health(model)
+        if h['samples'] < policy.min_samples:
+            return True
+        if h['error_rate'] > policy.max_error_rate:
+            return False
+        return h['p50_latency_s'] is None or h['p50_latency_s'] <= policy.max_latency_s
+
+    @contextmanager
+    def track(self, model: str):
+        """Conta a geração como em voo e registra latência/erro ao final."""
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self.observe(model, time.perf_counter() - start, ok)
+
+    # --- Decisão ----------------------------------------------------------------
+    def route(self, input_tokens: int, degraded: bool = False) -> Decision:
+        mode, policy = self._current()
+        decision = self._decide(mode, policy, input_tokens, degraded)
+        logger.info(f"🧭 {decision.model} ({decision.reason}; entrada ~{input_tokens} tokens, {self.in_flight} em voo)")
+        return decision
+
+    def _decide(self, mode: str, policy: RoutingPolicy, input_tokens: int, degraded: bool) -> Decision:
+        if degraded:
+            return Decision('flash', 'orçamento perto do limite')
+        if mode != 'auto':
+            return Decision(mode, 'modo fixo')
+
+        pro_ok, flash_ok = self._healthy('pro', policy), self._healthy('flash', policy)
+        if not pro_ok and flash_ok:
+            return Decision('flash', 'pro instável')
+        if not flash_ok and pro_ok:
+            return Decision('pro', 'flash instável')
+        if input_tokens <= policy.short_input_tokens:
+            return Decision('flash', 'entrada curta')
+        if self.in_flight >= policy.max_queue_depth:
+            return Decision('flash', 'fila cheia')
+        return Decision('pro', 'reescrita longa')
+
+    def status(self) -> Dict:
+        mode, policy = self._current()
+        return {'mode': mode, 'policy': asdict(policy), 'in_flight': self.in_flight,
+                'health': {m: self.health(m) for m in ('pro', 'flash')}}
+
+model_router = ModelRouter()
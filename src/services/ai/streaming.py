@@ -0,0 +1,212 @@
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+class StreamFormatError(ValueError):
+    """A saída do modelo saiu do formato JSON esperado (detectado durante o streaming)."""
+
+# Primeiro caractere aceito para cada tipo de valor do schema
+_FIRST_CHARS = {
+    str: '"',
+    list: '[',
+    dict: '{',
+    int: '-0123456789',
+    float: '-0123456789',
+    bool: 'tf',
+}
+_PREAMBLE_OK = ('', '```', '```json', 'json')
+
+class IncrementalJSONParser:
+    """
+    Parser incremental de um objeto JSON de primeiro nível, alimentado por pedaços
+    (tokens do streaming). Cada campo é entregue a `on_field(chave, valor)` assim que
+    o valor fecha, e a estrutura é validada à medida que chega:
+
+    - antes de `{` só aceita espaços e a cerca ```json;
+    - o primeiro caractere de cada valor tem de bater com o tipo do schema
+      (ex.: `titulo` começando com `[` aborta na hora, sem esperar o corpo);
+    - campos obrigatórios ausentes no `}` final, ou texto além de `max_chars`, abortam.
+
+    Chaves fora do schema são aceitas (o modelo às vezes acrescenta campos).
+    """
+
+    def __init__(self, schema: Optional[Dict[str, type]] = None, required: Iterable[str] = (),
+                 on_field: Optional[Callable[[str, Any], None]] = None, max_chars: int = 200_000):
+        self.schema = schema or {}
+        self.required = set(required)
+        self.on_field = on_field
+        self.max_chars = max_chars
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._state = 'preamble'
+        self._chars = 0
+        self._preamble: List[str] = []
+        self._buf: List[str] = []  # chave ou valor em construção
+        self._key: Optional[str] = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str):
+        if self.done:
+            return
+        self._chars += len(chunk)
+        if self._chars > self.max_chars:
+            self._fail(f"saída excedeu {self.max_chars} caracteres")
+        for ch in chunk:
+            self._step(ch)
+            if self.done:
+                return
+
+    def result(self) -> Dict[str, Any]:
+        if not self.done:
+            self._fail(f"JSON incompleto (estado '{self._state}')")
+        return self.fields
+
+    # --- Máquina de estados ---------------------------------------------------
+    def _fail(self, reason: str):
+        raise StreamFormatError(reason)
+
+    def _step(self, ch: str):
+        state = self._state
+        if state == 'preamble':
+            if ch == '{':
+                if ''.join(self._preamble).strip() not in _PREAMBLE_OK:
+                    self._fail(f"texto antes do JSON: {''.join(self._preamble).strip()[:40]!r}")
+                self._state = 'key_or_end'
+            else:
+                self._preamble.append(ch)
+                if len(self._preamble) > 32:
+                    self._fail("texto antes do JSON")
+        elif state in ('key_or_end', 'key'):
+            if ch.isspace():
+                return
+            if ch == '"':
+                self._buf, self._escape = [], False
+                self._state = 'in_key'
+            elif ch == '}' and state == 'key_or_end':
+                self._finish()
+            else:
+                self._fail(f"esperava uma chave, veio {ch!r}")
+        elif state == 'in_key':
+            if self._escape:
+                self._escape = False
+                self._buf.append(ch)
+            elif ch == '\\':
+                self._escape = True
+                self._buf.append(ch)
+            elif ch == '"':
+                try:
+                    self._key = json.loads('"' + ''.join(self._buf) + '"')
+                except ValueError:
+                    self._fail(f"chave inválida: {''.join(self._buf)[:40]!r}")
+                self._state = 'colon'
+            else:
+                self._buf.append(ch)
+        elif state == 'colon':
+            if ch == ':':
+                self._buf, self._depth, self._in_string, self._escape = [], 0, False, False
+                self._state = 'value_start'
+            elif not ch.isspace():
+                self._fail(f"esperava ':' depois de {self._key!r}")
+        elif state == 'value_start':
+            if ch.isspace():
+                return
+            expected = self.schema.get(self._key)
+            if expected is not None and ch not in _FIRST_CHARS.get(expected, ch):
+                self._fail(f"campo {self._key!r} deveria ser {expected.__name__}, começou com {ch!r}")
+            self._state = 'value'
+            self._value_char(ch)
+        elif state == 'value':
+            self._value_char(ch)
+        elif state == 'after_value':
+            if ch == ',':
+                self._state = 'key'
+            elif ch == '}':
+                self._finish()
+            elif not ch.isspace():
+                self._fail(f"esperava ',' ou '}}' depois de {self._key!r}")
+
+    def _value_char(self, ch: str):
+        if self._in_string:
+            self._buf.append(ch)
+            if self._escape:
+                self._escape = False
+            elif ch == '\\':
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 0:
+                    self._emit()
+            return
+
+        if self._depth == 0 and ch in ',}' and self._buf:
+            # Fim de um escalar (número, true/false/null)
+            self._emit()
+            self._step(ch)
+            return
+        self._buf.append(ch)
+        if ch == '"':
+            self._in_string = True
+        elif ch in '[{':
+            self._depth += 1
+        elif ch in ']}':
+            self._depth -= 1
+            if self._depth == 0:
+                self._emit()
+
+    def _emit(self):
+        raw = ''.join(self._buf).strip()
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            self._fail(f"valor inválido em {self._key!r}: {raw[:40]!r}")
+        self.fields[self._key] = value
+        self._state = 'after_value'
+        if self.on_field:
+            self.on_field(self._key, value)
+
+    def _finish(self):
+        missing = self.required - set(self.fields)
+        if missing:
+            self._fail(f"campos obrigatórios ausentes: {', '.join(sorted(missing))}")
+        self.done = True
+        self._state = 'done'
+
+class FieldGate:
+    """
+    Segura os campos de uma tentativa até todos os `fields` fecharem (já validados pelo
+    schema) e só então os repassa a `on_field`, na ordem em que chegaram. Uma tentativa
+    abortada antes disso não dispara nada (ex.: imagem paga para um título descartado).
+    """
+
+    def __init__(self, on_field: Callable[[str, Any], None], fields: Iterable[str]):
+        self.on_field = on_field
+        self.waiting = set(fields)
+        self._held: List[tuple] = []
+
+    def __call__(self, key: str, value: Any):
+        if not self.waiting and not self._held:
+            self.on_field(key, value)
+            return
+        self._held.append((key, value))
+        self.waiting.discard(key)
+        if not self.waiting:
+            held, self._held = self._held, []
+            for k, v in held:
+                self.on_field(k, v)
+
+def parse_stream(chunks: Iterable[str], schema: Optional[Dict[str, type]] = None, required: Iterable[str] = (),
+                 on_field: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+    """Consome `chunks` até o `}` final (o resto do stream é ignorado) e devolve o objeto."""
+    parser = IncrementalJSONParser(schema, required, on_field)
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            if parser.done:
+                break
+    finally:
+        # Abandona a geração no servidor ao abortar (ou depois do `}` final)
+        close = getattr(chunks, 'close', None)
+        if close:
+            close()
+    return parser.result()
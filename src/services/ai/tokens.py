@@ -0,0 +1,120 @@
+import re
+import math
+import threading
+from functools import lru_cache
+from typing import Tuple
+
+# Delimitadores do trecho "cortável" do prompt (o conteúdo da fonte). Tudo fora
+# deles (instruções, regras, schema JSON) é preservado pelo truncamento.
+SOURCE_START = '<fonte>'
+SOURCE_END = '</fonte>'
+TRUNCATION_MARK = ' [...]'
+
+_PIECE_RE = re.compile(r'\d|[^\W\d_]+|[^\w\s]|_', re.UNICODE)
+
+def _piece_cost(piece: str) -> int:
+    return 1 if len(piece) <= 4 else math.ceil(len(piece) / 4)
+
+@lru_cache(maxsize=2048)
+def raw_token_count(text: str) -> int:
+    """
+    Contagem aproximada no estilo SentencePiece: palavras curtas valem 1 token,
+    longas ~1 a cada 4 caracteres; dígitos e pontuação valem 1 cada; espaços são livres.
+    Cacheada (LRU) porque o mesmo prompt é estimado no ajuste e na chamada.
+    """
+    return sum(_piece_cost(piece) for piece in _PIECE_RE.findall(text))
+
+def _prefix_within(text: str, budget: int) -> str:
+    """Maior prefixo de `text`, em fronteira de peça (palavra/pontuação), com até `budget` tokens aproximados."""
+    used = 0
+    for match in _PIECE_RE.finditer(text):
+        used += _piece_cost(match.group())
+        if used > budget:
+            return text[:match.start()].rstrip()
+    return text
+
+def _suffix_within(text: str, budget: int) -> str:
+    used = 0
+    for match in reversed(list(_PIECE_RE.finditer(text))):
+        used += _piece_cost(match.group())
+        if used > budget:
+            return text[match.end():].lstrip()
+    return text
+
+class TokenEstimator:
+    """
+    Estimador local de tokens, calibrado com as contagens reais devolvidas pelo
+    Gemini (`usage_metadata.prompt_token_count` de cada chamada).
+
+    Mantém média e variância (Welford) da razão real/aproximada. `estimate` usa a
+    média; `upper_bound` soma `z` desvios-padrão relativos — é o valor usado para
+    decidir truncamento, para errar do lado seguro. Sem amostras suficientes vale o
+    erro relativo a priori `prior_error`.
+    """
+
+    def __init__(self, prior_ratio: float = 1.0, prior_error: float = 0.25, min_samples: int = 5, z: float = 2.0):
+        self.prior_ratio = prior_ratio
+        self.prior_error = prior_error
+        self.min_samples = min_samples
+        self.z = z
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, text: str, actual_tokens: int):
+        raw = raw_token_count(text)
+        if raw <= 0 or actual_tokens <= 0:
+            return
+        ratio = actual_tokens / raw
+        with self._lock:
+            self._n += 1
+            delta = ratio - self._mean
+            self._mean += delta / self._n
+            self._m2 += delta * (ratio - self._mean)
+
+    def calibration(self) -> Tuple[float, float, int]:
+        """(razão real/aproximada, erro relativo do limite superior, amostras)."""
+        with self._lock:
+            n, mean, m2 = self._n, self._mean, self._m2
+        if n < self.min_samples:
+            return self.prior_ratio, self.prior_error, n
+        std = math.sqrt(m2 / (n - 1)) if n > 1 else 0.0
+        return mean, self.z * std / mean if mean else self.prior_error, n
+
+    def estimate(self, text: str) -> int:
+        ratio, _, _ = self.calibration()
+        return math.ceil(raw_token_count(text) * ratio)
+
+    def upper_bound(self, text: str) -> int:
+        ratio, error, _ = self.calibration()
+        return math.ceil(raw_token_count(text) * ratio * (1 + error))
+
+    def fit_prompt(self, prompt: str, limit: int) -> Tuple[str, bool]:
+        """
+        Reduz o prompt a `limit` tokens (pelo limite superior). Com `<fonte>...</fonte>`
+        só o conteúdo da fonte é aparado, em fronteira de palavra; sem os marcadores,
+        corta o meio e preserva o início e o fim (instruções e schema). Retorna (prompt, truncou).
+        """
+        if self.upper_bound(prompt) <= limit:
+            return prompt, False
+        ratio, error, _ = self.calibration()
+        budget = int(limit / (ratio * (1 + error)))  # em tokens aproximados
+        mark = raw_token_count(TRUNCATION_MARK)
+
+        start = prompt.find(SOURCE_START)
+        end = prompt.find(SOURCE_END, start + len(SOURCE_START)) if start >= 0 else -1
+        if start >= 0 and end >= 0:
+            head = prompt[:start + len(SOURCE_START)]
+            source = prompt[start + len(SOURCE_START):end]
+            tail = prompt[end:]
+            room = max(0, budget - raw_token_count(head) - raw_token_count(tail) - mark)
+            return head + _prefix_within(source, room) + TRUNCATION_MARK + tail, True
+
+        # Sem marcação: mantém as pontas, que costumam ter as instruções e o formato de saída
+        room = max(0, budget - mark)
+        first = _prefix_within(prompt, room // 2)
+        last = _suffix_within(prompt[len(first):], room - raw_token_count(first))
+        return first + TRUNCATION_MARK + ' ' + last, True
+
+token_estimator = TokenEstimator()
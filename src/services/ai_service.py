@@ -1,42 +1,83 @@
-import os
-import time
 import json
 import logging
-import google.generativeai as genai
-import vertexai
-from vertexai.preview.vision_models import ImageGenerationModel
-from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Any, Callable, Optional, Dict
 
 from src.config.settings import settings
-from src.config.database import get_db
-from src.models.schema import CachedContent, ImageCache, PublishedArticle
+from src.config.settings_cache import settings_cache
+from src.config.database import get_read_db
+from src.models.schema import PendingArticle, PublishedArticle
 from src.services.ai.factory import ModelFactory
+from src.services.ai.router import model_router
+from src.services.ai.streaming import FieldGate, StreamFormatError, parse_stream
+from src.services.ai.tokens import SOURCE_END, SOURCE_START, token_estimator
+from src.services.client_registry import client_registry
+from src.services.tiered_cache import article_cache, image_cache
+from src.services.image_store import image_store
+from src.services.semantic_cache import SemanticCache, semantic_cache
+from src.services.rate_limiter import rate_limiter
+from src.services.usage_tracker import BUDGET_DEGRADE, BUDGET_PAUSE, usage_tracker
+from src.services.originality import OriginalityIndex
 
 # Logger
 logger = logging.getLogger(__name__)
 
+# Tipos checados já no primeiro caractere de cada valor durante o streaming.
+# Scores ficam de fora: o modelo às vezes os devolve entre aspas.
+ARTICLE_SCHEMA = {
+    'titulo': str, 'palavras_chave': list, 'meta_description': str,
+    'categoria': str, 'conteudo_completo': str,
+}
+ARTICLE_REQUIRED = ('titulo', 'conteudo_completo')
+# Campos curtos que precisam fechar válidos antes de `on_field` disparar imagem/vídeo
+ARTICLE_SHORT_FIELDS = tuple(k for k in ARTICLE_SCHEMA if k != 'conteudo_completo')
+IMAGEN_MODEL = "image-3.0-generate-001"
+# Abaixo disso o texto é marcado como pouco original (e um reaproveitamento semântico é descartado)
+MIN_ORIGINALITY = 0.3
+
+def _build_imagen():
+    # Import tardio: o SDK do Vertex pesa no boot e só é necessário na primeira imagem
+    import vertexai
+    from vertexai.preview.vision_models import ImageGenerationModel
+
+    pid = settings_cache.get_str('google_project_id', settings.GOOGLE_PROJECT_ID)
+    if not pid:
+        return None
+    vertexai.init(project=pid, location=settings_cache.get_str('google_location', settings.GOOGLE_LOCATION))
+    return ImageGenerationModel.from_pretrained(IMAGEN_MODEL)
+
+# Criados na primeira geração e recriados quando as credenciais mudam; a escolha entre
+# Pro e Flash é feita por artigo pelo ModelRouter
+REGISTRY_NAMES = {'pro': 'gemini_pro', 'flash': 'gemini_flash'}
+client_registry.register('gemini_pro', lambda: ModelFactory.create_client('pro'), settings_keys=('google_api_key',))
+client_registry.register('gemini_flash', lambda: ModelFactory.create_client('flash'), settings_keys=('google_api_key',))
+client_registry.register('imagen', _build_imagen, settings_keys=('google_project_id', 'google_location'))
+
 class AIService:
     def __init__(self):
-        self._setup_gemini()
-        self._setup_vertex_ai()
+        self.originality = OriginalityIndex()
 
-    def _setup_gemini(self):
-        try:
-            self.client = ModelFactory.create_client()
-        except Exception as e:
-            logger.error(f"AI Client Init Error: {e}")
-            self.client = None
+    @staticmethod
+    def _client_for(model: str):
+        # Falha de criação já foi registrada pelo registry (uma vez por tentativa)
+        return client_registry.get_optional(REGISTRY_NAMES[model])
 
-    def _setup_vertex_ai(self):
-        pid = settings.GOOGLE_PROJECT_ID
-        loc = settings.GOOGLE_LOCATION
-        if pid:
-            try:
-                vertexai.init(project=pid, location=loc)
-                self.vertex_ready = True
-            except: self.vertex_ready = False
-        else: self.vertex_ready = False
+    @property
+    def client(self):
+        """Cliente do modo configurado (Pro quando o modo é 'auto')."""
+        return self._client_for('flash' if model_router.mode == 'flash' else 'pro')
+
+    @property
+    def vertex_ready(self) -> bool:
+        return bool(settings_cache.get_str('google_project_id', settings.GOOGLE_PROJECT_ID))
+
+    def _route(self, news_item):
+        """Modelo para este artigo: ('pro'|'flash', cliente); cliente None se o orçamento pausou as gerações."""
+        state = usage_tracker.budget_state()
+        if state == BUDGET_PAUSE:
+            return None, None
+        decision = model_router.route(token_estimator.estimate(f"{news_item.title}\n{news_item.summary or ''}"),
+                                      degraded=state == BUDGET_DEGRADE)
+        return decision.model, self._client_for(decision.model)
 
     def _calculate_similarity(self, text_a: str, text_b: str) -> float:
         """Calcula similaridade de Jaccard entre dois textos."""
@@ -62,122 +103,187 @@ class AIService:
         sim_source = self._calculate_similarity(source_text, generated_text)
         originality_source = 1.0 - sim_source
 
-        # Camada 2: Histórico Recente (Buffer de 7 dias)
-        db = get_db()
+        # Camada 2: Histórico completo (esboços MinHash pré-calculados, comparação vetorizada)
         try:
-            last_week = datetime.now() - timedelta(days=7)
-            recent_articles = db.query(PublishedArticle.content_snippet).filter(
-                PublishedArticle.published_date >= last_week
-            ).order_by(PublishedArticle.published_date.desc()).limit(50).all()
-            
-            max_sim_history = 0.0
-            for article in recent_articles:
-                if article.content_snippet:
-                    sim = self._calculate_similarity(article.content_snippet, generated_text)
-                    if sim > max_sim_history:
-                        max_sim_history = sim
-            
+            max_sim_history, closest = self.originality.max_similarity(generated_text)
             originality_history = 1.0 - max_sim_history
-            
+
             # O score final é o menor entre (Original vs Fonte) e (Original vs Histórico)
             final_score = min(originality_source, originality_history)
-            
+
             if max_sim_history > 0.5:
-                logger.warning(f"⚠️ Alerta de Auto-Plágio: Texto muito similar ao histórico recente ({max_sim_history:.2f})")
-            
+                logger.warning(f"⚠️ Alerta de Auto-Plágio: Texto muito similar ao histórico ({max_sim_history:.2f}, artigo {closest})")
+
             return final_score
 
         except Exception as e:
             logger.error(f"Erro na verificação de histórico: {e}")
             return originality_source # Fallback seguro
-        finally:
-            db.close()
 
-    def generate_article(self, news_item, is_evergreen: bool = False) -> Optional[Dict]:
+    def generate_article(self, news_item, is_evergreen: bool = False,
+                         on_field: Optional[Callable[[str, Any], None]] = None) -> Optional[Dict]:
+        """
+        `on_field(chave, valor)` recebe cada campo assim que ele fecha no streaming
+        (ex.: `titulo` antes do corpo), para adiantar imagem e vídeo. Não é chamado
+        quando o resultado vem do cache.
+        """
         if not self.client: return None
         
-        import hashlib
-        content_hash = hashlib.md5(f"{news_item.title}|{news_item.summary}".encode()).hexdigest()
+        content_hash = news_item.get_content_hash()
         
-        db = get_db()
-        cached = db.query(CachedContent).filter(CachedContent.content_hash == content_hash).first()
-        if cached and cached.is_valid:
+        try:
+            # Memória -> tabela -> Gemini; chamadas simultâneas para o mesmo hash geram uma vez só
+            entry = article_cache.get_or_compute(content_hash, lambda: self._semantic_or_generate(news_item, content_hash, on_field))
+        except Exception as e:
+            logger.error(f"AI Error: {e}")
+            return None
+        return json.loads(entry['cached_result']) if entry else None
+
+    def _semantic_or_generate(self, news_item, content_hash: str, on_field=None) -> Optional[Dict]:
+        """
+        Miss exato: antes de pagar o Gemini, procura uma entrada semanticamente equivalente.
+        Um hit semântico é a mesma notícia já gerada a partir de outra fonte:
+        - se aquele texto já foi publicado ou está na fila de aprovação, o item é pulado;
+        - senão (rejeitado, FAILED, nunca persistido) o texto é reaproveitado, desde que
+          passe de novo pela checagem de originalidade contra a fonte e o histórico.
+        """
+        text = SemanticCache.input_text(news_item.title, news_item.summary)
+        if settings.SEMANTIC_CACHE_ENABLED:
+            match = semantic_cache.match(text, exclude=content_hash)
+            if match:
+                key, score = match
+                cached = article_cache.get(key)
+                if cached:
+                    if self._story_in_use(key):
+                        logger.info(f"🧠 Notícia já publicada/na fila: '{news_item.title[:50]}' ≈ {key[:8]} ({score:.2f}); pulando")
+                        return None
+                    return self._reuse(news_item, key, score, cached)
+                semantic_cache.discard(key)  # expirou ou foi evictada da tabela
+
+        entry = self._generate_article(news_item, on_field)
+        if entry:
+            semantic_cache.add(content_hash, text)
+        return entry
+
+    @staticmethod
+    def _story_in_use(content_hash: str) -> bool:
+        """O texto da entrada `content_hash` já virou artigo publicado ou aguarda aprovação/publicação?"""
+        db = get_read_db()
+        try:
+            if db.query(PublishedArticle.id).filter(PublishedArticle.content_hash == content_hash).first():
+                return True
+            return db.query(PendingArticle.id).filter(
+                PendingArticle.content_hash == content_hash,
+                PendingArticle.status.in_(['PENDING', 'APPROVED'])).first() is not None
+        finally:
             db.close()
-            return json.loads(cached.cached_result)
+
+    def _reuse(self, news_item, key: str, score: float, cached: Dict) -> Optional[Dict]:
+        result = json.loads(cached['cached_result'])
+        originality = self._check_double_layer_originality(news_item.summary or '', result.get('conteudo_completo', ''))
+        if originality < MIN_ORIGINALITY:
+            logger.warning(f"⚠️ Reaproveitamento semântico descartado por baixa originalidade ({originality:.2f}): "
+                           f"'{news_item.title[:50]}' ≈ {key[:8]}")
+            return None
+        logger.info(f"🧠 Cache semântico: '{news_item.title[:50]}' ≈ {key[:8]} ({score:.2f}), originalidade {originality:.2f}")
+        return {'cached_result': cached['cached_result'], 'input_title': news_item.title,
+                'input_content_snippet': (news_item.summary or '')[:2000],
+                'ai_provider': cached.get('ai_provider'), 'prompt_id': f"semantic:{key}"}
+
+    def _stream_json(self, prompt: str, on_field=None, client=None) -> Dict:
+        """
+        Consome a resposta em streaming validando o JSON a cada pedaço. Saída fora do
+        formato aborta a geração na hora (sem pagar o resto) e tenta de novo. Os campos
+        de cada tentativa só chegam a `on_field` depois que os campos curtos passaram na
+        validação, para uma tentativa abortada não adiantar mídia de um título descartado.
+        """
+        attempts = settings.AI_STREAM_RETRIES + 1
+        for attempt in range(1, attempts + 1):
+            gate = FieldGate(on_field, ARTICLE_SHORT_FIELDS) if on_field else None
+            try:
+                return parse_stream((client or self.client).stream(prompt), ARTICLE_SCHEMA, ARTICLE_REQUIRED, gate)
+            except StreamFormatError as e:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"🔁 JSON fora do formato ({e}); gerando de novo ({attempt}/{attempts - 1})")
+
+    def _generate_article(self, news_item, on_field=None) -> Optional[Dict]:
+        """Chamada ao modelo; retorna as colunas da entrada de cache."""
+        model, client = self._route(news_item)
+        if model is None:
+            logger.warning(f"⛔ Orçamento de IA esgotado; geração adiada: {news_item.title[:50]}")
+            return None
+        if client is None:
+            return None
 
         prompt = f"""
         Você é o S1M0N, um redator de elite.
         Tarefa: Reescrever completamente o conteúdo abaixo para um blog profissional.
         
         Fonte:
+        {SOURCE_START}
         Título: {news_item.title}
         Resumo: {news_item.summary}
+        {SOURCE_END}
         
         Regras Críticas:
         1. Originalidade Extrema: Não traduza literalmente. Mude a estrutura, use sinônimos e analogias.
         2. Tom: Técnico, Autoridade, mas acessível.
         3. Formato JSON estrito.
         
-        SAÍDA JSON OBRIGATÓRIA:
+        SAÍDA JSON OBRIGATÓRIA (nesta ordem de campos):
         {{ 
             "titulo": "Título SEO (Max 60 chars)", 
-            "meta_description": "Resumo click-worthy", 
-            "conteudo_completo": "<p>...</p><h2>...</h2>", 
             "palavras_chave": ["tag1", "tag2"], 
+            "meta_description": "Resumo click-worthy", 
             "categoria": "Tech/Business", 
             "qualidade_score": 90,
-            "originalidade_score": 95 
+            "originalidade_score": 95,
+            "conteudo_completo": "<p>...</p><h2>...</h2>" 
         }}
         """
         
-        try:
-            clean_text = self.client.generate(prompt)
-            clean_text = clean_text.strip().replace('```json', '').replace('```', '')
-            result = json.loads(clean_text)
-            
-            # Verificação de Integridade (Camada Dupla)
-            real_originality = self._check_double_layer_originality(news_item.summary, result.get('conteudo_completo', ''))
-            
-            if real_originality < 0.3:
-                logger.warning(f"⚠️ Artigo rejeitado por baixa originalidade ({real_originality:.2f}).")
-                result['originalidade_score'] = int(real_originality * 100)
-                # Opcional: Poderíamos retornar None aqui para descartar, mas mantemos com score baixo para auditoria
-            
-            # Salvar Cache
-            db.add(CachedContent(content_hash=content_hash, input_title=news_item.title, cached_result=clean_text, ai_provider='gemini', created_at=datetime.now()))
-            db.commit()
-            return result
-        except Exception as e:
-            logger.error(f"AI Error: {e}")
-            return None
-        finally:
-            db.close()
+        # Campos curtos primeiro: título e palavras-chave chegam antes do corpo
+        with model_router.track(model), client_registry.first_call(REGISTRY_NAMES[model]):
+            result = self._stream_json(prompt, on_field, client)
+        
+        # Verificação de Integridade (Camada Dupla)
+        real_originality = self._check_double_layer_originality(news_item.summary, result.get('conteudo_completo', ''))
+        
+        if real_originality < MIN_ORIGINALITY:
+            logger.warning(f"⚠️ Artigo rejeitado por baixa originalidade ({real_originality:.2f}).")
+            result['originalidade_score'] = int(real_originality * 100)
+            # Opcional: Poderíamos retornar None aqui para descartar, mas mantemos com score baixo para auditoria
+        
+        # Entrada de cache (já com o score ajustado, igual para quem ler do cache depois)
+        return {'cached_result': json.dumps(result, ensure_ascii=False), 'input_title': news_item.title,
+                'input_content_snippet': (news_item.summary or '')[:2000],
+                'ai_provider': getattr(client, 'model_name', None) or 'gemini'}
 
     def generate_image(self, title: str) -> Optional[str]:
-        if not settings.ENABLE_GLOBAL_IMAGES or not self.vertex_ready: return None
+        if not settings_cache.get_bool('enable_global_images', settings.ENABLE_GLOBAL_IMAGES) or not self.vertex_ready:
+            return None
         
         import hashlib
         phash = hashlib.md5(title.encode()).hexdigest()
-        db = get_db()
-        cached = db.query(ImageCache).filter(ImageCache.prompt_hash == phash).first()
-        if cached and os.path.exists(cached.image_path):
-            db.close()
-            return cached.image_path
+        entry = image_cache.get_or_compute(phash, lambda: self._render_image(title))
+        return entry['image_path'] if entry else None
 
+    def _render_image(self, title: str) -> Optional[Dict]:
         try:
-            model = ImageGenerationModel.from_pretrained("image-3.0-generate-001")
+            model = client_registry.get_optional('imagen')
+            if model is None: return None
             full_prompt = f"{settings.IMAGE_PROMPT_STYLE}. Concept: {title}. High definition, cinematic lighting."
             
-            images = model.generate_images(prompt=full_prompt, number_of_images=1)
-            os.makedirs('images', exist_ok=True)
-            fname = f"images/vertex_{int(time.time())}.png"
-            images[0].save(location=fname, include_generation_parameters=False)
-            
-            db.add(ImageCache(prompt_hash=phash, image_path=fname, created_at=datetime.now()))
-            db.commit()
-            return fname
+            rate_limiter.acquire('vertex_imagen')
+            with client_registry.first_call('imagen'):
+                images = model.generate_images(prompt=full_prompt, number_of_images=1)
+            # O SDK só salva em arquivo: grava num temporário e move para o armazenamento por hash
+            staging = image_store.staging_path('png')
+            images[0].save(location=staging, include_generation_parameters=False)
+            fname = image_store.put_file(staging)
+
+            return {'image_path': fname, 'prompt_text': title}
         except Exception as e:
             logger.error(f"Vertex AI Error: {e}")
-            return None
-        finally:
-            db.close()
\ No newline at end of file
+            return None
\ No newline at end of file
@@ -0,0 +1,117 @@
+import queue
+import logging
+import threading
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class ArticlePipeline:
+    """
+    Pipeline em estágios para o ciclo de artigos:
+
+        gerar (N workers) -> mídia: imagem enfileirada + vídeo (M workers) -> persistir (1 worker)
+
+    Os estágios são ligados por filas limitadas, então artigos independentes se
+    sobrepõem e um estágio lento segura os anteriores (backpressure). O ritmo das
+    chamadas externas fica a cargo dos rate limiters por API, não de sleeps fixos.
+    """
+
+    def __init__(self, generate: Callable, fetch_media: Callable, persist: Callable,
+                 is_duplicate: Optional[Callable] = None, generate_workers: int = 2,
+                 media_workers: int = 2, queue_size: int = 4):
+        self.generate = generate
+        self.fetch_media = fetch_media
+        self.persist = persist
+        self.is_duplicate = is_duplicate
+        self.generate_workers = max(1, generate_workers)
+        self.media_workers = max(1, media_workers)
+        self.queue_size = max(1, queue_size)
+
+    def run(self, items: Iterable, max_success: int) -> int:
+        """
+        Processa `items` até `max_success` artigos persistidos com sucesso.
+        Só mantém em voo os artigos que ainda podem contar para o limite:
+        falhas liberam vaga para o próximo candidato, como no laço sequencial.
+        """
+        gen_q = queue.Queue(maxsize=self.queue_size)
+        media_q = queue.Queue(maxsize=self.queue_size)
+        persist_q = queue.Queue(maxsize=self.queue_size)
+        state = {'in_flight': 0, 'success': 0}
+        cond = threading.Condition()
+
+        def finish(ok: bool):
+            with cond:
+                state['in_flight'] -= 1
+                if ok:
+                    state['success'] += 1
+                cond.notify_all()
+
+        def generate_worker():
+            while True:
+                item = gen_q.get()
+                if item is _STOP: return
+                try:
+                    content = self.generate(item)
+                except Exception as e:
+                    logger.error(f"Erro no estágio de geração: {e}")
+                    content = None
+                if content:
+                    media_q.put((item, content))
+                else:
+                    finish(False)
+
+        def media_worker():
+            while True:
+                job = media_q.get()
+                if job is _STOP: return
+                item, content = job
+                try:
+                    img, vid = self.fetch_media(content)
+                    persist_q.put((item, content, img, vid))
+                except Exception as e:
+                    logger.error(f"Erro no estágio de mídia: {e}")
+                    finish(False)
+
+        def persist_worker():
+            while True:
+                job = persist_q.get()
+                if job is _STOP: return
+                try:
+                    ok = bool(self.persist(*job))
+                except Exception as e:
+                    logger.error(f"Erro no estágio de persistência: {e}")
+                    ok = False
+                finish(ok)
+
+        gen_threads = [threading.Thread(target=generate_worker, name=f'pipe-gen-{i}', daemon=True)
+                       for i in range(self.generate_workers)]
+        media_threads = [threading.Thread(target=media_worker, name=f'pipe-media-{i}', daemon=True)
+                         for i in range(self.media_workers)]
+        persist_thread = threading.Thread(target=persist_worker, name='pipe-persist', daemon=True)
+        for t in gen_threads + media_threads + [persist_thread]:
+            t.start()
+
+        try:
+            for item in items:
+                with cond:
+                    while state['success'] + state['in_flight'] >= max_success and state['success'] < max_success:
+                        cond.wait()
+                    if state['success'] >= max_success:
+                        break
+                if self.is_duplicate and self.is_duplicate(item):
+                    continue
+                with cond:
+                    state['in_flight'] += 1
+                gen_q.put(item)
+        finally:
+            # Encerramento em cascata: cada estágio só para depois que o anterior esvaziou
+            for _ in gen_threads: gen_q.put(_STOP)
+            for t in gen_threads: t.join()
+            for _ in media_threads: media_q.put(_STOP)
+            for t in media_threads: t.join()
+            persist_q.put(_STOP)
+            persist_thread.join()
+
+        return state['success']
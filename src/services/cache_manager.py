@@ -0,0 +1,462 @@
+import os
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func
+
+from src.config.settings import settings
+from src.config.database import get_db, retry_on_lock
+from src.models.schema import CachedContent, ImageCache, YouTubeCache, CacheMetric, PendingArticle, PublishedArticle
+from src.services.image_store import image_store
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CachePolicy:
+    name: str
+    model: type
+    key_column: str
+    ttl: timedelta
+    max_rows: int
+    eviction: str = 'lru'  # lru | lfu
+    max_bytes: Optional[int] = None  # só para caches com arquivo em disco
+    file_column: Optional[str] = None
+    files_dir: Optional[str] = None
+    valid_column: Optional[str] = None
+    # Arquivos que acompanham o referenciado na linha (ex.: variantes redimensionadas)
+    file_family: Optional[Callable[[str], List[str]]] = None
+
+class CacheManager:
+    """
+    Gestão das tabelas de cache (CachedContent, ImageCache, YouTubeCache).
+
+    - `lookup`/`store`: consulta com TTL (`expires_at`) e registro de hits (`hit_count`, `last_hit`).
+    - `sweep`: remove expirados, aplica orçamento de linhas (e de bytes em disco para imagens)
+      por LRU ou LFU e apaga arquivos de imagem órfãos.
+    - Métricas de hit ratio acumuladas em memória e gravadas por dia em `cache_metrics`,
+      para o dashboard (outro processo) conseguir lê-las.
+    """
+    ORPHAN_GRACE = 600  # segundos: não apaga arquivos recém-criados ainda sem linha no cache
+    DELETE_CHUNK = 500
+
+    def __init__(self, policies: List[CachePolicy], session_factory: Callable = get_db):
+        self.policies: Dict[str, CachePolicy] = {p.name: p for p in policies}
+        self.session_factory = session_factory
+        self._counters: Dict[str, Dict[str, int]] = {p.name: self._zero() for p in policies}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _zero() -> Dict[str, int]:
+        return {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'semantic_hits': 0, 'near_hits': 0}
+
+    def _count(self, name: str, field: str, n: int = 1):
+        if n:
+            with self._lock:
+                self._counters[name][field] += n
+
+    def record(self, name: str, field: str, n: int = 1):
+        """Contador externo (ex.: cache semântico) gravado junto com as métricas diárias."""
+        if field not in self._zero():
+            raise ValueError(f"Métrica de cache desconhecida: {field}")
+        self._count(name, field, n)
+
+    # --- Consulta / gravação -------------------------------------------------
+    @retry_on_lock
+    def lookup(self, name: str, key: str) -> Optional[Dict]:
+        """Retorna as colunas da entrada válida (e registra o hit) ou None (miss)."""
+        policy = self.policies[name]
+        model = policy.model
+        now = datetime.now()
+        db = self.session_factory()
+        try:
+            row = db.query(model).filter(getattr(model, policy.key_column) == key).first()
+            usable = row is not None and (row.expires_at is None or row.expires_at > now)
+            if usable and policy.valid_column and not getattr(row, policy.valid_column):
+                usable = False
+            if usable and policy.file_column and not os.path.exists(getattr(row, policy.file_column) or ''):
+                # Arquivo apagado fora do cache: a linha não serve mais
+                db.delete(row)
+                db.commit()
+                usable = False
+            if not usable:
+                self._count(name, 'misses')
+                return None
+
+            row.hit_count = (row.hit_count or 0) + 1
+            row.last_hit = now
+            values = {c.name: getattr(row, c.name) for c in model.__table__.columns}
+            db.commit()
+            self._count(name, 'hits')
+            return values
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @retry_on_lock
+    def store(self, name: str, key: str, **values):
+        """Insere ou substitui a entrada, com validade `now + ttl` da política (ou `expires_at`, se informado)."""
+        policy = self.policies[name]
+        model = policy.model
+        now = datetime.now()
+        db = self.session_factory()
+        try:
+            row = db.query(model).filter(getattr(model, policy.key_column) == key).first()
+            if row is None:
+                row = model(**{policy.key_column: key})
+                db.add(row)
+            for column, value in values.items():
+                setattr(row, column, value)
+            row.created_at = now
+            row.last_hit = now  # última utilização; mantém a ordem LRU indexável
+            row.hit_count = 0
+            row.expires_at = values.get('expires_at') or now + policy.ttl
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def count_hit(self, name: str):
+        """Hit servido por um nível acima da tabela (ex.: LRU em memória do TieredCache)."""
+        self._count(name, 'hits')
+
+    @retry_on_lock
+    def touch(self, name: str, hits: Dict[str, int]) -> set:
+        """
+        Aplica em lote hits servidos fora da tabela: `hit_count += n`, `last_hit = agora`.
+        Retorna as chaves que não estão mais utilizáveis na tabela (removidas ou invalidadas),
+        para o nível de cima descartá-las.
+        """
+        policy = self.policies[name]
+        model = policy.model
+        key_column = getattr(model, policy.key_column)
+        by_count: Dict[int, List[str]] = {}
+        for key, n in hits.items():
+            by_count.setdefault(n, []).append(key)
+        now = datetime.now()
+        stale = set()
+        db = self.session_factory()
+        try:
+            for n, keys in by_count.items():
+                for i in range(0, len(keys), self.DELETE_CHUNK):
+                    chunk = keys[i:i + self.DELETE_CHUNK]
+                    usable = [key_column.in_(chunk)]
+                    if policy.valid_column:
+                        usable.append(getattr(model, policy.valid_column).is_(True))
+                    updated = db.query(model).filter(*usable).update(
+                        {model.hit_count: func.coalesce(model.hit_count, 0) + n, model.last_hit: now},
+                        synchronize_session=False)
+                    if updated < len(chunk):
+                        # Só no caso raro de alguma chave ter sumido/invalidado: descobre quais
+                        stale |= set(chunk) - {k for (k,) in db.query(key_column).filter(*usable)}
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return stale
+
+    @retry_on_lock
+    def invalidate(self, name: str, key: str):
+        """Marca a entrada como inválida (política com `valid_column`) ou a remove."""
+        policy = self.policies[name]
+        model = policy.model
+        db = self.session_factory()
+        try:
+            query = db.query(model).filter(getattr(model, policy.key_column) == key)
+            if policy.valid_column:
+                query.update({getattr(model, policy.valid_column): False}, synchronize_session=False)
+            else:
+                query.delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # --- Varredura -----------------------------------------------------------
+    @staticmethod
+    def _family(policy: CachePolicy, path: str) -> List[str]:
+        return policy.file_family(path) if policy.file_family else [path]
+
+    def _protected_files(self, db, policy: CachePolicy) -> set:
+        """
+        Imagens (e variantes) ainda usadas: artigos aguardando aprovação/publicação (FAILED
+        inclusive, que o editor pode aprovar de novo) e artigos publicados cuja imagem só existe aqui (registrados sem WordPress).
+        """
+        rows = db.query(PendingArticle.image_path).filter(
+            PendingArticle.status.in_(['PENDING', 'APPROVED', 'FAILED'])).all()
+        # `> ''` (e não IS NOT NULL) para o SQLite percorrer o índice de image_path em vez da tabela
+        rows += db.query(PublishedArticle.image_path).filter(
+            PublishedArticle.image_path > '', PublishedArticle.wordpress_url.is_(None)).all()
+        return {os.path.abspath(f) for (p,) in rows if p for f in self._family(policy, p)}
+
+    def _remove_file(self, policy: CachePolicy, path: Optional[str], protected: set):
+        if not path or os.path.abspath(path) in protected:
+            return
+        for member in self._family(policy, path):
+            try:
+                os.remove(member)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Não foi possível remover {member}: {e}")
+
+    def _delete_rows(self, db, policy: CachePolicy, rows, protected: set) -> int:
+        ids = [r[0] for r in rows]
+        for i in range(0, len(ids), self.DELETE_CHUNK):
+            db.query(policy.model).filter(policy.model.id.in_(ids[i:i + self.DELETE_CHUNK])).delete(
+                synchronize_session=False)
+        db.commit()
+        if policy.file_column:
+            for r in rows:
+                self._remove_file(policy, r[1], protected)
+        return len(ids)
+
+    def _eviction_order(self, policy: CachePolicy):
+        model = policy.model
+        lru = model.last_hit.asc().nullsfirst()
+        if policy.eviction == 'lfu':
+            return [model.hit_count.asc().nullsfirst(), lru]
+        return [lru]
+
+    def _select_rows(self, db, policy: CachePolicy):
+        columns = [policy.model.id]
+        if policy.file_column:
+            columns.append(getattr(policy.model, policy.file_column))
+        return db.query(*columns)
+
+    def dir_bytes(self, policy: CachePolicy) -> int:
+        if not policy.files_dir or not os.path.isdir(policy.files_dir):
+            return 0
+        return sum(size for _, size, _ in self._walk_files(policy.files_dir))
+
+    @staticmethod
+    def _walk_files(root: str):
+        """(caminho absoluto, bytes, mtime) de todos os arquivos sob `root`, incluindo subdiretórios (shards)."""
+        for dirpath, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield os.path.abspath(path), st.st_size, st.st_mtime
+
+    @retry_on_lock
+    def sweep(self, name: str) -> Dict[str, int]:
+        """Expira, aplica os orçamentos e limpa órfãos de um cache. Retorna o que foi removido."""
+        policy = self.policies[name]
+        model = policy.model
+        now = datetime.now()
+        result = {'expired': 0, 'evicted': 0, 'orphans': 0}
+        db = self.session_factory()
+        try:
+            protected = self._protected_files(db, policy) if policy.file_column else set()
+
+            # Linhas antigas sem validade ganham o TTL a partir de agora
+            db.query(model).filter(model.expires_at.is_(None)).update(
+                {model.expires_at: now + policy.ttl}, synchronize_session=False)
+            db.commit()
+
+            expired = self._select_rows(db, policy).filter(model.expires_at <= now).all()
+            result['expired'] = self._delete_rows(db, policy, expired, protected)
+
+            # Orçamento de linhas: a varredura ordena a tabela inteira (manutenção periódica)
+            total = db.query(func.count(model.id)).execution_options(full_scan_ok=True).scalar() or 0
+            if total > policy.max_rows:
+                victims = self._select_rows(db, policy).order_by(*self._eviction_order(policy)).limit(
+                    total - policy.max_rows).execution_options(full_scan_ok=True).all()
+                result['evicted'] += self._delete_rows(db, policy, victims, protected)
+
+            if policy.file_column and policy.files_dir:
+                result['orphans'] = self._remove_orphans(db, policy, protected)
+                if policy.max_bytes is not None:
+                    result['evicted'] += self._enforce_bytes(db, policy, protected)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self._count(name, 'expired', result['expired'])
+        self._count(name, 'evictions', result['evicted'])
+        if any(result.values()):
+            logger.info(f"🧹 Cache {name}: {result['expired']} expirado(s), {result['evicted']} removido(s) "
+                        f"por orçamento, {result['orphans']} arquivo(s) órfão(s)")
+        return result
+
+    def _remove_orphans(self, db, policy: CachePolicy, protected: set) -> int:
+        if not os.path.isdir(policy.files_dir):
+            return 0
+        column = getattr(policy.model, policy.file_column)
+        referenced = {os.path.abspath(f) for (p,) in db.query(column).execution_options(full_scan_ok=True)
+                      if p for f in self._family(policy, p)}
+        cutoff = time.time() - self.ORPHAN_GRACE
+        removed = 0
+        for path, _, mtime in list(self._walk_files(policy.files_dir)):
+            if path in referenced or path in protected or mtime > cutoff:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Não foi possível remover {path}: {e}")
+        return removed
+
+    def _enforce_bytes(self, db, policy: CachePolicy, protected: set) -> int:
+        """
+        Orçamento de bytes sobre o que pode ser apagado: arquivos protegidos não contam
+        (nem são escolhidos), senão, quando só eles já passam de `max_bytes`, todas as
+        demais linhas seriam evictadas sem reduzir o excesso.
+        """
+        if not os.path.isdir(policy.files_dir):
+            return 0
+        excess = sum(size for path, size, _ in self._walk_files(policy.files_dir)
+                     if path not in protected) - policy.max_bytes
+        if excess <= 0:
+            return 0
+        victims = []
+        rows = self._select_rows(db, policy).order_by(*self._eviction_order(policy)).execution_options(
+            full_scan_ok=True)
+        for row_id, path in rows:
+            if excess <= 0:
+                break
+            if path and os.path.abspath(path) in protected:
+                continue
+            victims.append((row_id, path))
+            if path:
+                excess -= sum(os.path.getsize(f) for f in self._family(policy, path) if os.path.exists(f))
+        return self._delete_rows(db, policy, victims, protected)
+
+    def sweep_all(self) -> Dict[str, Dict[str, int]]:
+        results = {}
+        for name in self.policies:
+            try:
+                results[name] = self.sweep(name)
+            except Exception as e:
+                logger.error(f"Erro na varredura do cache {name}: {e}")
+        return results
+
+    # --- Métricas ------------------------------------------------------------
+    @retry_on_lock
+    def _write_metrics(self, pending: Dict[str, Dict[str, int]]):
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        db = self.session_factory()
+        try:
+            for name, deltas in pending.items():
+                row = db.query(CacheMetric).filter(CacheMetric.cache_name == name, CacheMetric.date == today).first()
+                if row is None:
+                    row = CacheMetric(cache_name=name, date=today, **self._zero())
+                    db.add(row)
+                for field, n in deltas.items():
+                    setattr(row, field, (getattr(row, field) or 0) + n)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def flush_metrics(self):
+        with self._lock:
+            pending = {name: c for name, c in self._counters.items() if any(c.values())}
+            self._counters = {name: self._zero() for name in self.policies}
+        if not pending:
+            return
+        try:
+            self._write_metrics(pending)
+        except Exception as e:
+            logger.error(f"Erro ao gravar métricas de cache: {e}")
+            with self._lock:
+                for name, deltas in pending.items():
+                    for field, n in deltas.items():
+                        self._counters[name][field] += n
+
+    def stats(self, days: int = 7) -> Dict[str, Dict]:
+        """Hit ratio (últimos `days` dias, gravado + não gravado), linhas e bytes por cache."""
+        since = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+        db = self.session_factory()
+        try:
+            fields = list(self._zero())
+            rows = db.query(CacheMetric.cache_name, *(func.sum(getattr(CacheMetric, f)) for f in fields)).filter(
+                CacheMetric.date >= since).group_by(CacheMetric.cache_name).all()
+            persisted = {r[0]: dict(zip(fields, (int(v or 0) for v in r[1:]))) for r in rows}
+            sizes = {name: db.query(func.count(p.model.id)).execution_options(full_scan_ok=True).scalar() or 0
+                     for name, p in self.policies.items()}
+        finally:
+            db.close()
+
+        with self._lock:
+            live = {name: dict(c) for name, c in self._counters.items()}
+
+        result = {}
+        for name, policy in self.policies.items():
+            totals = self._zero()
+            for source in (persisted.get(name, {}), live.get(name, {})):
+                for field, n in source.items():
+                    totals[field] += n
+            lookups = totals['hits'] + totals['misses']
+            result[name] = {
+                **totals,
+                'hit_ratio': round(totals['hits'] / lookups, 3) if lookups else None,
+                'rows': sizes[name],
+                'max_rows': policy.max_rows,
+                'ttl_hours': policy.ttl.total_seconds() / 3600,
+                'eviction': policy.eviction,
+            }
+            if policy.files_dir:
+                result[name]['bytes'] = self.dir_bytes(policy)
+                result[name]['max_bytes'] = policy.max_bytes
+        return result
+
+    # --- Thread de manutenção ------------------------------------------------
+    def start(self, sweep_interval: Optional[float] = None, flush_interval: float = 60.0):
+        """Varredura periódica + gravação das métricas (somente no processo do motor)."""
+        if self._thread and self._thread.is_alive():
+            return
+        sweep_interval = sweep_interval or settings.CACHE_SWEEP_INTERVAL_MINUTES * 60
+        self._stop.clear()
+
+        def _run():
+            next_sweep = 0.0
+            while not self._stop.is_set():
+                if time.monotonic() >= next_sweep:
+                    self.sweep_all()
+                    next_sweep = time.monotonic() + sweep_interval
+                self.flush_metrics()
+                self._stop.wait(flush_interval)
+            self.flush_metrics()
+
+        self._thread = threading.Thread(target=_run, name='cache-manager', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+def default_policies() -> List[CachePolicy]:
+    eviction = settings.CACHE_EVICTION_POLICY if settings.CACHE_EVICTION_POLICY in ('lru', 'lfu') else 'lru'
+    return [
+        CachePolicy('article', CachedContent, 'content_hash', timedelta(hours=settings.CACHE_ARTICLE_TTL_HOURS),
+                    settings.CACHE_ARTICLE_MAX_ROWS, eviction, valid_column='is_valid'),
+        CachePolicy('image', ImageCache, 'prompt_hash', timedelta(hours=settings.CACHE_IMAGE_TTL_HOURS),
+                    settings.CACHE_IMAGE_MAX_ROWS, eviction, max_bytes=int(settings.CACHE_IMAGE_MAX_MB * 1024 * 1024),
+                    file_column='image_path', files_dir=settings.IMAGES_DIR, file_family=image_store.family),
+        CachePolicy('video', YouTubeCache, 'query_hash', timedelta(hours=settings.CACHE_VIDEO_TTL_HOURS),
+                    settings.CACHE_VIDEO_MAX_ROWS, eviction),
+    ]
+
+cache_manager = CacheManager(default_policies())
@@ -0,0 +1,136 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from src.config.settings_cache import settings_cache
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class _Entry:
+    name: str
+    builder: Callable[[], Any]
+    keys: Tuple[str, ...]
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    built: bool = False
+    client: Any = None
+    error: Optional[BaseException] = None
+    builds: int = 0
+    build_seconds: Optional[float] = None
+    first_call_seconds: Optional[float] = None
+    built_at: Optional[datetime] = None
+    failures: int = 0  # falhas transitórias seguidas (backoff da próxima tentativa)
+    retry_at: Optional[float] = None
+
+class ClientRegistry:
+    """
+    Clientes de API (Gemini, Imagen, YouTube) criados sob demanda, uma vez por processo.
+
+    Cada cliente declara as chaves de SystemSettings de que depende (modo do modelo,
+    chaves de API); uma mudança nelas, vista pelo SettingsCache, descarta o cliente e a
+    próxima chamada o recria. Falhas de configuração (`CONFIG_ERRORS`, ex.: chave ausente)
+    ficam guardadas até a configuração mudar; as demais (rede, `from_pretrained`,
+    discovery) são tentadas de novo com backoff exponencial (`RETRY_BASE`..`RETRY_MAX`),
+    em vez de desligar o cliente até o reinício. O erro é registrado uma vez por tentativa.
+
+    Registra o tempo de criação de cada cliente e o da primeira chamada (`first_call`).
+    """
+
+    CONFIG_ERRORS = (ValueError,)
+    RETRY_BASE = 30.0   # segundos
+    RETRY_MAX = 900.0
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._entries: Dict[str, _Entry] = {}
+        self.clock = clock
+
+    def register(self, name: str, builder: Callable[[], Any], settings_keys: Iterable[str] = ()):
+        entry = _Entry(name, builder, tuple(settings_keys))
+        self._entries[name] = entry
+        if entry.keys:
+            settings_cache.subscribe(lambda key, old, new: self.invalidate(name, key), keys=entry.keys)
+
+    def invalidate(self, name: str, reason: str = ''):
+        entry = self._entries[name]
+        with entry.lock:
+            if entry.built:
+                logger.info(f"🔌 Cliente {name} será recriado ({reason or 'invalidado'})")
+            entry.built, entry.client, entry.error = False, None, None
+            entry.failures, entry.retry_at = 0, None
+
+    def _stale(self, entry: _Entry) -> bool:
+        return not entry.built or (entry.retry_at is not None and self.clock() >= entry.retry_at)
+
+    def get(self, name: str):
+        entry = self._entries[name]
+        if self._stale(entry):
+            with entry.lock:
+                if self._stale(entry):
+                    self._build(entry)
+        if entry.error is not None:
+            raise entry.error
+        return entry.client
+
+    def get_optional(self, name: str):
+        """Como `get`, mas devolve None se o cliente está indisponível (o erro já foi registrado no build)."""
+        try:
+            return self.get(name)
+        except Exception:
+            return None
+
+    def _build(self, entry: _Entry):
+        start = time.perf_counter()
+        try:
+            entry.client, entry.error = entry.builder(), None
+        except Exception as e:
+            entry.client, entry.error = None, e
+        entry.build_seconds = time.perf_counter() - start
+        entry.builds += 1
+        entry.first_call_seconds = None
+        entry.built_at = datetime.now()
+        entry.built = True
+        if entry.error is None:
+            entry.failures, entry.retry_at = 0, None
+            logger.info(f"🔌 Cliente {entry.name} criado em {entry.build_seconds * 1000:.0f} ms")
+        elif isinstance(entry.error, self.CONFIG_ERRORS):
+            entry.retry_at = None
+            logger.error(f"🔌 Cliente {entry.name} indisponível até a configuração mudar: {entry.error}")
+        else:
+            delay = min(self.RETRY_MAX, self.RETRY_BASE * 2 ** entry.failures)
+            entry.failures += 1
+            entry.retry_at = self.clock() + delay
+            logger.error(f"🔌 Cliente {entry.name} indisponível: {entry.error}; nova tentativa em {delay:.0f}s")
+
+    @contextmanager
+    def first_call(self, name: str):
+        """Mede a primeira chamada feita com o cliente atual (conexão, handshake, aquecimento)."""
+        entry = self._entries[name]
+        if entry.first_call_seconds is not None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if entry.first_call_seconds is None and entry.built:
+                entry.first_call_seconds = time.perf_counter() - start
+                logger.info(f"🔌 Primeira chamada de {name}: {entry.first_call_seconds * 1000:.0f} ms")
+
+    def report(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                'built': entry.built and entry.error is None,
+                'builds': entry.builds,
+                'build_ms': round(entry.build_seconds * 1000, 1) if entry.build_seconds is not None else None,
+                'first_call_ms': round(entry.first_call_seconds * 1000, 1) if entry.first_call_seconds is not None else None,
+                'built_at': entry.built_at.isoformat() if entry.built_at else None,
+                'error': str(entry.error) if entry.error is not None else None,
+            }
+            for name, entry in self._entries.items()
+        }
+
+client_registry = ClientRegistry()
@@ -1,16 +1,25 @@
-import time
 import logging
 import requests
 import json
 import os
 import hashlib
+import threading
+import numpy as np
 from datetime import datetime
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 from src.config.settings import settings
-from src.config.database import get_db
+from src.config.settings_cache import settings_cache
+from src.config.database import get_db, retry_on_lock
 from src.models.schema import PublishedArticle, PendingArticle
 from src.services.news_service import NewsService
 from src.services.ai_service import AIService
 from src.services.video_service import VideoService
+from src.services.image_queue import ImageJobQueue
+from src.services.client_registry import client_registry
+from src.services.wordpress_publisher import WordPressPublisher, WPPost
+from src.services.article_pipeline import ArticlePipeline
+from src.services.dedup_index import DedupIndex
 from src.providers.base_provider import NewsItem
 
 logger = logging.getLogger(__name__)
@@ -20,36 +29,108 @@ class ContentEngine:
         self.news_service = NewsService()
         self.ai_service = AIService()
         self.video_service = VideoService()
+        self.dedup_index = DedupIndex(use_bloom=settings.DEDUP_USE_BLOOM)
+        self.dedup_index.warm_async()
+        # Imagens geradas fora do caminho do artigo e anexadas quando ficam prontas
+        self.image_jobs = ImageJobQueue(self.ai_service.generate_image)
+        # Vídeo adiantado pelo streaming (ver _generate); no máximo `workers` buscas em voo ou na fila
+        prefetch_workers = max(2, settings.PIPELINE_MEDIA_WORKERS * 2)
+        self._prefetch = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='media-prefetch')
+        self._prefetch_slots = threading.BoundedSemaphore(prefetch_workers)
 
     def run_cycle(self):
         logger.info("🚀 Iniciando ciclo...")
-        articles = self.news_service.fetch_all(3)
-        processed = 0
-        for item in articles:
-            if processed >= settings.MAX_ARTICLES_PER_CYCLE: break
-            if self._is_duplicate(item.get_hash()): continue
-            
-            if self._process_article(item, False):
-                processed += 1
-                time.sleep(5)
+        self._process_candidates(self.news_service.fetch_all(3))
+        self.publish_approved()
+
+    def run_feed_poll(self):
+        """Entre ciclos completos: processa apenas feeds RSS que venceram no agendador adaptativo."""
+        if not self.news_service.has_due_feeds(): return
+        logger.info("📡 Feeds RSS vencidos, coletando...")
+        self._process_candidates(self.news_service.fetch_due_feeds(3))
+
+    def _process_candidates(self, articles):
+        # Uma consulta para o lote inteiro (ou o índice em memória, se já carregado)
+        published = self.dedup_index.find_existing(item.get_hash() for item in articles)
+        pipeline = ArticlePipeline(
+            generate=lambda item: self._generate(item, False),
+            fetch_media=self._fetch_media,
+            persist=self._persist,
+            is_duplicate=lambda item: item.get_hash() in published,
+            generate_workers=settings.PIPELINE_GENERATE_WORKERS,
+            media_workers=settings.PIPELINE_MEDIA_WORKERS,
+            queue_size=settings.PIPELINE_QUEUE_SIZE,
+        )
+        processed = pipeline.run(articles, settings.MAX_ARTICLES_PER_CYCLE)
+        logger.info(f"🏁 Ciclo concluído: {processed} artigo(s) processado(s).")
+        return processed
 
     def run_evergreen(self, topic: str):
         mock = NewsItem(url="gen", title=topic, source_name="Evergreen", published_date=datetime.now())
         self._process_article(mock, True)
 
     def _process_article(self, item, is_evergreen):
-        ai_content = self.ai_service.generate_article(item, is_evergreen)
+        ai_content = self._generate(item, is_evergreen)
         if not ai_content: return False
-        
-        img_path = self.ai_service.generate_image(ai_content['titulo'])
+
+        image_job, vid_url = self._fetch_media(ai_content)
+        return self._persist(item, ai_content, image_job, vid_url)
+
+    def _generate(self, item, is_evergreen):
+        """
+        Gera o artigo e, assim que o streaming entrega os campos curtos já validados
+        (`titulo`, `palavras_chave`...), enfileira a imagem e dispara o vídeo. O estágio
+        de mídia pede os mesmos recursos depois e reaproveita o job da fila / a busca
+        em voo (single-flight).
+        """
+        early = {}
+
+        def on_field(key, value):
+            early[key] = value
+            if key == 'titulo' and isinstance(value, str):
+                self.image_jobs.submit(value)
+            elif key == 'palavras_chave' and isinstance(early.get('titulo'), str):
+                self._prefetch_video(early['titulo'], value)
+
+        return self.ai_service.generate_article(item, is_evergreen, on_field=on_field)
+
+    def _prefetch_video(self, title, keywords):
+        # Adiantamento é só otimização: sem vaga, o estágio de mídia busca depois
+        if not self._prefetch_slots.acquire(blocking=False):
+            return
+        try:
+            future = self._prefetch.submit(self.video_service.find_video, title, keywords)
+        except RuntimeError:  # executor já encerrado
+            self._prefetch_slots.release()
+            return
+        future.add_done_callback(lambda _: self._prefetch_slots.release())
+
+    def shutdown(self, wait: bool = True):
+        """Encerra as threads de adiantamento de mídia, a fila de imagens e os pools dos provedores."""
+        self._prefetch.shutdown(wait=wait, cancel_futures=True)
+        self.image_jobs.shutdown(wait=wait)
+        self.news_service.shutdown(wait=wait)
+
+    def _fetch_media(self, ai_content):
+        """Enfileira a imagem (sem esperar) e busca o vídeo; retorna (job da imagem, url do vídeo)."""
+        image_job = self.image_jobs.submit(ai_content['titulo'])
         vid_url = self.video_service.find_video(ai_content['titulo'], ai_content.get('palavras_chave'))
-        
+        return image_job, vid_url
+
+    def _persist(self, item, ai_content, image_job, vid_url):
         ai_content['conteudo_completo'] = self._enrich(ai_content['conteudo_completo'], vid_url)
-        
+        # Imagem pronta (ou pronta em IMAGE_ATTACH_WAIT s) vai junto; senão é anexada depois
+        img_path = self.image_jobs.result_now(image_job)
+
         if settings.REQUIRE_MANUAL_APPROVAL:
-            return self._save_pending(ai_content, item, img_path, vid_url)
+            model, row_id = PendingArticle, self._save_pending(ai_content, item, img_path, vid_url)
         else:
-            return self._publish_wp(ai_content, item, img_path, vid_url)
+            model, row_id = PublishedArticle, self._publish_wp(ai_content, item, img_path, vid_url, image_job)
+        if row_id is None:
+            return False
+        if img_path is None and image_job is not None:
+            self.image_jobs.attach(image_job, model, row_id)
+        return True
 
     def _enrich(self, html, vid_url):
         if vid_url:
@@ -57,8 +138,22 @@ class ContentEngine:
             html += f'<div class="video"><iframe src="https://www.youtube.com/embed/{vid_id}"></iframe></div>'
         return html
 
-    def _save_pending(self, content, item, img, vid):
+    @staticmethod
+    @retry_on_lock
+    def _insert(row):
         db = get_db()
+        try:
+            db.add(row)
+            db.commit()
+            return row.id
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _save_pending(self, content, item, img, vid) -> Optional[int]:
+        """Retorna o id da linha criada (None em caso de erro)."""
         try:
             # FIX: Tabela PendingArticle agora existe no schema.py
             pend = PendingArticle(
@@ -68,56 +163,172 @@ class ContentEngine:
                 content_json=json.dumps(content),
                 image_path=img,
                 video_url=vid,
+                source_signature=item.signature.tobytes() if item.signature is not None else None,
+                content_hash=item.get_content_hash(),
                 status='PENDING'
             )
-            db.add(pend)
-            db.commit()
+            row_id = self._insert(pend)
             logger.info("📋 Artigo enviado para aprovação.")
-            return True
+            return row_id
         except Exception as e:
             logger.error(f"Erro ao salvar pendente: {e}")
-            return False
-        finally:
-            db.close()
+            return None
+
+    @property
+    def publisher(self) -> Optional[WordPressPublisher]:
+        return client_registry.get_optional('wordpress')
 
-    def _publish_wp(self, content, item, img, vid):
-        # Lógica de publicação WP com suporte a Draft/Publish
+    @staticmethod
+    @retry_on_lock
+    def _store_published(row: PublishedArticle, pending_id: Optional[int] = None) -> int:
+        """Grava o artigo publicado (uma vez por hash) e, se veio da fila de aprovação, marca a pendência."""
         db = get_db()
         try:
-            # Check Publish Mode (default: publish)
-            from src.models.schema import SystemSettings
-            s = db.query(SystemSettings).filter_by(key='wp_publish_mode').first()
-            status = s.value if s else 'publish'
-            
-            # Payload Simulado (Na real usa WP REST API)
-            payload = {
-                'title': content['titulo'],
-                'content': content['conteudo_completo'],
-                'status': status  # 'publish' or 'draft'
-            }
-            
-            # Aqui faria: requests.post(..., json=payload)
-            
-            pub = PublishedArticle(
-                hash=item.get_hash(),
-                title=content['titulo'],
-                full_content=content['conteudo_completo'],
-                source=item.source_name,
-                published_date=datetime.now(),
-                wordpress_url=f"wp_{status}_{int(time.time())}" # Mock URL check
-            )
-            db.add(pub)
+            row_id = db.query(PublishedArticle.id).filter(PublishedArticle.hash == row.hash).scalar()
+            if row_id is None:
+                db.add(row)
+                db.flush()
+                row_id = row.id
+            if pending_id is not None:
+                db.query(PendingArticle).filter(PendingArticle.id == pending_id).update(
+                    {PendingArticle.status: 'PUBLISHED'}, synchronize_session=False)
             db.commit()
-            logger.info(f"✅ Publicado no WP ({status}): {content['titulo']}")
-            return True
+            return row_id
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _record_published(self, post: WPPost, source: str, url: Optional[str], signature=None,
+                          pending_id: Optional[int] = None, content_hash: Optional[str] = None) -> int:
+        sketch = self.ai_service.originality.sketch(post.content)
+        row_id = self._store_published(PublishedArticle(
+            hash=post.key,
+            content_hash=content_hash,
+            title=post.title,
+            full_content=post.content,
+            source=source,
+            published_date=datetime.now(),
+            wordpress_url=url,
+            image_path=post.image_path,
+            source_signature=signature.tobytes() if signature is not None else None,
+            content_sketch=sketch.tobytes() if sketch is not None else None
+        ), pending_id)
+        self.dedup_index.add(post.key)
+        if signature is not None:
+            self.news_service.near_duplicates.add(post.key, signature)
+        self.ai_service.originality.add(post.key, sketch)
+        return row_id
+
+    def _publish_wp(self, content, item, img, vid, image_job=None) -> Optional[int]:
+        """Publica no WordPress (Draft/Publish conforme `wp_publish_mode`) e retorna o id do PublishedArticle."""
+        try:
+            post = WPPost(key=item.get_hash(), title=content['titulo'], content=content['conteudo_completo'],
+                          status=settings_cache.get_str('wp_publish_mode', 'publish'),
+                          excerpt=content.get('meta_description') or '', image_path=img)
+            publisher = self.publisher
+            url = None
+            if publisher is None:
+                logger.warning(f"⚠️ WordPress não configurado; artigo registrado só localmente: {post.title}")
+            else:
+                result = publisher.publish(post)
+                if not result.ok:
+                    return None
+                url = result.url
+                if img is None and image_job is not None:
+                    # A imagem ainda está na fila: vira a imagem destacada quando ficar pronta
+                    image_job.add_done_callback(lambda done: self._feature_later(publisher, result.post_id,
+                                                                                 post.key, done.result()))
+
+            row_id = self._record_published(post, item.source_name, url, signature=item.signature,
+                                            content_hash=item.get_content_hash())
+            logger.info(f"✅ Publicado no WP ({post.status}): {post.title}")
+            return row_id
         except Exception as e:
             logger.error(f"Erro WP: {e}")
-            return False
+            return None
+
+    @staticmethod
+    def _feature_later(publisher: WordPressPublisher, post_id: int, key: str, path: Optional[str]):
+        if not path:
+            return
+        try:
+            publisher.set_featured_image(post_id, key, path)
+        except Exception as e:
+            logger.error(f"Erro ao anexar imagem ao post {post_id}: {e}")
+
+    @staticmethod
+    @retry_on_lock
+    def _publish_failed(pending_id: int, max_attempts: int) -> bool:
+        """Conta a falha do aprovado; retorna True se ele esgotou as tentativas e virou FAILED."""
+        db = get_db()
+        try:
+            row = db.query(PendingArticle).filter(PendingArticle.id == pending_id).first()
+            if row is None:
+                return False
+            row.publish_attempts = (row.publish_attempts or 0) + 1
+            if row.publish_attempts >= max_attempts:
+                row.status = 'FAILED'
+            db.commit()
+            return row.status == 'FAILED'
+        except Exception:
+            db.rollback()
+            raise
         finally:
-             if 'db' in locals(): db.close()
+            db.close()
 
-    def _is_duplicate(self, h):
+    def publish_approved(self, limit: int = settings.WP_PUBLISH_BATCH) -> int:
+        """
+        Publica em lote os PendingArticle aprovados (no máximo WP_CONCURRENCY em paralelo).
+        Um aprovado que falha continua na fila para o próximo lote, até WP_MAX_PUBLISH_ATTEMPTS
+        falhas; depois disso vira FAILED e sai da fila.
+        """
+        publisher = self.publisher
+        if publisher is None:
+            return 0
         db = get_db()
-        exists = db.query(PublishedArticle).filter(PublishedArticle.hash == h).first()
-        db.close()
-        return exists is not None
\ No newline at end of file
+        try:
+            rows = db.query(PendingArticle).filter(PendingArticle.status == 'APPROVED').order_by(
+                PendingArticle.created_at).limit(limit).all()
+            approved = [(row.id, row.source_name, row.original_url, row.title, row.content_json, row.image_path,
+                         row.source_signature, row.content_hash) for row in rows]
+        finally:
+            db.close()
+        if not approved:
+            return 0
+
+        jobs = []
+        for row_id, source, url, title, content_json, image_path, blob, content_hash in approved:
+            content = json.loads(content_json or '{}')
+            key = hashlib.md5((url or '').encode('utf-8')).hexdigest()  # mesmo hash de NewsItem.get_hash
+            signature = np.frombuffer(blob, dtype=np.uint32) if blob else None
+            jobs.append((row_id, source, signature, content_hash,
+                         WPPost(key=key, title=title or content.get('titulo', ''),
+                                content=content.get('conteudo_completo', ''),
+                                status='publish',  # já aprovados por um editor
+                                excerpt=content.get('meta_description') or '',
+                                image_path=image_path)))
+
+        results = publisher.publish_many([job[-1] for job in jobs], settings.WP_CONCURRENCY)
+        published = 0
+        for (row_id, source, signature, content_hash, post), result in zip(jobs, results):
+            if not result.ok:
+                try:
+                    if self._publish_failed(row_id, settings.WP_MAX_PUBLISH_ATTEMPTS):
+                        logger.error(f"❌ Aprovado desistido após {settings.WP_MAX_PUBLISH_ATTEMPTS} tentativas: "
+                                     f"{post.title[:50]} ({result.error})")
+                except Exception as e:
+                    logger.error(f"Erro ao registrar falha de {post.title[:50]}: {e}")
+                continue
+            try:
+                self._record_published(post, source, result.url, signature=signature, pending_id=row_id,
+                                       content_hash=content_hash)
+                published += 1
+            except Exception as e:
+                logger.error(f"Erro ao registrar publicação de {post.title[:50]}: {e}")
+        logger.info(f"📤 Aprovados publicados no WP: {published}/{len(jobs)}")
+        return published
+
+    def _is_duplicate(self, h):
+        return self.dedup_index.contains(h)
@@ -0,0 +1,132 @@
+import math
+import hashlib
+import logging
+import threading
+from typing import Callable, Iterable, Optional, Set
+
+from src.config.database import get_read_db
+from src.models.schema import PublishedArticle
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    """Bloom filter simples sobre bytearray (double hashing a partir do MD5 da chave)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.md5(key.encode('utf-8')).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+class DedupIndex:
+    """
+    Índice em memória dos hashes de PublishedArticle.
+
+    Carregado uma vez por processo e atualizado a cada publicação. Para históricos
+    muito grandes, `use_bloom=True` guarda só um Bloom filter e confirma os positivos
+    no banco. Enquanto o índice não foi carregado, `find_existing` verifica o lote
+    inteiro com uma única consulta IN (por blocos), em vez de um SELECT por item.
+    """
+    CHUNK_SIZE = 500  # limite seguro de parâmetros por IN no SQLite
+
+    def __init__(self, session_factory: Callable = get_read_db, use_bloom: bool = False,
+                 bloom_error_rate: float = 0.01):
+        self.session_factory = session_factory
+        self.use_bloom = use_bloom
+        self.bloom_error_rate = bloom_error_rate
+        self.loaded = False
+        self._hashes: Set[str] = set()
+        self._bloom = None
+        self._added_during_load: Optional[Set[str]] = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            # Publicações feitas enquanto o histórico é lido entram no índice novo depois da troca
+            if self._added_during_load is None:
+                self._added_during_load = set()
+        try:
+            db = self.session_factory()
+            try:
+                # Carga do histórico inteiro: full scan intencional (ver query_audit)
+                hashes = [h for (h,) in db.query(PublishedArticle.hash).execution_options(full_scan_ok=True).yield_per(10000) if h]
+            finally:
+                db.close()
+        except Exception:
+            with self._lock:
+                self._added_during_load = None
+            raise
+        with self._lock:
+            added, self._added_during_load = self._added_during_load or set(), None
+            if self.use_bloom:
+                # Folga para o crescimento do histórico sem degradar a taxa de falso positivo
+                self._bloom = BloomFilter(max(len(hashes) * 2, 100000), self.bloom_error_rate)
+                for h in hashes:
+                    self._bloom.add(h)
+                for h in added:
+                    self._bloom.add(h)
+            else:
+                self._hashes = set(hashes) | added
+            self.loaded = True
+        logger.info(f"🧮 Índice de dedup carregado: {len(hashes)} hashes ({'bloom' if self.use_bloom else 'set'})")
+
+    def warm_async(self):
+        """Carrega o índice em segundo plano; até lá, as consultas em lote usam IN."""
+        def _load():
+            try:
+                self.load()
+            except Exception as e:
+                logger.error(f"Erro ao carregar índice de dedup: {e}")
+        threading.Thread(target=_load, name='dedup-index-load', daemon=True).start()
+
+    def _query_existing(self, hashes: Iterable[str]) -> Set[str]:
+        hashes = list(hashes)
+        found = set()
+        if not hashes:
+            return found
+        db = self.session_factory()
+        try:
+            for i in range(0, len(hashes), self.CHUNK_SIZE):
+                chunk = hashes[i:i + self.CHUNK_SIZE]
+                found.update(h for (h,) in db.query(PublishedArticle.hash).filter(PublishedArticle.hash.in_(chunk)))
+        finally:
+            db.close()
+        return found
+
+    def find_existing(self, hashes: Iterable[str]) -> Set[str]:
+        """Retorna o subconjunto de `hashes` já publicados."""
+        hashes = set(hashes)
+        if not self.loaded:
+            return self._query_existing(hashes)
+        with self._lock:
+            if not self.use_bloom:
+                return hashes & self._hashes
+            candidates = {h for h in hashes if h in self._bloom}
+        return self._query_existing(candidates) if candidates else set()
+
+    def contains(self, h: str) -> bool:
+        if not self.loaded:
+            self.load()
+        return h in self.find_existing([h])
+
+    def add(self, h: str):
+        with self._lock:
+            if self._added_during_load is not None:
+                self._added_during_load.add(h)
+            if self._bloom is not None:
+                self._bloom.add(h)
+            else:
+                self._hashes.add(h)
@@ -0,0 +1,92 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, Optional
+
+from src.config.settings import settings
+from src.config.database import get_db, retry_on_lock
+
+logger = logging.getLogger(__name__)
+
+class ImageJobQueue:
+    """
+    Fila de geração de imagens fora do caminho do artigo.
+
+    `submit(titulo)` devolve um Future (o mesmo para pedidos repetidos do título enquanto
+    o job está em voo). O artigo é salvo sem esperar; `attach` grava o caminho na linha
+    (PendingArticle / PublishedArticle) quando a imagem fica pronta.
+    """
+
+    def __init__(self, render: Callable[[str], Optional[str]], workers: int = settings.IMAGE_QUEUE_WORKERS,
+                 session_factory: Callable = get_db):
+        self.render = render
+        self.session_factory = session_factory
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='image-job')
+        self._jobs: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, title: str) -> Future:
+        with self._lock:
+            job = self._jobs.get(title)
+            if job is None:
+                job = self._executor.submit(self._run, title)
+                self._jobs[title] = job
+                job.add_done_callback(lambda _: self._forget(title, job))
+            return job
+
+    def _forget(self, title: str, job: Future):
+        with self._lock:
+            if self._jobs.get(title) is job:
+                del self._jobs[title]
+
+    def _run(self, title: str) -> Optional[str]:
+        try:
+            return self.render(title)
+        except Exception as e:
+            logger.error(f"🖼️ Falha ao gerar imagem para '{title[:50]}': {e}")
+            return None
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    @staticmethod
+    def result_now(job: Optional[Future], wait: float = settings.IMAGE_ATTACH_WAIT) -> Optional[str]:
+        """Caminho da imagem se ficar pronta em até `wait` segundos; senão None (o job segue na fila)."""
+        if job is None:
+            return None
+        try:
+            return job.result(timeout=wait)
+        except FutureTimeout:
+            return None
+
+    def attach(self, job: Future, model: type, row_id: int):
+        """Grava `image_path` na linha `row_id` de `model` quando o job terminar."""
+        job.add_done_callback(lambda done: self._attach(model, row_id, done.result()))
+
+    def _attach(self, model: type, row_id: int, path: Optional[str]):
+        if not path:
+            return
+        try:
+            self._update(model, row_id, path)
+            logger.info(f"🖼️ Imagem anexada a {model.__tablename__}#{row_id}")
+        except Exception as e:
+            logger.error(f"Erro ao anexar imagem a {model.__tablename__}#{row_id}: {e}")
+
+    @retry_on_lock
+    def _update(self, model: type, row_id: int, path: str):
+        db = self.session_factory()
+        try:
+            # Não sobrescreve uma imagem escolhida manualmente nesse meio tempo
+            db.query(model).filter(model.id == row_id, model.image_path.is_(None)).update(
+                {model.image_path: path}, synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
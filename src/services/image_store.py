@@ -0,0 +1,165 @@
+import os
+import glob
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from src.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Formatos de saída aceitos: extensão -> formato do Pillow. Vazio/'png' mantém o PNG original.
+FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG', 'jpg': 'JPEG', 'png': 'PNG'}
+
+def _atomic_target(path: str) -> str:
+    """Arquivo temporário no mesmo diretório do destino (os.replace só é atômico no mesmo sistema de arquivos)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.', suffix='.tmp')
+    os.close(fd)
+    return tmp
+
+def atomic_write(path: str, data: bytes):
+    tmp = _atomic_target(path)
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def encode_variants(source: str, outputs: Dict[int, str], fmt: str, quality: int) -> Dict[int, str]:
+    """
+    Roda no pool de processos (Pillow segura a GIL): reescreve `source` em cada saída
+    `{largura: caminho}` (0 = tamanho original), sem ampliar, gravando de forma atômica.
+    """
+    from PIL import Image
+
+    written = {}
+    with Image.open(source) as original:
+        original.load()
+        image = original.convert('RGB') if fmt == 'JPEG' and original.mode not in ('RGB', 'L') else original
+        for width, path in sorted(outputs.items(), reverse=True):
+            if os.path.exists(path):
+                written[width] = path
+                continue
+            resized = image
+            if width and image.width > width:
+                resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+            tmp = _atomic_target(path)
+            try:
+                resized.save(tmp, format=fmt, quality=quality, optimize=True)
+                os.replace(tmp, path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            written[width] = path
+    return written
+
+class ImageStore:
+    """
+    Armazenamento de imagens endereçado por conteúdo: `root/ab/cd/<sha256>.<ext>`.
+
+    O nome vem do hash dos bytes gerados, então duas imagens nunca colidem e a mesma
+    imagem não é gravada duas vezes. Toda escrita vai para um temporário no mesmo
+    diretório e é trocada com `os.replace`: quem lê nunca vê arquivo pela metade.
+
+    Com `fmt` (webp/jpeg) a imagem é recodificada e limitada a `max_width`; cada
+    largura em `widths` gera uma variante `<sha256>_<largura>.<ext>` ao lado. O trabalho
+    do Pillow roda num pool de `workers` processos (0 = na própria thread).
+    """
+
+    def __init__(self, root: str, fmt: str = settings.IMAGE_FORMAT, widths: Sequence[int] = settings.IMAGE_VARIANT_WIDTHS,
+                 max_width: int = settings.IMAGE_MAX_WIDTH, quality: int = settings.IMAGE_QUALITY,
+                 workers: int = settings.IMAGE_WORKERS):
+        self.root = root
+        self.fmt = (fmt or 'png').lower()
+        if self.fmt not in FORMATS:
+            logger.warning(f"⚠️ Formato de imagem desconhecido {fmt!r}; mantendo PNG")
+            self.fmt = 'png'
+        self.widths = sorted({int(w) for w in widths if int(w) > 0}, reverse=True)
+        self.max_width = max_width
+        self.quality = quality
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    # --- Caminhos -------------------------------------------------------------
+    def path_for(self, digest: str, ext: str, width: int = 0) -> str:
+        name = f"{digest}_{width}.{ext}" if width else f"{digest}.{ext}"
+        return os.path.join(self.root, digest[:2], digest[2:4], name)
+
+    def family(self, path: str) -> List[str]:
+        """O arquivo e suas variantes (para remoção e proteção na varredura do cache)."""
+        stem, ext = os.path.splitext(path)
+        return [path] + glob.glob(f"{glob.escape(stem)}_*{ext}")
+
+    # --- Escrita --------------------------------------------------------------
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def put(self, data: bytes, ext: str = 'png') -> str:
+        """Grava os bytes (e variantes) e retorna o caminho da imagem principal."""
+        digest = hashlib.sha256(data).hexdigest()
+        ext = ext.lower().lstrip('.')
+        out_ext = ext if self.fmt == 'png' else self.fmt
+        primary = self.path_for(digest, out_ext)
+        outputs = {w: self.path_for(digest, out_ext, w) for w in self.widths if not self.max_width or w < self.max_width}
+        if os.path.exists(primary) and all(os.path.exists(p) for p in outputs.values()):
+            return primary
+
+        if self.fmt == 'png' and not self.max_width:
+            atomic_write(primary, data)
+            if not outputs:
+                return primary
+            source = primary
+        else:
+            source = self.staging_path(ext)  # único por chamada: gravações simultâneas não se atropelam
+            with open(source, 'wb') as f:
+                f.write(data)
+            outputs[self.max_width] = primary
+
+        fmt = FORMATS.get(out_ext, 'PNG')
+        try:
+            pool = self._executor()
+            if pool is None:
+                encode_variants(source, outputs, fmt, self.quality)
+            else:
+                pool.submit(encode_variants, source, outputs, fmt, self.quality).result()
+        finally:
+            if source != primary and os.path.exists(source):
+                os.remove(source)
+        return primary
+
+    def put_file(self, path: str) -> str:
+        """Move um arquivo já gerado (ex.: salvo pelo SDK) para o armazenamento."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        stored = self.put(data, os.path.splitext(path)[1] or 'png')
+        os.remove(path)
+        return stored
+
+    def staging_path(self, ext: str = 'png') -> str:
+        """Caminho temporário dentro de `root` para SDKs que só sabem salvar em arquivo."""
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix='.staging-', suffix=f'.{ext}')
+        os.close(fd)
+        return tmp
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+image_store = ImageStore(settings.IMAGES_DIR)
@@ -0,0 +1,165 @@
+import re
+import zlib
+import logging
+import threading
+import numpy as np
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from src.config.database import get_read_db
+from src.models.schema import PublishedArticle
+
+logger = logging.getLogger(__name__)
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_MERSENNE_PRIME = (1 << 31) - 1
+
+class MinHasher:
+    """MinHash vetorizado (NumPy) sobre shingles de palavras."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 42):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> Set[str]:
+        words = _WORD_RE.findall(_TAG_RE.sub(' ', text or '').lower())
+        if len(words) < self.shingle_size:
+            return set(words)
+        return {' '.join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        # crc32 é estável entre processos (ao contrário de hash())
+        hashed = np.fromiter((zlib.crc32(s.encode('utf-8')) % _MERSENNE_PRIME for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        perms = (hashed[:, None] * self._a + self._b) % _MERSENNE_PRIME
+        return perms.min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """Estimativa de Jaccard: fração de posições iguais."""
+        return float(np.mean(sig_a == sig_b))
+
+class LSHIndex:
+    """Locality-Sensitive Hashing por bandas sobre assinaturas MinHash."""
+
+    def __init__(self, num_perm: int = 128, bands: int = 32):
+        if num_perm % bands:
+            raise ValueError("num_perm deve ser múltiplo de bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: Dict[bytes, List[str]] = defaultdict(list)
+        self.signatures: Dict[str, np.ndarray] = {}
+
+    def _band_keys(self, sig: np.ndarray) -> Iterable[bytes]:
+        for b in range(self.bands):
+            yield bytes([b]) + sig[b * self.rows:(b + 1) * self.rows].tobytes()
+
+    def insert(self, key: str, sig: np.ndarray):
+        self.signatures[key] = sig
+        for band_key in self._band_keys(sig):
+            self._buckets[band_key].append(key)
+
+    def query(self, sig: np.ndarray) -> Set[str]:
+        candidates = set()
+        for band_key in self._band_keys(sig):
+            candidates.update(self._buckets.get(band_key, ()))
+        return candidates
+
+    def __len__(self):
+        return len(self.signatures)
+
+class NearDuplicateDetector:
+    """
+    Agrupa a mesma história vinda de fontes diferentes (GNews, NewsAPI, vários RSS)
+    antes de qualquer chamada de IA. Cada item recebe uma assinatura MinHash de
+    título + resumo; o LSH encontra candidatos no lote atual e no histórico
+    publicado (assinaturas persistidas em PublishedArticle.source_signature).
+    O primeiro item de cada grupo (na ordem dos provedores) é o representante.
+    """
+
+    def __init__(self, threshold: float = 0.5, num_perm: int = 128, bands: int = 32,
+                 session_factory: Callable = get_read_db):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.hasher = MinHasher(num_perm=num_perm)
+        self.session_factory = session_factory
+        self._history: Optional[LSHIndex] = None
+        self._lock = threading.Lock()
+        self.last_collapsed = 0
+
+    @staticmethod
+    def item_text(item) -> str:
+        return f"{item.title or ''} {item.summary or ''}"
+
+    def _load_history(self) -> LSHIndex:
+        index = LSHIndex(self.num_perm, self.bands)
+        db = self.session_factory()
+        try:
+            rows = db.query(PublishedArticle.hash, PublishedArticle.source_signature).filter(
+                PublishedArticle.source_signature.isnot(None)).execution_options(full_scan_ok=True).yield_per(5000)
+            for h, blob in rows:
+                sig = np.frombuffer(blob, dtype=np.uint32)
+                if sig.size == self.num_perm:
+                    index.insert(h, sig)
+        finally:
+            db.close()
+        logger.info(f"🧬 Índice LSH carregado: {len(index)} assinaturas")
+        return index
+
+    def history(self) -> LSHIndex:
+        with self._lock:
+            if self._history is None:
+                self._history = self._load_history()
+            return self._history
+
+    def _matches(self, index: LSHIndex, sig: np.ndarray) -> Optional[str]:
+        for key in index.query(sig):
+            if self.hasher.similarity(sig, index.signatures[key]) >= self.threshold:
+                return key
+        return None
+
+    def collapse(self, items: List) -> List:
+        """Remove quase-duplicatas do lote e histórias já publicadas. Mantém a ordem."""
+        try:
+            history = self.history()
+        except Exception as e:
+            logger.error(f"Erro ao carregar assinaturas publicadas: {e}")
+            history = LSHIndex(self.num_perm, self.bands)
+
+        batch = LSHIndex(self.num_perm, self.bands)
+        kept = []
+        for i, item in enumerate(items):
+            sig = self.hasher.signature(self.item_text(item))
+            item.signature = sig
+            if sig is None:
+                kept.append(item)
+                continue
+            if self._matches(batch, sig) is not None:
+                continue
+            with self._lock:
+                published = self._matches(history, sig)
+            if published is not None:
+                continue
+            batch.insert(str(i), sig)
+            kept.append(item)
+
+        self.last_collapsed = len(items) - len(kept)
+        if self.last_collapsed:
+            logger.info(f"🧬 {self.last_collapsed} quase-duplicata(s) agrupada(s) antes da geração")
+        return kept
+
+    def add(self, article_hash: str, signature: Optional[np.ndarray]):
+        """Registra a assinatura de um artigo recém-publicado no índice em memória."""
+        if signature is None:
+            return
+        with self._lock:
+            if self._history is not None:
+                self._history.insert(article_hash, signature)
@@ -1,23 +1,27 @@
+import time
 import logging
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeout
+from typing import List, Dict, Optional
+from src.config.settings import settings
+from src.config.settings_cache import settings_cache
+from src.providers.base_provider import FetchTicket
 from src.providers.rss_provider import RSSProvider
 from src.providers.gnews_provider import GNewsProvider
 from src.providers.currents_provider import CurrentsProvider
 from src.providers.newsapi_provider import NewsAPIProvider
+from src.services.near_duplicate import NearDuplicateDetector
 
 logger = logging.getLogger(__name__)
 
 class NewsService:
     def __init__(self):
         self.providers = [RSSProvider(), GNewsProvider(), CurrentsProvider(), NewsAPIProvider()]
+        # Telemetria por provedor: tempo da última execução e falhas acumuladas no processo
+        self.failure_counts: Dict[str, int] = {p.provider_name: 0 for p in self.providers}
+        self.last_stats: Dict[str, Dict] = {}
+        self.near_duplicates = NearDuplicateDetector(threshold=settings.NEAR_DUP_THRESHOLD)
 
-    def fetch_all(self, items_per_source=3) -> List:
-        from src.config.database import get_db
-        from src.models.schema import SystemSettings
-        
-        all_news = []
-        hashes = set()
-        
+    def fetch_all(self, items_per_source=3, concurrent: Optional[bool] = None) -> List:
         # Mapa de provedores para chaves de configuração
         provider_map = {
             'GNews': 'enable_gnews',
@@ -26,28 +30,189 @@ class NewsService:
             'RSS': None # RSS sempre ativo ou controlado por outra flag? Assumindo sempre ativo por enquanto ou config própria
         }
 
-        db = get_db()
-        settings_cache = {s.key: s.value for s in db.query(SystemSettings).all()}
-        db.close()
+        current_settings = settings_cache.snapshot()
 
+        enabled = []
         for p in self.providers:
             # Verifica se o provedor está habilitado
             config_key = provider_map.get(p.provider_name) # Assumes provider has .provider_name property matching these keys
-            
+
             # Se tiver chave de config, verifica. Se for 'false', pula.
             if config_key:
-                is_enabled = settings_cache.get(config_key, 'true').lower() == 'true'
+                is_enabled = current_settings.get(config_key, 'true').lower() == 'true'
                 if not is_enabled:
                     logger.info(f"⏭️ Skipping {p.provider_name} (Disabled via Settings)")
                     continue
+            enabled.append(p)
+
+        if concurrent is None:
+            concurrent = settings.NEWS_FETCH_CONCURRENT
+
+        self.last_stats = {}
+        if concurrent:
+            results = self._fetch_concurrent(enabled, items_per_source)
+        else:
+            results = []
+            for p in enabled:
+                items, elapsed, ok = self._timed_fetch(p, items_per_source)
+                self._record(p.provider_name, items, elapsed, ok)
+                results.append(items)
+
+        return self._merge(results)
+
+    @property
+    def rss_provider(self):
+        return next((p for p in self.providers if p.provider_name == 'rss'), None)
+
+    def has_due_feeds(self) -> bool:
+        rss = self.rss_provider
+        return bool(rss) and rss.has_due_feeds()
+
+    def fetch_due_feeds(self, items_per_source=3) -> List:
+        """Coleta apenas os feeds RSS vencidos no agendador adaptativo, sem acionar as APIs pagas."""
+        rss = self.rss_provider
+        if not rss: return []
+        items, elapsed, ok = self._timed_fetch(rss, items_per_source)
+        self._record(rss.provider_name, items, elapsed, ok)
+        return self._merge([items])
+
+    def _timed_fetch(self, provider, limit: int, ticket: Optional[FetchTicket] = None):
+        """Executa um provedor medindo o tempo. Nunca propaga exceções: retorna (itens, segundos, ok)."""
+        start = time.monotonic()
+        try:
+            items = provider.fetch(limit=limit, ticket=ticket) if ticket is not None else provider.fetch(limit=limit)
+            return items, time.monotonic() - start, True
+        except Exception as e:
+            logger.error(f"Erro em {provider.provider_name}: {e}")
+            return [], time.monotonic() - start, False
+
+    def _record(self, name: str, items: List, elapsed: float, ok: bool):
+        if ok:
+            self.last_stats[name] = {'status': 'ok', 'items': len(items), 'elapsed': elapsed}
+        else:
+            self._record_failure(name, 'error', elapsed)
+
+    def _fetch_concurrent(self, providers, limit: int) -> List[List]:
+        """
+        Fan-out dos provedores em um pool limitado.
+        Respeita um prazo por provedor (NEWS_PROVIDER_TIMEOUT) e um prazo global
+        do ciclo (NEWS_CYCLE_DEADLINE); retorna apenas o que terminou a tempo,
+        na mesma ordem dos provedores para manter o dedup idêntico ao sequencial.
+        Provedores `cancellable` recebem um FetchTicket: descartado pelo prazo, o
+        provedor não grava estado; se ele já tinha gravado, os itens são aguardados
+        por mais NEWS_COMMIT_GRACE s e, passado isso, ficam para o próximo ciclo.
+        """
+        if not providers:
+            return []
+
+        per_provider = settings.NEWS_PROVIDER_TIMEOUT
+        cycle_start = time.monotonic()
+        cycle_deadline = cycle_start + settings.NEWS_CYCLE_DEADLINE
+        started_at: Dict[int, float] = {}
+        tickets = {i: FetchTicket() for i, p in enumerate(providers) if p.cancellable}
+        committed = []
+
+        def run(idx, provider):
+            started_at[idx] = time.monotonic()
+            return self._timed_fetch(provider, limit, tickets.get(idx))
+
+        executor = ThreadPoolExecutor(max_workers=max(1, settings.NEWS_FETCH_MAX_WORKERS), thread_name_prefix='news-fetch')
+        futures = {executor.submit(run, i, p): i for i, p in enumerate(providers)}
+        results: List[List] = [[] for _ in providers]
+        pending = set(futures)
+
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= cycle_deadline:
+                    break
+                # Próximo prazo relevante: o mais cedo entre o global e o de cada provedor em execução
+                next_deadline = cycle_deadline
+                for f in pending:
+                    idx = futures[f]
+                    if idx in started_at:
+                        next_deadline = min(next_deadline, started_at[idx] + per_provider)
+
+                done, pending = wait(pending, timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED)
+                for f in done:
+                    idx = futures[f]
+                    items, elapsed, ok = f.result()
+                    self._record(providers[idx].provider_name, items, elapsed, ok)
+                    results[idx] = items
+
+                now = time.monotonic()
+                for f in list(pending):
+                    idx = futures[f]
+                    if idx in started_at and now - started_at[idx] >= per_provider:
+                        pending.discard(f)
+                        self._expire(f, providers[idx], tickets.get(idx), now - started_at[idx], committed)
+        finally:
+            for f in pending:
+                idx = futures[f]
+                self._expire(f, providers[idx], tickets.get(idx),
+                             time.monotonic() - started_at.get(idx, cycle_start), committed)
+            # Não espera provedores travados: threads pendentes terminam em segundo plano
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # Já gravaram validadores/agendamento: os itens são esperados por NEWS_COMMIT_GRACE s;
+        # depois disso ficam com o provedor e saem no próximo fetch dele
+        grace_deadline = time.monotonic() + settings.NEWS_COMMIT_GRACE
+        for f in committed:
+            idx = futures[f]
+            try:
+                items, elapsed, ok = f.result(timeout=max(0.0, grace_deadline - time.monotonic()))
+            except FuturesTimeout:
+                if tickets[idx].expire():
+                    logger.warning(f"⏱️ {providers[idx].provider_name} gravou o estado mas não terminou em "
+                                   f"{settings.NEWS_COMMIT_GRACE:.0f}s; itens ficam para o próximo ciclo")
+                    self._record_failure(providers[idx].provider_name, 'timeout',
+                                         time.monotonic() - started_at.get(idx, cycle_start))
+                    continue
+                items, elapsed, ok = f.result()  # os itens já estavam saindo
+            self._record(providers[idx].provider_name, items, elapsed, ok)
+            results[idx] = items
+
+        return results
+
+    def _expire(self, future, provider, ticket: Optional[FetchTicket], elapsed: float, committed: List):
+        if ticket is not None and not ticket.abandon():
+            committed.append(future)
+            return
+        future.cancel()
+        self._timeout(provider, elapsed)
 
+    def _timeout(self, provider, elapsed: float):
+        logger.warning(f"⏱️ {provider.provider_name} excedeu o prazo ({elapsed:.1f}s). Resultado descartado.")
+        self._record_failure(provider.provider_name, 'timeout', elapsed)
+
+    def _record_failure(self, name: str, status: str, elapsed: float):
+        self.failure_counts[name] = self.failure_counts.get(name, 0) + 1
+        self.last_stats[name] = {'status': status, 'items': 0, 'elapsed': elapsed}
+
+    def _merge(self, results: List[List]) -> List:
+        all_news = []
+        hashes = set()
+        for items in results:
+            for item in items:
+                h = item.get_hash()
+                if h not in hashes:
+                    hashes.add(h)
+                    all_news.append(item)
+        # A mesma história sindicada por várias fontes vira um único candidato (uma só geração paga)
+        if settings.NEAR_DUP_ENABLED:
+            all_news = self.near_duplicates.collapse(all_news)
+        return all_news
+
+    def shutdown(self, wait: bool = True):
+        for provider in self.providers:
             try:
-                items = p.fetch(limit=items_per_source)
-                for item in items:
-                    h = item.get_hash()
-                    if h not in hashes:
-                        hashes.add(h)
-                        all_news.append(item)
+                provider.close(wait=wait)
             except Exception as e:
-                logger.error(f"Erro em {p.provider_name}: {e}")
-        return all_news
\ No newline at end of file
+                logger.error(f"Erro ao encerrar {provider.provider_name}: {e}")
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Tempo/estado da última execução e falhas acumuladas por provedor."""
+        return {
+            name: {**self.last_stats.get(name, {}), 'failures': self.failure_counts.get(name, 0)}
+            for name in self.failure_counts
+        }
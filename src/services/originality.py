@@ -0,0 +1,128 @@
+import logging
+import threading
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+
+from src.config.database import get_db
+from src.models.schema import PublishedArticle
+from src.services.near_duplicate import MinHasher
+
+logger = logging.getLogger(__name__)
+
+class OriginalityIndex:
+    """
+    Esboços MinHash de todo o histórico publicado, guardados numa matriz NumPy (N x num_perm).
+
+    Cada PublishedArticle tem seu esboço persistido em `content_sketch`; um artigo novo
+    é comparado com o histórico inteiro numa única operação vetorizada, sem re-tokenizar
+    nada. Usa unigramas, a mesma granularidade do Jaccard de `AIService._calculate_similarity`.
+    """
+    BACKFILL_BATCH = 500
+
+    def __init__(self, num_perm: int = 128, session_factory: Callable = get_db):
+        self.num_perm = num_perm
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=1, seed=7)
+        self.session_factory = session_factory
+        self._matrix = np.empty((0, num_perm), dtype=np.uint32)
+        self._size = 0
+        self._keys: List[str] = []
+        self._added_during_load: Optional[List[Tuple[str, np.ndarray]]] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loaded = False
+
+    def sketch(self, text: str) -> Optional[np.ndarray]:
+        return self.hasher.signature(text)
+
+    def _append(self, key: str, sig: np.ndarray):
+        if self._size == self._matrix.shape[0]:
+            grown = np.empty((max(1024, self._size * 2), self.num_perm), dtype=np.uint32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+        self._matrix[self._size] = sig
+        self._keys.append(key)
+        self._size += 1
+
+    def load(self):
+        """Carrega os esboços; artigos antigos sem esboço são calculados e gravados uma única vez."""
+        with self._lock:
+            # Publicações feitas enquanto o histórico é lido entram na matriz nova depois da troca
+            if self._added_during_load is None:
+                self._added_during_load = []
+        try:
+            loaded, pending = self._read_history()
+        except Exception:
+            with self._lock:
+                self._added_during_load = None
+            raise
+
+        with self._lock:
+            added, self._added_during_load = self._added_during_load or [], None
+            keys = {key for key, _ in loaded}
+            self._matrix = np.empty((0, self.num_perm), dtype=np.uint32)
+            self._size = 0
+            self._keys = []
+            for key, sig in loaded + [(k, s) for k, s in added if k not in keys]:
+                self._append(key, sig)
+            self.loaded = True
+        if pending:
+            logger.info(f"🧾 {len(pending)} esboço(s) de originalidade calculado(s) para artigos antigos")
+
+    def _read_history(self) -> Tuple[List[Tuple[str, np.ndarray]], List[Tuple[int, np.ndarray]]]:
+        db = self.session_factory()
+        pending: List[Tuple[int, np.ndarray]] = []
+        try:
+            rows = db.query(PublishedArticle.id, PublishedArticle.hash, PublishedArticle.content_sketch,
+                            PublishedArticle.full_content, PublishedArticle.content_snippet
+                            ).execution_options(full_scan_ok=True).yield_per(2000)
+            loaded = []
+            for row_id, h, blob, full_content, snippet in rows:
+                if blob is not None:
+                    sig = np.frombuffer(blob, dtype=np.uint32)
+                    if sig.size == self.num_perm:
+                        loaded.append((h or str(row_id), sig))
+                        continue
+                sig = self.sketch(full_content or snippet or '')
+                if sig is not None:
+                    loaded.append((h or str(row_id), sig))
+                    pending.append((row_id, sig))
+
+            for i in range(0, len(pending), self.BACKFILL_BATCH):
+                for row_id, sig in pending[i:i + self.BACKFILL_BATCH]:
+                    db.query(PublishedArticle).filter(PublishedArticle.id == row_id).update(
+                        {PublishedArticle.content_sketch: sig.tobytes()}, synchronize_session=False)
+                db.commit()
+        finally:
+            db.close()
+        return loaded, pending
+
+    def _ensure_loaded(self):
+        # Single-flight: com vários workers de geração, só o primeiro varre o histórico
+        if self.loaded:
+            return
+        with self._load_lock:
+            if not self.loaded:
+                self.load()
+
+    def max_similarity(self, text: str) -> Tuple[float, Optional[str]]:
+        """Maior similaridade estimada contra todo o histórico e o hash do artigo mais próximo."""
+        self._ensure_loaded()
+        sig = self.sketch(text)
+        with self._lock:
+            if sig is None or self._size == 0:
+                return 0.0, None
+            sims = (self._matrix[:self._size] == sig).mean(axis=1)
+            best = int(np.argmax(sims))
+            return float(sims[best]), self._keys[best]
+
+    def add(self, key: str, sig: Optional[np.ndarray]):
+        if sig is None:
+            return
+        with self._lock:
+            if self._added_during_load is not None:
+                self._added_during_load.append((key, sig))
+            if self.loaded:
+                self._append(key, sig)
+
+    def __len__(self):
+        return self._size
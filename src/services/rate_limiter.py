@@ -0,0 +1,225 @@
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+from sqlalchemy import update
+
+from src.config.database import get_db
+from src.config.settings_cache import SettingsCache, settings_cache
+from src.models.schema import RateLimitLog
+
+logger = logging.getLogger(__name__)
+
+# Limites padrão por serviço: (chamadas, janela em segundos).
+# Sobrescreva em SystemSettings com a chave `rate_limit_<serviço>` e valor "chamadas/segundos", ex.: "15/60".
+DEFAULT_LIMITS: Dict[str, Tuple[int, float]] = {
+    'gemini': (15, 60),
+    'vertex_imagen': (5, 60),
+    'youtube': (10, 60),
+    'gnews': (100, 86400),
+    'newsapi': (100, 86400),
+    'currents': (600, 86400),
+}
+
+SETTINGS_PREFIX = 'rate_limit_'
+
+def parse_limit(value: str) -> Optional[Tuple[int, float]]:
+    """Converte "15/60" em (15, 60.0). Retorna None para valores inválidos."""
+    try:
+        calls, period = value.split('/', 1)
+        calls, period = int(calls), float(period)
+        return (calls, period) if calls > 0 and period > 0 else None
+    except (ValueError, AttributeError):
+        return None
+
+class TokenBucket:
+    """Token bucket clássico: `capacity` tokens, reabastecido a `refill_rate` tokens/segundo."""
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Consome se houver saldo. Retorna 0 em caso de sucesso ou os segundos até haver saldo."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.refill_rate
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Bloqueia até haver capacidade (ou até `timeout` segundos). Retorna False se expirar."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+class RateLimiter:
+    """
+    Rate limiter por serviço externo com estado persistido em RateLimitLog.
+
+    Cada serviço tem um token bucket cujo saldo (tokens + instante da última
+    atualização) vive no banco, então o limite sobrevive a reinícios e é
+    compartilhado entre main.py e o dashboard. O consumo usa UPDATE condicional
+    pela coluna `version` (concorrência otimista). Se o banco estiver
+    indisponível, cai para um bucket local em memória.
+    """
+    _RETRY = -1.0
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, float]]] = None,
+                 session_factory: Callable = get_db, persistent: bool = True,
+                 cache: SettingsCache = settings_cache):
+        self.defaults = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.session_factory = session_factory
+        self.persistent = persistent
+        self.cache = cache
+        self._local: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._db_warned = False
+        self._invalid_warned: Dict[str, str] = {}
+        if persistent:
+            cache.subscribe(self._on_setting_changed)
+
+    # --- Configuração -------------------------------------------------------
+    def limit_for(self, service: str) -> Optional[Tuple[int, float]]:
+        """Limite do serviço: `rate_limit_<serviço>` no settings_cache ou o padrão."""
+        if self.persistent:
+            raw = self.cache.get(f'{SETTINGS_PREFIX}{service}')
+            if raw:
+                parsed = parse_limit(raw)
+                if parsed:
+                    return parsed
+                if self._invalid_warned.get(service) != raw:
+                    logger.warning(f"⚠️ Limite inválido em {SETTINGS_PREFIX}{service}: {raw!r}")
+                    self._invalid_warned[service] = raw
+        return self.defaults.get(service)
+
+    def _services(self):
+        services = set(self.defaults)
+        if self.persistent:
+            services |= {k[len(SETTINGS_PREFIX):] for k in self.cache.snapshot() if k.startswith(SETTINGS_PREFIX)}
+        return sorted(s for s in services if self.limit_for(s))
+
+    def _on_setting_changed(self, key: str, old: Optional[str], new: Optional[str]):
+        # Bucket local com capacidade antiga é descartado quando o limite muda
+        if key.startswith(SETTINGS_PREFIX):
+            with self._lock:
+                self._local.pop(key[len(SETTINGS_PREFIX):], None)
+
+    # --- Consumo ------------------------------------------------------------
+    def _local_bucket(self, service: str, calls: int, period: float) -> TokenBucket:
+        with self._lock:
+            if service not in self._local:
+                self._local[service] = TokenBucket(calls, calls / period)
+            return self._local[service]
+
+    def _try_consume_db(self, service: str, calls: int, period: float) -> Optional[float]:
+        """
+        Tenta consumir 1 token no bucket persistido.
+        Retorna 0 (sucesso), segundos até haver saldo, _RETRY (conflito de versão)
+        ou None se o banco não estiver disponível.
+        """
+        rate = calls / period
+        db = self.session_factory()
+        try:
+            now = datetime.now()
+            row = db.query(RateLimitLog).filter(RateLimitLog.service == service).order_by(RateLimitLog.id).first()
+            if row is None:
+                db.add(RateLimitLog(service=service, last_request=now, tokens=calls - 1, version=1))
+                db.commit()
+                return 0.0
+
+            tokens = calls if row.tokens is None else row.tokens
+            if row.last_request:
+                elapsed = max(0.0, (now - row.last_request).total_seconds())
+                tokens = min(float(calls), tokens + elapsed * rate)
+            if tokens < 1:
+                return (1 - tokens) / rate
+
+            result = db.execute(
+                update(RateLimitLog)
+                .where(RateLimitLog.id == row.id, RateLimitLog.version == row.version)
+                .values(tokens=tokens - 1, last_request=now, version=(row.version or 0) + 1)
+            )
+            db.commit()
+            return 0.0 if result.rowcount == 1 else self._RETRY
+        except Exception as e:
+            db.rollback()
+            if not self._db_warned:
+                logger.warning(f"⚠️ Rate limiter sem banco, usando buckets locais: {e}")
+                self._db_warned = True
+            return None
+        finally:
+            db.close()
+
+    def try_acquire(self, service: str) -> float:
+        """Não bloqueia. Retorna 0 se consumiu ou os segundos estimados até haver capacidade."""
+        limit = self.limit_for(service)
+        if limit is None:
+            return 0.0
+        calls, period = limit
+        while True:
+            wait = self._try_consume_db(service, calls, period) if self.persistent else None
+            if wait is None:
+                return self._local_bucket(service, calls, period).try_acquire()
+            if wait != self._RETRY:
+                return wait
+
+    def acquire(self, service: str, timeout: Optional[float] = None) -> bool:
+        """Bloqueia até haver capacidade no serviço (ou até `timeout`). Serviços sem limite passam direto."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(service)
+            if wait <= 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"⏳ Rate limit de {service}: sem capacidade em {timeout}s")
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def status(self) -> Dict[str, Dict]:
+        """Saldo atual por serviço (para o dashboard)."""
+        out = {}
+        db = self.session_factory()
+        try:
+            rows = {r.service: r for r in db.query(RateLimitLog).all()}
+        except Exception:
+            rows = {}
+        finally:
+            db.close()
+        now = datetime.now()
+        for service in self._services():
+            calls, period = self.limit_for(service)
+            row = rows.get(service)
+            tokens = float(calls)
+            if row is not None and row.tokens is not None and row.last_request:
+                elapsed = max(0.0, (now - row.last_request).total_seconds())
+                tokens = min(float(calls), row.tokens + elapsed * calls / period)
+            out[service] = {
+                'limit': f"{calls}/{int(period)}s",
+                'available': round(tokens, 2),
+                'last_request': row.last_request.isoformat() if row is not None and row.last_request else None,
+            }
+        return out
+
+rate_limiter = RateLimiter()
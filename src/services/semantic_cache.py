@@ -0,0 +1,205 @@
+import re
+import zlib
+import logging
+import threading
+import numpy as np
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.config.database import get_read_db
+from src.config.settings import settings
+from src.models.schema import CachedContent
+from src.services.cache_manager import CacheManager, cache_manager
+
+logger = logging.getLogger(__name__)
+
+# Estatística local -> coluna de CacheMetric (misses já são contados pelo cache exato)
+_METRIC_FIELDS = {'hits': 'semantic_hits', 'near_hits': 'near_hits'}
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+class HashedVectorizer:
+    """
+    Vetores esparsos de n-gramas de palavras (1..ngram) projetados por feature hashing
+    num espaço fixo de `dims` posições, com sinal (reduz o viés das colisões), tf
+    sublinear e norma L2 — o produto interno entre dois vetores é o cosseno.
+    """
+
+    def __init__(self, dims: int = 2048, ngram: int = 2):
+        self.dims = dims
+        self.ngram = ngram
+
+    def features(self, text: str) -> Counter:
+        words = _WORD_RE.findall(_TAG_RE.sub(' ', text or '').lower())
+        grams = Counter()
+        for n in range(1, self.ngram + 1):
+            for i in range(len(words) - n + 1):
+                grams[' '.join(words[i:i + n])] += 1
+        return grams
+
+    def vector(self, text: str) -> Optional[np.ndarray]:
+        grams = self.features(text)
+        if not grams:
+            return None
+        vec = np.zeros(self.dims, dtype=np.float32)
+        for gram, count in grams.items():
+            # crc32 é estável entre processos (ao contrário de hash())
+            h = zlib.crc32(gram.encode('utf-8'))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vec[h % self.dims] += sign * (1.0 + np.log(count))
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else None
+
+class SemanticCache:
+    """
+    Camada semântica na frente do cache de artigos: a mesma notícia com o resumo
+    levemente editado (outro provedor, outra agência) gera outro md5 e erraria o
+    cache exato. Aqui a entrada (título + resumo) vira um vetor de n-gramas e é
+    comparada, numa multiplicação matriz-vetor, com as entradas já em CachedContent.
+
+    - similaridade >= threshold: hit semântico, a notícia já foi gerada; o AIService pula o
+      item se aquele texto foi publicado/está na fila, senão o reaproveita (com nova checagem
+      de originalidade);
+    - near <= similaridade < threshold: near-hit, contado (para calibrar o limiar) mas gera;
+    - abaixo de near: miss.
+    """
+
+    def __init__(self, threshold: float = 0.85, near: float = 0.6, dims: int = 2048,
+                 session_factory: Callable = get_read_db, metrics: Optional[CacheManager] = None,
+                 cache_name: str = 'article'):
+        self.threshold = threshold
+        self.near = near
+        self.metrics = metrics
+        self.cache_name = cache_name
+        self.vectorizer = HashedVectorizer(dims=dims)
+        self.session_factory = session_factory
+        self._matrix = np.empty((0, dims), dtype=np.float32)
+        self._size = 0
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loaded = False
+        self.stats = {'hits': 0, 'near_hits': 0, 'misses': 0}
+
+    @staticmethod
+    def input_text(title: str, summary: str) -> str:
+        return f"{title or ''} {summary or ''}"
+
+    def _append(self, key: str, vec: np.ndarray):
+        if key in self._positions:
+            self._matrix[self._positions[key]] = vec
+            return
+        if self._size == self._matrix.shape[0]:
+            grown = np.zeros((max(256, self._size * 2), self.vectorizer.dims), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+        self._matrix[self._size] = vec
+        self._positions[key] = self._size
+        self._keys.append(key)
+        self._size += 1
+
+    def load(self):
+        """Vetoriza as entradas válidas e não expiradas de CachedContent."""
+        db = self.session_factory()
+        try:
+            rows = db.query(CachedContent.content_hash, CachedContent.input_title,
+                            CachedContent.input_content_snippet).filter(
+                CachedContent.expires_at > datetime.now(),
+                CachedContent.is_valid.is_(True),
+                CachedContent.input_content_snippet.isnot(None)
+            ).execution_options(full_scan_ok=True).yield_per(2000)
+            vectors = [(key, self.vectorizer.vector(self.input_text(title, snippet)))
+                       for key, title, snippet in rows]
+        finally:
+            db.close()
+
+        with self._lock:
+            self._matrix = np.zeros((0, self.vectorizer.dims), dtype=np.float32)
+            self._size = 0
+            self._keys = []
+            self._positions = {}
+            for key, vec in vectors:
+                if vec is not None:
+                    self._append(key, vec)
+            self.loaded = True
+        logger.info(f"🧠 Cache semântico carregado: {self._size} entrada(s)")
+
+    def _ensure_loaded(self):
+        # Single-flight: com vários workers de geração, só o primeiro lê a tabela
+        if self.loaded:
+            return
+        with self._load_lock:
+            if not self.loaded:
+                self.load()
+
+    def add(self, key: str, text: str):
+        vec = self.vectorizer.vector(text)
+        if vec is None:
+            return
+        self._ensure_loaded()
+        with self._lock:
+            self._append(key, vec)
+
+    def discard(self, key: str):
+        """Remove uma entrada que não existe mais na tabela (expirada ou evictada)."""
+        with self._lock:
+            pos = self._positions.pop(key, None)
+            if pos is None:
+                return
+            # Troca com a última linha para manter a matriz compacta
+            last = self._size - 1
+            if pos != last:
+                moved = self._keys[last]
+                self._matrix[pos] = self._matrix[last]
+                self._keys[pos] = moved
+                self._positions[moved] = pos
+            self._keys.pop()
+            self._size -= 1
+
+    def nearest(self, text: str) -> Tuple[Optional[str], float]:
+        """Entrada mais similar e o cosseno, sem contabilizar estatísticas."""
+        vec = self.vectorizer.vector(text)
+        if vec is None:
+            return None, 0.0
+        self._ensure_loaded()
+        with self._lock:
+            if not self._size:
+                return None, 0.0
+            sims = self._matrix[:self._size] @ vec
+            best = int(np.argmax(sims))
+            return self._keys[best], float(sims[best])
+
+    def match(self, text: str, exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """Retorna (chave, similaridade) se houver hit semântico; contabiliza hit/near-hit/miss."""
+        key, score = self.nearest(text)
+        if key is None or key == exclude:
+            self._bump('misses')
+            return None
+        if score >= self.threshold:
+            self._bump('hits')
+            return key, score
+        self._bump('near_hits' if score >= self.near else 'misses')
+        return None
+
+    def _bump(self, field: str):
+        with self._lock:
+            self.stats[field] += 1
+        if self.metrics is not None and field in _METRIC_FIELDS:
+            self.metrics.record(self.cache_name, _METRIC_FIELDS[field])
+
+    def report(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            size = self._size
+        lookups = sum(stats.values())
+        return {**stats, 'entries': size, 'threshold': self.threshold, 'near': self.near,
+                'hit_ratio': round(stats['hits'] / lookups, 4) if lookups else 0.0}
+
+    def __len__(self):
+        return self._size
+
+semantic_cache = SemanticCache(threshold=settings.SEMANTIC_CACHE_THRESHOLD, near=settings.SEMANTIC_CACHE_NEAR,
+                               metrics=cache_manager)
@@ -0,0 +1,212 @@
+import os
+import queue
+import logging
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from src.config.settings import settings
+from src.services.cache_manager import CacheManager, cache_manager
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    """Uma busca/geração em andamento para uma chave; as demais threads esperam o resultado."""
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+class TieredCache:
+    """
+    Cache em dois níveis: LRU em memória na frente da tabela SQLite do CacheManager.
+
+    - Leitura (read-through): memória -> tabela -> `compute()`; o que vem da tabela
+      ou do `compute()` é promovido para a memória.
+    - Escrita: write-through (padrão) grava na tabela antes de retornar; write-behind
+      grava em memória e deixa a tabela para a thread de escrita.
+    - Single-flight: chamadas simultâneas de `get_or_compute` para a mesma chave
+      disparam um único `compute()` (uma única chamada paga à API).
+    - Hits na memória são repassados em lote à tabela (`hit_count`/`last_hit`), para
+      que a evicção LRU/LFU e as métricas do CacheManager continuem corretas; o mesmo
+      lote descobre entradas invalidadas (`valid_column`) ou removidas na tabela e as
+      tira da memória.
+    """
+
+    def __init__(self, name: str, manager: CacheManager = None, capacity: int = 256,
+                 write_behind: bool = False):
+        self.name = name
+        self.manager = manager or cache_manager
+        self.policy = self.manager.policies[name]
+        self.capacity = capacity
+        self.write_behind = write_behind
+        self._memory: 'OrderedDict[str, Tuple[Dict, datetime]]' = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self.stats = {'memory_hits': 0, 'table_hits': 0, 'misses': 0, 'computes': 0, 'coalesced': 0}
+
+    # --- Memória -------------------------------------------------------------
+    def _memory_get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._memory.get(key)
+            if item is None:
+                return None
+            values, expires_at = item
+            if expires_at <= datetime.now():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+        if self.policy.valid_column and not values.get(self.policy.valid_column, True):
+            self.discard(key)
+            return None
+        if self.policy.file_column and not os.path.exists(values.get(self.policy.file_column) or ''):
+            self.discard(key)
+            return None
+        return values
+
+    def _remember(self, key: str, values: Dict):
+        expires_at = values.get('expires_at') or datetime.now() + self.policy.ttl
+        with self._lock:
+            self._memory[key] = (values, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.capacity:
+                self._memory.popitem(last=False)
+
+    def _bump(self, field: str):
+        with self._lock:
+            self.stats[field] += 1
+
+    def discard(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+
+    def invalidate(self, key: str):
+        """Invalida a entrada na tabela e na memória (outros processos percebem no próximo lote de hits)."""
+        self.manager.invalidate(self.name, key)
+        self.discard(key)
+
+    def __len__(self):
+        return len(self._memory)
+
+    # --- API -----------------------------------------------------------------
+    def get(self, key: str) -> Optional[Dict]:
+        values = self._memory_get(key)
+        if values is not None:
+            self._bump('memory_hits')
+            self.manager.count_hit(self.name)
+            self._enqueue(('touch', key, None))
+            return values
+
+        values = self.manager.lookup(self.name, key)
+        if values is None:
+            self._bump('misses')
+            return None
+        self._bump('table_hits')
+        self._remember(key, values)
+        return values
+
+    def put(self, key: str, values: Dict):
+        self._remember(key, dict(values))
+        if self.write_behind:
+            self._enqueue(('store', key, values))
+            return
+        try:
+            self.manager.store(self.name, key, **values)
+        except Exception as e:
+            # O valor já foi obtido (e pago); falha ao persistir não deve descartá-lo
+            logger.error(f"Erro ao gravar cache {self.name}: {e}")
+
+    def get_or_compute(self, key: str, compute: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+        """
+        Retorna a entrada da chave ou executa `compute()` uma única vez entre as threads
+        concorrentes. `compute` devolve as colunas a gravar, ou None (não é armazenado).
+        """
+        values = self.get(key)
+        if values is not None:
+            return values
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            self._bump('coalesced')
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            # Outra thread pode ter concluído entre o get() e o registro deste voo
+            values = self._memory_get(key)
+            if values is None:
+                self._bump('computes')
+                values = compute()
+                if values is not None:
+                    self.put(key, values)
+            flight.value = values
+            return values
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    # --- Escrita em segundo plano --------------------------------------------
+    def _enqueue(self, op):
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._drain, name=f'cache-writer-{self.name}', daemon=True)
+                self._writer.start()
+        self._queue.put(op)
+
+    def _drain(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._apply(batch)
+            except Exception as e:
+                logger.error(f"Erro na escrita em segundo plano do cache {self.name}: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _apply(self, batch):
+        stores = {}
+        touches = Counter()
+        for op, key, values in batch:
+            if op == 'store':
+                stores[key] = values  # última escrita vence
+            else:
+                touches[key] += 1
+        for key, values in stores.items():
+            self.manager.store(self.name, key, **values)
+        if touches:
+            # Entradas removidas ou invalidadas na tabela (ex.: por outro processo) saem da memória
+            for key in self.manager.touch(self.name, touches):
+                self.discard(key)
+
+    def flush(self):
+        """Bloqueia até a fila de escrita esvaziar."""
+        self._queue.join()
+
+article_cache = TieredCache('article', capacity=settings.CACHE_MEMORY_ITEMS,
+                            write_behind=settings.CACHE_WRITE_BEHIND)
+image_cache = TieredCache('image', capacity=settings.CACHE_MEMORY_ITEMS,
+                          write_behind=settings.CACHE_WRITE_BEHIND)
+video_cache = TieredCache('video', capacity=settings.CACHE_MEMORY_ITEMS,
+                          write_behind=settings.CACHE_WRITE_BEHIND)
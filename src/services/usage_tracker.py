@@ -0,0 +1,213 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+
+from src.config.database import get_db, retry_on_lock
+from src.config.settings import settings
+from src.config.settings_cache import settings_cache
+from src.models.schema import APIUsageLog, PublishedArticle
+
+logger = logging.getLogger(__name__)
+
+# Preço por 1M de tokens em USD: (entrada, saída).
+# Sobrescreva em SystemSettings com a chave `ai_price_<modelo>` e valor "entrada/saída", ex.: "0.075/0.30".
+DEFAULT_PRICES: Dict[str, Tuple[float, float]] = {
+    'gemini-pro': (0.50, 1.50),
+    'gemini-1.5-pro': (1.25, 5.00),
+    'gemini-1.5-flash': (0.075, 0.30),
+}
+
+PRICE_PREFIX = 'ai_price_'
+
+# Estados do orçamento
+BUDGET_OK = 'ok'
+BUDGET_DEGRADE = 'degrade'  # Pro -> Flash
+BUDGET_PAUSE = 'pause'      # sem novas gerações até o dia/mês virar
+
+def parse_price(value: str) -> Optional[Tuple[float, float]]:
+    """Converte "0.5/1.5" em (0.5, 1.5). Retorna None para valores inválidos."""
+    try:
+        prompt, response = value.split('/', 1)
+        prompt, response = float(prompt), float(response)
+        return (prompt, response) if prompt >= 0 and response >= 0 else None
+    except (ValueError, AttributeError):
+        return None
+
+def usage_from_response(response) -> Tuple[int, int]:
+    """Tokens (entrada, saída) do `usage_metadata` da resposta do Gemini, sem chamada extra."""
+    meta = getattr(response, 'usage_metadata', None)
+    if meta is None:
+        return 0, 0
+    try:
+        return int(getattr(meta, 'prompt_token_count', 0) or 0), int(getattr(meta, 'candidates_token_count', 0) or 0)
+    except (TypeError, ValueError):
+        return 0, 0
+
+def _day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+class UsageTracker:
+    """
+    Contabilidade de uso das APIs pagas em APIUsageLog: uma linha por dia/serviço/modelo,
+    incrementada a cada chamada com os tokens informados pela própria resposta.
+
+    O mês é a soma das linhas diárias. O orçamento (diário e mensal, em USD) é
+    comparado com o gasto: a partir de `AI_BUDGET_DEGRADE_AT` do limite a geração
+    passa do Pro para o Flash; ao atingir o limite, novas gerações são pausadas.
+    """
+
+    def __init__(self, session_factory: Callable = get_db, clock: Callable[[], datetime] = datetime.now):
+        self.session_factory = session_factory
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._last_state = BUDGET_OK
+
+    # --- Preço ----------------------------------------------------------------
+    def price_for(self, model: str) -> Tuple[float, float]:
+        override = parse_price(settings_cache.get_str(f'{PRICE_PREFIX}{model}', ''))
+        return override or DEFAULT_PRICES.get(model, (0.0, 0.0))
+
+    def cost(self, model: str, prompt_tokens: int, response_tokens: int) -> float:
+        price_in, price_out = self.price_for(model)
+        return (prompt_tokens * price_in + response_tokens * price_out) / 1_000_000
+
+    # --- Registro -------------------------------------------------------------
+    @retry_on_lock
+    def _upsert(self, service: str, model: str, day: datetime, calls: int,
+                prompt_tokens: int, response_tokens: int, cost: float):
+        """
+        Incremento atômico (UPDATE ... SET calls = calls + :n) na linha do dia; se ela ainda
+        não existe, INSERT. Dois processos/threads criando a mesma linha: quem perde recebe
+        IntegrityError do índice único e refaz o UPDATE.
+        """
+        key = (APIUsageLog.date == day, APIUsageLog.service == service, APIUsageLog.model == model)
+        increment = update(APIUsageLog).where(*key).values(
+            calls=func.coalesce(APIUsageLog.calls, 0) + calls,
+            prompt_tokens=func.coalesce(APIUsageLog.prompt_tokens, 0) + prompt_tokens,
+            response_tokens=func.coalesce(APIUsageLog.response_tokens, 0) + response_tokens,
+            tokens_used=func.coalesce(APIUsageLog.tokens_used, 0) + prompt_tokens + response_tokens,
+            cost_usd=func.coalesce(APIUsageLog.cost_usd, 0.0) + cost,
+        ).execution_options(synchronize_session=False)
+        db = self.session_factory()
+        try:
+            if db.execute(increment).rowcount == 0:
+                db.add(APIUsageLog(service=service, model=model, date=day, calls=calls,
+                                   prompt_tokens=prompt_tokens, response_tokens=response_tokens,
+                                   tokens_used=prompt_tokens + response_tokens, cost_usd=cost))
+                try:
+                    db.flush()
+                except IntegrityError:
+                    db.rollback()
+                    db.execute(increment)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def record(self, service: str, model: Optional[str] = None, prompt_tokens: int = 0,
+               response_tokens: int = 0, calls: int = 1) -> float:
+        """Soma uma chamada ao dia corrente. Falhas de gravação são registradas, nunca propagadas."""
+        model = model or service
+        cost = self.cost(model, prompt_tokens, response_tokens)
+        try:
+            self._upsert(service, model, _day(self.clock()), calls, prompt_tokens, response_tokens, cost)
+        except Exception as e:
+            logger.error(f"Erro ao registrar uso de {service}/{model}: {e}")
+        return cost
+
+    def calls_today(self, service: str) -> int:
+        """Chamadas de hoje ao serviço (todas as linhas/modelos), para cotas diárias como a do YouTube."""
+        db = self.session_factory()
+        try:
+            calls = db.query(func.sum(APIUsageLog.calls)).filter(
+                APIUsageLog.date == _day(self.clock()), APIUsageLog.service == service).scalar()
+        finally:
+            db.close()
+        return int(calls or 0)
+
+    # --- Orçamento ------------------------------------------------------------
+    def spend(self) -> Tuple[float, float]:
+        """Gasto em USD (hoje, mês corrente)."""
+        today = _day(self.clock())
+        month_start = today.replace(day=1)
+        db = self.session_factory()
+        try:
+            month = db.query(func.sum(APIUsageLog.cost_usd)).filter(APIUsageLog.date >= month_start).scalar()
+            day = db.query(func.sum(APIUsageLog.cost_usd)).filter(APIUsageLog.date >= today).scalar()
+        finally:
+            db.close()
+        return float(day or 0.0), float(month or 0.0)
+
+    @staticmethod
+    def budgets() -> Tuple[float, float, float]:
+        """(diário, mensal, fração de degradação); 0 = sem limite. Ajustáveis em runtime via SystemSettings."""
+        return (settings_cache.get_float('ai_daily_budget_usd', settings.AI_DAILY_BUDGET_USD),
+                settings_cache.get_float('ai_monthly_budget_usd', settings.AI_MONTHLY_BUDGET_USD),
+                settings_cache.get_float('ai_budget_degrade_at', settings.AI_BUDGET_DEGRADE_AT))
+
+    def budget_state(self) -> str:
+        daily, monthly, degrade_at = self.budgets()
+        if not daily and not monthly:
+            return BUDGET_OK
+        try:
+            day, month = self.spend()
+        except Exception as e:
+            logger.error(f"Erro ao consultar gasto de IA: {e}")
+            return BUDGET_OK
+        ratio = max(day / daily if daily else 0.0, month / monthly if monthly else 0.0)
+        state = BUDGET_PAUSE if ratio >= 1 else BUDGET_DEGRADE if ratio >= degrade_at else BUDGET_OK
+
+        with self._lock:
+            changed, self._last_state = state != self._last_state, state
+        if changed:
+            icon = {BUDGET_OK: '✅', BUDGET_DEGRADE: '⚠️', BUDGET_PAUSE: '⛔'}[state]
+            logger.warning(f"{icon} Orçamento de IA: {state} (hoje US$ {day:.4f}, mês US$ {month:.4f})")
+        return state
+
+    # --- Relatório ------------------------------------------------------------
+    def report(self, days: int = 30) -> Dict:
+        """Linhas diárias, totais do mês por modelo, estado do orçamento e custo por artigo publicado."""
+        today = _day(self.clock())
+        since = today - timedelta(days=days - 1)
+        month_start = today.replace(day=1)
+        fields = (APIUsageLog.calls, APIUsageLog.prompt_tokens, APIUsageLog.response_tokens, APIUsageLog.cost_usd)
+        db = self.session_factory()
+        try:
+            daily = db.query(APIUsageLog.date, APIUsageLog.service, APIUsageLog.model, *fields).filter(
+                APIUsageLog.date >= since).order_by(APIUsageLog.date).all()
+            monthly = db.query(APIUsageLog.service, APIUsageLog.model, *(func.sum(f) for f in fields)).filter(
+                APIUsageLog.date >= month_start).group_by(APIUsageLog.service, APIUsageLog.model).all()
+            published = db.query(func.count(PublishedArticle.id)).filter(
+                PublishedArticle.published_date >= since).scalar() or 0
+        finally:
+            db.close()
+
+        def row(values):
+            calls, prompt, response, cost = values
+            return {'calls': int(calls or 0), 'prompt_tokens': int(prompt or 0),
+                    'response_tokens': int(response or 0), 'cost_usd': round(float(cost or 0.0), 6)}
+
+        period_cost = sum(float(r[-1] or 0.0) for r in daily)
+        daily_budget, monthly_budget, degrade_at = self.budgets()
+        day_spend = sum(float(r[-1] or 0.0) for r in daily if r[0] >= today)
+        month_spend = sum(float(r[-1] or 0.0) for r in monthly)
+        return {
+            'days': days,
+            'daily': [{'date': r[0].strftime('%Y-%m-%d'), 'service': r[1], 'model': r[2], **row(r[3:])} for r in daily],
+            'month': {'start': month_start.strftime('%Y-%m-%d'),
+                      'by_model': [{'service': r[0], 'model': r[1], **row(r[2:])} for r in monthly],
+                      'cost_usd': round(month_spend, 6)},
+            'period_cost_usd': round(period_cost, 6),
+            'published_articles': published,
+            'cost_per_article_usd': round(period_cost / published, 6) if published else None,
+            'budget': {'daily_usd': daily_budget, 'monthly_usd': monthly_budget, 'degrade_at': degrade_at,
+                       'today_usd': round(day_spend, 6), 'state': self.budget_state()},
+        }
+
+usage_tracker = UsageTracker()
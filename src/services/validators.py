@@ -190,36 +190,27 @@ def requires_api_key(provider_key: str):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            from src.config.database import get_db
-            from src.models.schema import SystemSettings
-            
-            db = get_db()
-            try:
-                setting = db.query(SystemSettings).filter(
-                    SystemSettings.key == provider_key
-                ).first()
-                
-                api_key = setting.value if setting else None
-                
-                if not api_key or api_key.strip() == "":
-                    return jsonify({
-                        'success': False,
-                        'error': f'API key not configured: {provider_key}',
-                        'blocked': True
-                    }), 403
-                
-                # Validate format
-                is_valid, error = InputValidator.validate_api_key(api_key)
-                if not is_valid:
-                    return jsonify({
-                        'success': False,
-                        'error': error,
-                        'blocked': True
-                    }), 403
-                
-                return f(*args, **kwargs)
-            finally:
-                db.close()
+            from src.config.settings_cache import settings_cache
+
+            api_key = settings_cache.get(provider_key)
+
+            if not api_key or api_key.strip() == "":
+                return jsonify({
+                    'success': False,
+                    'error': f'API key not configured: {provider_key}',
+                    'blocked': True
+                }), 403
+
+            # Validate format
+            is_valid, error = InputValidator.validate_api_key(api_key)
+            if not is_valid:
+                return jsonify({
+                    'success': False,
+                    'error': error,
+                    'blocked': True
+                }), 403
+
+            return f(*args, **kwargs)
         
         return decorated_function
     return decorator
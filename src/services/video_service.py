@@ -1,40 +1,264 @@
+import re
+import sys
+import hashlib
 import logging
-from datetime import datetime
-from googleapiclient.discovery import build
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
 from src.config.settings import settings
-from src.config.database import get_db
-from src.models.schema import YouTubeCache
+from src.config.settings_cache import settings_cache
+from src.services.client_registry import client_registry
+from src.services.tiered_cache import TieredCache, video_cache
+from src.services.rate_limiter import rate_limiter
+from src.services.usage_tracker import UsageTracker, usage_tracker
 
 logger = logging.getLogger(__name__)
 
-class VideoService:
-    def __init__(self):
-        key = settings.YOUTUBE_API_KEY
-        self.client = build('youtube', 'v3', developerKey=key) if key else None
-
-    def find_video(self, title: str, keywords: list = None) -> str:
-        if not settings.ENABLE_YOUTUBE_EMBED or not self.client: return None
-        
-        import hashlib
-        query = f"{title} {' '.join(keywords[:2] if keywords else [])}"
-        qhash = hashlib.md5(query.encode()).hexdigest()
-        
-        db = get_db()
-        cached = db.query(YouTubeCache).filter(YouTubeCache.query_hash == qhash).first()
-        if cached:
-            db.close()
-            return cached.video_url
+# Palavras que não mudam o resultado da busca (pt/en); ficam fora da chave e da consulta
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de do da dos das em no na nos nas por pelo pela pelos pelas para pra com sem
+sob sobre entre ate até e ou mas que se como mais menos muito muita ja já nao não sim ao aos à às seu sua
+seus suas este esta isto esse essa isso ele ela eles elas the an and or of to in on at for with by from
+is are was be this that these those how what why new novo nova
+""".split())
+
+MAX_QUERY_TERMS = 8
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+def _fold(text: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFKD', text.lower()) if not unicodedata.combining(c))
+
+def normalize_query(title: str, keywords: Optional[Sequence[str]] = None) -> str:
+    """
+    Forma canônica da busca: minúsculas, sem acentos, pontuação e stopwords, termos
+    únicos e em ordem alfabética. "IA do Google: novo Gemini" e "gemini google IA"
+    viram a mesma consulta (e a mesma linha no cache). As palavras-chave entram
+    antes do título no corte de MAX_QUERY_TERMS.
+    """
+    terms: List[str] = []
+    for text in list(keywords or [])[:2] + [title or '']:
+        for word in _WORD_RE.findall(_fold(str(text))):
+            if word not in STOPWORDS and len(word) > 1 and word not in terms:
+                terms.append(word)
+    return ' '.join(sorted(terms[:MAX_QUERY_TERMS]))
+
+def query_key(query: str) -> str:
+    return hashlib.md5(query.encode()).hexdigest()
+
+def _build_youtube():
+    # Import tardio: o discovery client só é montado na primeira busca
+    from googleapiclient.discovery import build
+
+    key = settings_cache.get_str('youtube_api_key', settings.YOUTUBE_API_KEY)
+    return build('youtube', 'v3', developerKey=key, cache_discovery=False) if key else None
+
+client_registry.register('youtube', _build_youtube, settings_keys=('youtube_api_key',))
 
+class _Batcher:
+    """
+    Junta as buscas pedidas dentro de `window` segundos (ou até `size`) num único lote.
+    Pedidos repetidos da mesma chave enquanto ela está pendente recebem o mesmo Future.
+    """
+
+    def __init__(self, run, window: float, size: int):
+        self.run = run
+        self.window = window
+        self.size = max(1, size)
+        self._queued: 'OrderedDict[str, str]' = OrderedDict()
+        self._futures: Dict[str, Future] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, query: str) -> Future:
+        batch = None
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                return future
+            future = self._futures[key] = Future()
+            self._queued[key] = query
+            if len(self._queued) >= self.size:
+                batch = self._take()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._dispatch(batch)
+        return future
+
+    def _take(self) -> 'OrderedDict[str, str]':
+        batch, self._queued = self._queued, OrderedDict()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: 'OrderedDict[str, str]'):
         try:
-            req = self.client.search().list(part="snippet", q=query, type="video", maxResults=1, videoEmbeddable="true")
-            res = req.execute()
-            if not res['items']: return None
-            
-            vid_url = f"https://www.youtube.com/watch?v={res['items'][0]['id']['videoId']}"
-            db.add(YouTubeCache(query_hash=qhash, video_url=vid_url, created_at=datetime.now()))
-            db.commit()
-            return vid_url
-        except Exception:
+            results = self.run(batch)
+        except Exception as e:
+            logger.error(f"Erro no lote de buscas do YouTube: {e}")
+            results = {}
+        with self._lock:
+            futures = [(key, self._futures.pop(key)) for key in batch]
+        for key, future in futures:
+            future.set_result(results.get(key))
+
+class VideoService:
+    """
+    Busca de vídeos no YouTube com economia de cota (100 unidades por `search.list`).
+
+    - Consultas normalizadas (`normalize_query`) antes do hash: variações de caixa,
+      stopwords e ordem das palavras-chave caem na mesma entrada do cache.
+    - Resultado vazio também é cacheado, com validade curta (`YOUTUBE_NEGATIVE_TTL_HOURS`),
+      para a mesma busca sem vídeo não gastar cota a cada ciclo.
+    - As buscas do ciclo que chegam juntas (`YOUTUBE_BATCH_WINDOW`) saem num único
+      lote HTTP e só até a cota diária restante, contada em APIUsageLog.
+    """
+    SERVICE = 'youtube'
+    MODEL = 'search.list'
+
+    def __init__(self, cache: TieredCache = video_cache, usage: UsageTracker = usage_tracker,
+                 client=None, window: float = settings.YOUTUBE_BATCH_WINDOW, batch_size: int = settings.YOUTUBE_BATCH_SIZE):
+        self.cache = cache
+        self.usage = usage
+        self._client = client
+        self._batcher = _Batcher(self._run_batch, window, batch_size)
+        self._quota_warned = False
+        # Buscas já autorizadas mas ainda não gravadas em APIUsageLog (lotes em voo)
+        self._reserved = 0
+        self._quota_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is not None:
+            return self._client
+        return client_registry.get_optional('youtube')
+
+    def _enabled(self) -> bool:
+        return settings_cache.get_bool('enable_youtube_embed', settings.ENABLE_YOUTUBE_EMBED) and bool(self.client)
+
+    # --- API ------------------------------------------------------------------
+    def find_video(self, title: str, keywords: list = None) -> Optional[str]:
+        if not self._enabled(): return None
+        future = self._lookup(title, keywords)
+        entry = future.result() if isinstance(future, Future) else future
+        return entry['video_url'] if entry else None
+
+    def find_videos(self, requests: Iterable[Tuple[str, Optional[list]]]) -> List[Optional[str]]:
+        """
+        Busca uma lista já pronta de (título, palavras-chave) de uma vez, sem esperar a janela.
+        O ciclo não passa por aqui: os workers de mídia chamam `find_video` e as buscas
+        concorrentes se juntam pela janela do lote.
+        """
+        if not self._enabled():
+            return [None for _ in requests]
+        pending = [self._lookup(title, keywords) for title, keywords in requests]
+        self._batcher.flush()
+        entries = [p.result() if isinstance(p, Future) else p for p in pending]
+        return [e['video_url'] if e else None for e in entries]
+
+    def _lookup(self, title: str, keywords: Optional[list]):
+        """Entrada do cache (dict, com `video_url` None se negativa) ou o Future da busca no lote."""
+        query = normalize_query(title, keywords)
+        if not query:
             return None
+        key = query_key(query)
+        entry = self.cache.get(key)
+        if entry is not None:
+            return entry
+        return self._batcher.submit(key, query)
+
+    # --- Cota -----------------------------------------------------------------
+    def quota_left(self) -> int:
+        """Buscas que ainda cabem na cota diária (`youtube_daily_quota` em SystemSettings ou YOUTUBE_DAILY_QUOTA)."""
+        quota = settings_cache.get_int('youtube_daily_quota', settings.YOUTUBE_DAILY_QUOTA)
+        if quota <= 0:
+            return sys.maxsize
+        try:
+            used = self.usage.calls_today(self.SERVICE) * settings.YOUTUBE_SEARCH_COST
+        except Exception as e:
+            logger.error(f"Erro ao consultar cota do YouTube: {e}")
+            return 0
+        return max(0, (quota - used) // settings.YOUTUBE_SEARCH_COST)
+
+    # --- Lote -----------------------------------------------------------------
+    def _reserve(self, wanted: int) -> int:
+        """
+        Reserva até `wanted` buscas da cota restante. Dois lotes simultâneos (janela +
+        tamanho) não podem gastar as mesmas unidades: a cota só é lida e reservada sob lock.
+        """
+        with self._quota_lock:
+            granted = max(0, min(wanted, self.quota_left() - self._reserved))
+            self._reserved += granted
+            return granted
+
+    def _release(self, reserved: int):
+        with self._quota_lock:
+            self._reserved -= reserved
+
+    def _run_batch(self, queries: 'OrderedDict[str, str]') -> Dict[str, Optional[Dict]]:
+        allowed = self._reserve(len(queries))
+        try:
+            return self._search(list(queries.items())[:allowed], skipped=len(queries) - allowed)
         finally:
-            db.close()
\ No newline at end of file
+            self._release(allowed)
+
+    def _search(self, todo: List[Tuple[str, str]], skipped: int) -> Dict[str, Optional[Dict]]:
+        if skipped:
+            if not self._quota_warned:
+                logger.warning(f"⛔ Cota diária do YouTube esgotada: {skipped} busca(s) sem vídeo hoje")
+            self._quota_warned = True
+        elif todo:
+            self._quota_warned = False
+        if not todo:
+            return {}
+
+        client = self.client
+        responses: Dict[str, Tuple[Optional[dict], Optional[Exception]]] = {}
+
+        def collect(request_id, response, exception):
+            responses[request_id] = (response, exception)
+
+        batch = client.new_batch_http_request(callback=collect)
+        for key, query in todo:
+            rate_limiter.acquire('youtube')
+            batch.add(client.search().list(part="snippet", q=query, type="video", maxResults=1,
+                                           videoEmbeddable="true"), request_id=key)
+        try:
+            with client_registry.first_call('youtube'):
+                batch.execute()
+        finally:
+            # A cota é cobrada por requisição enviada, inclusive as que falham
+            self.usage.record(self.SERVICE, self.MODEL, calls=len(todo))
+
+        results = {}
+        negative_until = datetime.now() + timedelta(hours=settings.YOUTUBE_NEGATIVE_TTL_HOURS)
+        for key, query in todo:
+            response, error = responses.get(key, (None, None))
+            if error is not None or response is None:
+                # Falha transitória: não vira cache negativo
+                logger.error(f"Erro na busca do YouTube '{query}': {error}")
+                continue
+            items = response.get('items') or []
+            if items:
+                entry = {'video_url': f"https://www.youtube.com/watch?v={items[0]['id']['videoId']}",
+                         'query_text': query[:500], 'video_title': items[0].get('snippet', {}).get('title')}
+            else:
+                entry = {'video_url': None, 'query_text': query[:500], 'video_title': None,
+                         'expires_at': negative_until}
+            self.cache.put(key, entry)
+            results[key] = entry
+        logger.info(f"🎬 Lote do YouTube: {len(todo)} busca(s), {sum(1 for e in results.values() if e['video_url'])} com vídeo")
+        return results
@@ -0,0 +1,199 @@
+import os
+import re
+import time
+import random
+import logging
+import mimetypes
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.config.settings import settings
+from src.config.settings_cache import settings_cache
+from src.services.client_registry import client_registry
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "S1M0N-Publisher/1.0 (+wordpress)"
+# Status em que um post já criado pode estar; a busca por slug precisa de todos
+POST_STATUSES = 'publish,future,draft,pending,private'
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+class WordPressError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code is None or self.status_code in RETRYABLE_STATUS
+
+@dataclass
+class WPPost:
+    key: str  # PublishedArticle.hash: chave de idempotência
+    title: str
+    content: str
+    status: str = 'publish'
+    excerpt: str = ''
+    image_path: Optional[str] = None
+
+@dataclass
+class WPResult:
+    key: str
+    ok: bool
+    post_id: Optional[int] = None
+    url: Optional[str] = None
+    media_id: Optional[int] = None
+    created: bool = False  # False: o post já existia (nova tentativa ou publicação repetida)
+    error: Optional[str] = None
+
+def slugify(text: str, limit: int = 60) -> str:
+    folded = unicodedata.normalize('NFKD', text.lower()).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '-', folded).strip('-')[:limit].rstrip('-')
+
+def post_slug(post: WPPost) -> str:
+    """Slug legível e determinístico: o sufixo do hash faz dele a chave de idempotência do post."""
+    base = slugify(post.title)
+    return f"{base}-{post.key[:8]}" if base else f"s1m0n-{post.key[:8]}"
+
+def media_slug(key: str) -> str:
+    return f"s1m0n-{key}"
+
+class WordPressPublisher:
+    """
+    Publicação pela REST API do WordPress (`/wp-json/wp/v2`), com Senha de Aplicação.
+
+    - Uma requests.Session com keep-alive e pool de `pool_size` conexões; GETs têm
+      novas tentativas no adapter (urllib3).
+    - POSTs não são repetidos às cegas: cada tentativa primeiro procura o post pelo
+      slug determinístico (título + hash do artigo). Se a tentativa anterior chegou a
+      criar o post (ex.: timeout na resposta), ele é reaproveitado em vez de duplicado.
+      A mídia segue a mesma regra com o slug `s1m0n-<hash>`.
+    - `publish_many` publica em paralelo com no máximo `concurrency` artigos em voo;
+      cada um sobe a imagem e cria o post, sobrepondo-se aos demais.
+    """
+
+    def __init__(self, base_url: str, username: Optional[str] = None, password: Optional[str] = None,
+                 timeout: float = settings.WP_TIMEOUT, max_retries: int = settings.WP_MAX_RETRIES,
+                 pool_size: int = settings.WP_CONCURRENCY, retry_base_delay: float = 1.0):
+        self.api = base_url.rstrip('/') + '/wp-json/wp/v2'
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.pool_size = max(1, pool_size)
+        self.retry_base_delay = retry_base_delay
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size,
+                              max_retries=Retry(total=max_retries, backoff_factor=0.5, status_forcelist=RETRYABLE_STATUS,
+                                                allowed_methods=frozenset({'GET'}), raise_on_status=False))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+        if username and password:
+            self.session.auth = (username, password)
+
+    # --- HTTP -----------------------------------------------------------------
+    def _request(self, method: str, path: str, **kwargs):
+        try:
+            resp = self.session.request(method, f"{self.api}/{path}", timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise WordPressError(f"{method} {path}: {e}") from e
+        if resp.status_code >= 400:
+            raise WordPressError(f"{method} {path}: HTTP {resp.status_code} {resp.text[:200]}", resp.status_code)
+        return resp.json()
+
+    def _find(self, collection: str, slug: str, **params) -> Optional[Dict]:
+        found = self._request('GET', collection, params={'slug': slug, **params})
+        return found[0] if found else None
+
+    def _retrying(self, label: str, action):
+        attempt = 0
+        while True:
+            try:
+                return action()
+            except WordPressError as e:
+                if attempt >= self.max_retries or not e.retryable:
+                    raise
+                delay = random.uniform(0, self.retry_base_delay * 2 ** attempt)
+                attempt += 1
+                logger.warning(f"🔁 WordPress {label}: {e}; tentativa {attempt}/{self.max_retries} em {delay:.1f}s")
+                time.sleep(delay)
+
+    # --- Mídia ----------------------------------------------------------------
+    def upload_media(self, key: str, path: str) -> int:
+        """Sobe a imagem (ou reaproveita a já enviada para o mesmo artigo) e retorna o id da mídia."""
+        slug = media_slug(key)
+
+        def attempt():
+            existing = self._find('media', slug)
+            if existing:
+                return existing['id']
+            with open(path, 'rb') as f:
+                data = f.read()
+            ext = os.path.splitext(path)[1] or '.png'
+            headers = {'Content-Disposition': f'attachment; filename="{slug}{ext}"',
+                       'Content-Type': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+                       'Idempotency-Key': slug}
+            return self._request('POST', 'media', data=data, headers=headers)['id']
+
+        return self._retrying(f"mídia {slug}", attempt)
+
+    def set_featured_image(self, post_id: int, key: str, path: str) -> int:
+        """Anexa a imagem a um post já publicado (imagem que ficou pronta depois do post)."""
+        media_id = self.upload_media(key, path)
+        self._retrying(f"post {post_id}", lambda: self._request('POST', f'posts/{post_id}',
+                                                                  json={'featured_media': media_id}))
+        return media_id
+
+    # --- Posts ----------------------------------------------------------------
+    def publish(self, post: WPPost) -> WPResult:
+        slug = post_slug(post)
+        result = WPResult(key=post.key, ok=False)
+        try:
+            if post.image_path and os.path.exists(post.image_path):
+                result.media_id = self.upload_media(post.key, post.image_path)
+
+            def attempt():
+                existing = self._find('posts', slug, status=POST_STATUSES)
+                if existing:
+                    return existing, False
+                payload = {'title': post.title, 'content': post.content, 'status': post.status,
+                           'slug': slug, 'excerpt': post.excerpt}
+                if result.media_id:
+                    payload['featured_media'] = result.media_id
+                return self._request('POST', 'posts', json=payload, headers={'Idempotency-Key': post.key}), True
+
+            created, result.created = self._retrying(f"post {slug}", attempt)
+            result.ok, result.post_id, result.url = True, created['id'], created.get('link')
+            if not result.created:
+                logger.info(f"♻️ Post já existia no WordPress, reaproveitado: {slug}")
+        except (WordPressError, OSError) as e:
+            result.error = str(e)
+            logger.error(f"Erro ao publicar '{post.title[:50]}' no WordPress: {e}")
+        return result
+
+    def publish_many(self, posts: Sequence[WPPost], concurrency: Optional[int] = None) -> List[WPResult]:
+        """Publica todos, no máximo `concurrency` em voo; resultados na ordem de `posts`."""
+        if not posts:
+            return []
+        workers = max(1, min(concurrency or self.pool_size, len(posts)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wp-publish') as executor:
+            return list(executor.map(self.publish, posts))
+
+    def close(self):
+        self.session.close()
+
+def _build_wordpress() -> Optional[WordPressPublisher]:
+    url = settings_cache.get_str('wordpress_url', settings.WORDPRESS_URL or '')
+    if not url:
+        return None
+    return WordPressPublisher(url, settings_cache.get_str('wordpress_username', settings.WORDPRESS_USERNAME or ''),
+                              settings_cache.get_str('wordpress_password', settings.WORDPRESS_PASSWORD or ''))
+
+client_registry.register('wordpress', _build_wordpress,
+                         settings_keys=('wordpress_url', 'wordpress_username', 'wordpress_password'))
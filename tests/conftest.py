@@ -0,0 +1,77 @@
+"""
+Auditoria de planos de consulta: todo teste falha se alguma consulta varrer uma tabela grande.
+Banco da sessão: os singletons de módulo (settings_cache, rate_limiter, usage_tracker...) usam
+um SQLite temporário em vez do DATABASE_URI real.
+Fixtures db_engine/session_factory: banco isolado por teste, migrado como em produção.
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from src.config.query_audit import QueryPlanAuditor
+
+_SESSION_DB_DIR = None
+
+
+def pytest_configure(config):
+    global _SESSION_DB_DIR
+    config.addinivalue_line(
+        "markers", "allow_full_scan: o teste provoca full scans de propósito (não auditar)"
+    )
+    # Antes da coleta: os módulos de teste importam src.config.database, que cria o engine no import.
+    # Atribuído direto em settings porque o .env é carregado com override=True.
+    _SESSION_DB_DIR = tempfile.mkdtemp(prefix='s1m0n-tests-')
+    from src.config.settings import settings
+    settings.DATABASE_URI = f"sqlite:///{os.path.join(_SESSION_DB_DIR, 'session.db')}"
+
+
+def pytest_unconfigure(config):
+    if _SESSION_DB_DIR:
+        shutil.rmtree(_SESSION_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _session_database():
+    """Schema real (create_all + migrações) no banco temporário da sessão."""
+    from src.config import database
+    from src.models.migrations import run_migrations
+    run_migrations(database.engine)
+    yield
+    database.engine.dispose()
+    database.read_engine.dispose()
+
+
+@pytest.fixture(scope='session')
+def _query_auditor():
+    auditor = QueryPlanAuditor().install()
+    yield auditor
+    auditor.uninstall()
+
+
+@pytest.fixture(autouse=True)
+def query_plan_audit(request, _query_auditor):
+    _query_auditor.reset()
+    yield _query_auditor
+    if request.node.get_closest_marker('allow_full_scan'):
+        return
+    if _query_auditor.findings:
+        pytest.fail(_query_auditor.report(), pytrace=False)
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """SQLite isolado por teste com o schema real (create_all + migrações)."""
+    from src.config.database import create_db_engine
+    from src.models.migrations import run_migrations
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    run_migrations(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(db_engine):
+    return sessionmaker(bind=db_engine)
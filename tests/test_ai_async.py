@@ -0,0 +1,57 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.services.ai.clients import GeminiProClient
+from src.services.ai.fake import FakeAPIError, FakeModelClient
+from src.services.ai.interfaces import is_retryable
+
+
+def _client(**kwargs):
+    client = FakeModelClient(**kwargs)
+    client.retry_base_delay = 0.001
+    return client
+
+
+def test_generate_many_caps_concurrency_and_keeps_order():
+    client = _client(latency=0.02, response=lambda p: p.upper())
+    results = client.generate_many([f"p{i}" for i in range(20)], concurrency=4)
+
+    assert results == [f"P{i}" for i in range(20)]
+    assert client.max_in_flight == 4
+
+
+def test_transient_errors_are_retried_and_permanent_ones_are_not():
+    client = _client(latency=0, errors=[FakeAPIError(429), FakeAPIError(503), None, FakeAPIError(400)])
+    results = client.generate_many(['a', 'b'], concurrency=1, retries=3)
+
+    assert results[0] == '{"titulo": "fake"}'
+    assert isinstance(results[1], FakeAPIError) and results[1].code == 400
+    assert client.calls == 4
+
+
+def test_timeouts_count_as_transient_until_retries_run_out():
+    client = _client(latency=0.2)
+    results = client.generate_many(['lento'], timeout=0.01, retries=2)
+
+    assert isinstance(results[0], (TimeoutError, asyncio.TimeoutError))
+    assert client.calls == 3
+
+
+def test_is_retryable():
+    assert is_retryable(FakeAPIError(429)) and is_retryable(FakeAPIError(500)) and is_retryable(TimeoutError())
+    assert is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(FakeAPIError(403)) and not is_retryable(ValueError('json'))
+
+
+@patch('src.services.ai.clients.rate_limiter')
+@patch('src.services.ai.clients.genai')
+def test_gemini_agenerate_uses_async_api(mock_genai, mock_limiter):
+    mock_model = MagicMock()
+    mock_model.generate_content_async = AsyncMock(return_value=MagicMock(text='Async Content'))
+    mock_genai.GenerativeModel.return_value = mock_model
+
+    client = GeminiProClient(api_key='fake_key')
+    assert asyncio.run(client.agenerate('Prompt')) == 'Async Content'
+    mock_model.generate_content_async.assert_awaited_once_with('Prompt')
+    mock_model.generate_content.assert_not_called()
+    mock_limiter.acquire.assert_called_once_with('gemini')
@@ -21,28 +21,31 @@ def test_gemini_pro_client(mock_genai):
 
 @patch('src.services.ai.clients.genai')
 def test_gemini_flash_truncation(mock_genai):
-    """Test that Flash client truncates long prompts."""
+    """Test that Flash client trims only the source content of long prompts."""
     mock_model = MagicMock()
     mock_response = MagicMock()
     mock_response.text = "Ok"
     mock_model.generate_content.return_value = mock_response
     mock_genai.GenerativeModel.return_value = mock_model
     
-    # Simulate count_tokens returning high value
-    mock_model.count_tokens.return_value.total_tokens = 10000 
-    
     client = GeminiFlashClient(api_key="fake_key")
-    client.token_limit = 5000 # Force limit
+    client.token_limit = 500 # Force limit
     
-    long_prompt = "A" * 20000
+    instructions = "Você é o S1M0N. Reescreva o conteúdo abaixo."
+    schema = 'SAÍDA JSON OBRIGATÓRIA: {"titulo": "...", "conteudo_completo": "..."}'
+    long_prompt = f"{instructions}\n<fonte>\n{'palavra ' * 5000}\n</fonte>\n{schema}"
     client.generate(long_prompt)
     
-    # Check if prompt passed to generate_content was truncated
+    # Check the prompt passed to generate_content: instructions and JSON schema intact, source trimmed
     args, _ = mock_model.generate_content.call_args
     sent_prompt = args[0]
     
-    assert "TRUNCATED" in sent_prompt
-    assert len(sent_prompt) < 20000 + 100 # Should be around limit*4
+    assert sent_prompt.startswith(instructions + "\n<fonte>")
+    assert sent_prompt.endswith("</fonte>\n" + schema)
+    assert "[...]" in sent_prompt
+    assert len(sent_prompt) < len(long_prompt) // 4
+    # Estimativa local: nenhuma ida ao servidor para contar tokens
+    mock_model.count_tokens.assert_not_called()
 
 def test_factory_returns_correct_client():
     from src.config.settings import settings
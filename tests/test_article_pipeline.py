@@ -0,0 +1,50 @@
+import time
+import threading
+from src.services.article_pipeline import ArticlePipeline
+
+
+def make_pipeline(persisted, fail_items=(), delay=0.1, **kw):
+    def generate(item):
+        time.sleep(delay)
+        return None if item in fail_items else {'titulo': item}
+
+    def fetch_media(content):
+        time.sleep(delay)  # vídeo; a imagem só é enfileirada
+        return f"img-{content['titulo']}", f"vid-{content['titulo']}"
+
+    lock = threading.Lock()
+
+    def persist(item, content, img, vid):
+        with lock:
+            persisted.append((item, img, vid))
+        return True
+
+    return ArticlePipeline(generate, fetch_media, persist, **kw)
+
+
+def test_articles_overlap_across_stages():
+    persisted = []
+    pipeline = make_pipeline(persisted, generate_workers=4, media_workers=4)
+
+    start = time.monotonic()
+    count = pipeline.run(['a', 'b', 'c', 'd'], max_success=10)
+    elapsed = time.monotonic() - start
+
+    # Sequencial: 4 x (0.1 geração + 0.1 mídia) = 0.8s
+    assert count == 4
+    assert elapsed < 0.6
+    assert sorted(persisted) == [(i, f"img-{i}", f"vid-{i}") for i in 'abcd']
+
+
+def test_stops_at_max_success_and_refills_after_failures():
+    persisted = []
+    seen = []
+    pipeline = make_pipeline(persisted, fail_items={'a', 'b'}, delay=0.01,
+                             is_duplicate=lambda item: seen.append(item) or item == 'c')
+
+    count = pipeline.run(['a', 'b', 'c', 'd', 'e', 'f', 'g'], max_success=2)
+
+    assert count == 2
+    assert sorted(i for i, _, _ in persisted) == ['d', 'e']
+    assert 'g' not in seen
+
@@ -0,0 +1,149 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from src.models.schema import CachedContent, ImageCache, PendingArticle, PublishedArticle
+from src.services.cache_manager import CacheManager, CachePolicy
+
+
+def _manager(session_factory, tmp_path, **overrides):
+    article = dict(ttl=timedelta(hours=1), max_rows=100)
+    article.update(overrides)
+    return CacheManager([
+        CachePolicy('article', CachedContent, 'content_hash', valid_column='is_valid', **article),
+        CachePolicy('image', ImageCache, 'prompt_hash', timedelta(hours=1), 100, max_bytes=10_000,
+                    file_column='image_path', files_dir=str(tmp_path / 'images')),
+    ], session_factory=session_factory)
+
+
+def _image(tmp_path, name, size=4000, age=0):
+    folder = tmp_path / 'images'
+    folder.mkdir(exist_ok=True)
+    path = folder / name
+    path.write_bytes(b'x' * size)
+    if age:
+        old = time.time() - age
+        os.utime(path, (old, old))
+    return str(path)
+
+
+def test_lookup_records_hits_and_honours_ttl(session_factory, tmp_path):
+    cm = _manager(session_factory, tmp_path)
+    assert cm.lookup('article', 'k1') is None
+    cm.store('article', 'k1', cached_result='{"titulo": "x"}', input_title='x')
+
+    assert cm.lookup('article', 'k1')['cached_result'] == '{"titulo": "x"}'
+    assert cm.lookup('article', 'k1')['hit_count'] == 2
+
+    db = session_factory()
+    db.query(CachedContent).filter(CachedContent.content_hash == 'k1').update(
+        {CachedContent.expires_at: datetime.now() - timedelta(seconds=1)})
+    db.commit()
+    db.close()
+    assert cm.lookup('article', 'k1') is None
+
+    stats = cm.stats()['article']
+    assert (stats['hits'], stats['misses'], stats['hit_ratio']) == (2, 2, 0.5)
+
+
+def test_sweep_expires_and_evicts_least_recently_used(session_factory, tmp_path):
+    cm = _manager(session_factory, tmp_path, max_rows=2)
+    for key in ('a', 'b', 'c', 'old'):
+        cm.store('article', key, cached_result='{}')
+    db = session_factory()
+    db.query(CachedContent).filter(CachedContent.content_hash == 'old').update(
+        {CachedContent.expires_at: datetime.now() - timedelta(minutes=1)})
+    db.commit()
+    db.close()
+    cm.lookup('article', 'a')  # 'b' passa a ser o menos recente
+
+    assert cm.sweep('article') == {'expired': 1, 'evicted': 1, 'orphans': 0}
+    db = session_factory()
+    assert {k for (k,) in db.query(CachedContent.content_hash).execution_options(full_scan_ok=True)} == {'a', 'c'}
+    db.close()
+
+
+def test_lfu_evicts_least_used(session_factory, tmp_path):
+    cm = _manager(session_factory, tmp_path, max_rows=1, eviction='lfu')
+    cm.store('article', 'popular', cached_result='{}')
+    cm.store('article', 'rare', cached_result='{}')
+    for _ in range(3):
+        cm.lookup('article', 'popular')
+    cm.sweep('article')
+    assert cm.lookup('article', 'popular') is not None
+    assert cm.lookup('article', 'rare') is None
+
+
+def test_image_sweep_enforces_bytes_and_removes_orphans(session_factory, tmp_path):
+    cm = _manager(session_factory, tmp_path)
+    paths = [_image(tmp_path, f'{i}.png') for i in range(3)]
+    for i, path in enumerate(paths):
+        cm.store('image', f'p{i}', image_path=path)
+    orphan = _image(tmp_path, 'orphan.png', size=10, age=3600)
+    fresh = _image(tmp_path, 'fresh.png', size=10)
+    pending = _image(tmp_path, 'pending.png', size=10, age=3600)
+    db = session_factory()
+    db.add(PendingArticle(title='t', image_path=pending, status='PENDING'))
+    db.commit()
+    db.close()
+
+    result = cm.sweep('image')
+
+    assert result['orphans'] == 1 and result['evicted'] == 1
+    assert not os.path.exists(orphan) and not os.path.exists(paths[0])
+    assert os.path.exists(fresh) and os.path.exists(pending)
+    assert cm.stats()['image']['bytes'] <= 10_000
+
+
+def test_images_of_locally_published_articles_survive_expiry(session_factory, tmp_path):
+    cm = _manager(session_factory, tmp_path)
+    local, uploaded = _image(tmp_path, 'local.png'), _image(tmp_path, 'uploaded.png')
+    cm.store('image', 'local', image_path=local, expires_at=datetime.now() - timedelta(seconds=1))
+    cm.store('image', 'uploaded', image_path=uploaded, expires_at=datetime.now() - timedelta(seconds=1))
+    db = session_factory()
+    db.add_all([PublishedArticle(hash='a', title='sem WP', image_path=local),
+                PublishedArticle(hash='b', title='no WP', image_path=uploaded, wordpress_url='http://wp/b/')])
+    db.commit()
+    db.close()
+
+    assert cm.sweep('image')['expired'] == 2
+    assert os.path.exists(local)  # só existe aqui: o artigo publicado ainda aponta para ela
+    assert not os.path.exists(uploaded)  # já está na biblioteca de mídia do WordPress
+
+
+def test_byte_budget_ignores_protected_files(session_factory, tmp_path):
+    cm = _manager(session_factory, tmp_path)
+    pending = _image(tmp_path, 'pending.png', size=15_000)
+    cm.store('image', 'pending', image_path=pending)
+    kept = [_image(tmp_path, f'{i}.png') for i in range(2)]
+    for i, path in enumerate(kept):
+        cm.store('image', f'p{i}', image_path=path)
+    db = session_factory()
+    db.add(PendingArticle(title='t', image_path=pending, status='APPROVED'))
+    db.commit()
+    db.close()
+
+    # Só a imagem protegida já passa do orçamento: nada apagável é sacrificado por ela
+    assert cm.sweep('image')['evicted'] == 0
+    assert all(os.path.exists(p) for p in kept + [pending])
+    assert cm.stats()['image']['rows'] == 3
+
+
+def test_missing_image_file_is_a_miss(session_factory, tmp_path):
+    cm = _manager(session_factory, tmp_path)
+    path = _image(tmp_path, 'gone.png')
+    cm.store('image', 'p', image_path=path)
+    os.remove(path)
+    assert cm.lookup('image', 'p') is None
+    assert cm.stats()['image']['rows'] == 0
+
+
+def test_metrics_are_flushed_per_day(session_factory, tmp_path):
+    cm = _manager(session_factory, tmp_path)
+    cm.lookup('article', 'missing')
+    cm.flush_metrics()
+    cm.lookup('article', 'missing')
+    cm.flush_metrics()
+
+    other_process = _manager(session_factory, tmp_path)
+    assert other_process.stats()['article']['misses'] == 2
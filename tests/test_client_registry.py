@@ -0,0 +1,106 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.services.client_registry import ClientRegistry
+
+
+class _FakeSettings:
+    def __init__(self):
+        self.subscribers = []
+
+    def subscribe(self, callback, keys=None):
+        self.subscribers.append((set(keys or ()), callback))
+
+    def change(self, key):
+        for keys, callback in self.subscribers:
+            if key in keys:
+                callback(key, 'old', 'new')
+
+
+@pytest.fixture
+def fake_settings():
+    fake = _FakeSettings()
+    with patch('src.services.client_registry.settings_cache', fake):
+        yield fake
+
+
+def test_clients_are_built_lazily_once(fake_settings):
+    builds = []
+    registry = ClientRegistry()
+    registry.register('gemini', lambda: builds.append(1) or object(), settings_keys=('ai_model_mode',))
+    assert builds == []
+
+    first = registry.get('gemini')
+    assert registry.get('gemini') is first
+    assert len(builds) == 1
+    assert registry.report()['gemini']['builds'] == 1
+
+
+def test_relevant_setting_change_rebuilds(fake_settings):
+    registry = ClientRegistry()
+    registry.register('gemini', object, settings_keys=('ai_model_mode', 'google_api_key'))
+    registry.register('youtube', object, settings_keys=('youtube_api_key',))
+    gemini, youtube = registry.get('gemini'), registry.get('youtube')
+
+    fake_settings.change('google_api_key')
+    assert registry.get('gemini') is not gemini
+    assert registry.get('youtube') is youtube
+
+
+def test_build_errors_are_cached_until_settings_change(fake_settings):
+    calls = []
+
+    def builder():
+        calls.append(1)
+        raise ValueError('API Key is required')
+
+    registry = ClientRegistry()
+    registry.register('gemini', builder, settings_keys=('google_api_key',))
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            registry.get('gemini')
+    assert len(calls) == 1
+    assert 'API Key' in registry.report()['gemini']['error']
+
+    fake_settings.change('google_api_key')
+    with pytest.raises(ValueError):
+        registry.get('gemini')
+    assert len(calls) == 2
+
+
+def test_transient_build_errors_are_retried_with_backoff(fake_settings):
+    now = {'t': 0.0}
+    outcomes = [ConnectionError('from_pretrained: timeout'), ConnectionError('timeout'), 'client']
+
+    def builder():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    registry = ClientRegistry(clock=lambda: now['t'])
+    registry.register('imagen', builder)
+    assert registry.get_optional('imagen') is None
+    assert registry.get_optional('imagen') is None  # dentro do backoff: não tenta de novo
+    assert len(outcomes) == 2
+
+    now['t'] += ClientRegistry.RETRY_BASE
+    assert registry.get_optional('imagen') is None
+    now['t'] += ClientRegistry.RETRY_BASE  # backoff dobrou: ainda não
+    assert len(outcomes) == 1
+    now['t'] += ClientRegistry.RETRY_BASE
+    assert registry.get('imagen') == 'client'
+    assert registry.report()['imagen']['error'] is None
+
+
+def test_first_call_latency_is_recorded_once(fake_settings):
+    registry = ClientRegistry()
+    registry.register('imagen', object)
+    registry.get('imagen')
+    with registry.first_call('imagen'):
+        pass
+    first = registry.report()['imagen']['first_call_ms']
+    with registry.first_call('imagen'):
+        pass
+    assert first is not None and registry.report()['imagen']['first_call_ms'] == first
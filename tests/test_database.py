@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src.config.database import create_db_engine, is_lock_error, retry_on_lock
+
+
+def _locked():
+    return OperationalError("INSERT ...", {}, Exception("database is locked"))
+
+
+def test_pragmas_applied_to_every_connection(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'wal.db'}", pool_size=2)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == 'wal'
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+        assert conn.execute(text("PRAGMA cache_size")).scalar() < 0  # tamanho em KiB
+    assert engine.pool.size() == 2
+
+
+def test_read_only_engine_rejects_writes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'ro.db'}"
+    writer = create_db_engine(url)
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    reader = create_db_engine(url, read_only=True)
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO t VALUES (2)"))
+
+
+def test_retry_on_lock_retries_then_succeeds():
+    calls = []
+
+    @retry_on_lock(retries=3, base_delay=0)
+    def write():
+        calls.append(1)
+        if len(calls) < 3:
+            raise _locked()
+        return 'ok'
+
+    assert write() == 'ok'
+    assert len(calls) == 3
+
+
+def test_retry_on_lock_gives_up_and_ignores_other_errors():
+    calls = []
+
+    @retry_on_lock(retries=2, base_delay=0)
+    def always_locked():
+        calls.append(1)
+        raise _locked()
+
+    with pytest.raises(OperationalError):
+        always_locked()
+    assert len(calls) == 3
+
+    @retry_on_lock(retries=2, base_delay=0)
+    def broken():
+        calls.append(1)
+        raise OperationalError("SELECT", {}, Exception("no such table: t"))
+
+    calls.clear()
+    with pytest.raises(OperationalError):
+        broken()
+    assert len(calls) == 1
+    assert is_lock_error(_locked()) and not is_lock_error(ValueError("database is locked"))
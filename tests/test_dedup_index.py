@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import event
+from src.models.schema import PublishedArticle
+from src.services.dedup_index import DedupIndex, BloomFilter
+
+
+@pytest.fixture
+def db_setup(db_engine, session_factory):
+    db = session_factory()
+    db.add_all([PublishedArticle(hash=f"h{i:031d}", title=str(i)) for i in range(1200)])
+    db.commit()
+    db.close()
+
+    statements = []
+    event.listen(db_engine, "before_cursor_execute",
+                 lambda conn, cursor, stmt, *a: statements.append(stmt) if stmt.startswith("SELECT") else None)
+    return session_factory, statements
+
+
+def test_cold_batch_uses_chunked_in_queries(db_setup):
+    factory, statements = db_setup
+    index = DedupIndex(session_factory=factory)
+    batch = [f"h{i:031d}" for i in range(0, 1200, 2)] + ["novo1", "novo2"]
+
+    existing = index.find_existing(batch)
+
+    assert existing == set(batch) - {"novo1", "novo2"}
+    assert len(statements) == 2  # 602 hashes -> 2 blocos de 500
+    assert not index.loaded
+
+
+def test_loaded_set_index_answers_from_memory(db_setup):
+    factory, statements = db_setup
+    index = DedupIndex(session_factory=factory)
+    index.load()
+    statements.clear()
+
+    assert index.contains("h" + "0" * 31)
+    assert not index.contains("inexistente")
+    index.add("inexistente")
+    assert index.find_existing(["inexistente", "outro"]) == {"inexistente"}
+    assert statements == []
+
+
+def test_bloom_mode_confirms_positives_in_database(db_setup):
+    factory, statements = db_setup
+    index = DedupIndex(session_factory=factory, use_bloom=True)
+    index.load()
+    statements.clear()
+
+    assert index.find_existing(["nunca-visto-%d" % i for i in range(50)]) == set()
+    assert statements == []  # negativos resolvidos só pelo Bloom
+    assert index.find_existing(["h" + "0" * 31]) == {"h" + "0" * 31}
+
+
+def test_bloom_keeps_hashes_added_while_loading(db_setup):
+    factory, _ = db_setup
+    index = DedupIndex(session_factory=factory, use_bloom=True)
+    index.load()
+
+    def reading_session():
+        index.add("publicado-durante-a-carga")  # publicação concorrente com a leitura do histórico
+        return factory()
+
+    index.session_factory = reading_session
+    index.load()
+    db = factory()
+    db.add(PublishedArticle(hash="publicado-durante-a-carga", title="x"))
+    db.commit()
+    db.close()
+
+    assert index.find_existing(["publicado-durante-a-carga"]) == {"publicado-durante-a-carga"}
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    keys = [f"k{i}" for i in range(1000)]
+    for k in keys:
+        bloom.add(k)
+    assert all(k in bloom for k in keys)
+    false_positives = sum(f"x{i}" in bloom for i in range(10000))
+    assert false_positives < 300
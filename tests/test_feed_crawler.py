@@ -0,0 +1,260 @@
+import time
+import threading
+import pytest
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from src.models.schema import RSSFeed
+from src.providers import rss_provider
+from src.providers.base_provider import FetchTicket
+from src.providers.feed_crawler import FeedCrawler, FeedRequest
+
+RSS_BODY = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>T</title>
+<item><title>Item 1</title><link>http://example.com/1</link><description>Resumo 1</description></item>
+<item><title>Item 2</title><link>http://example.com/2</link><description>Resumo 2</description></item>
+</channel></rss>"""
+
+class _State:
+    active = 0
+    peak = 0
+    served = 0
+    arrivals = {}
+    lock = threading.Lock()
+
+class FeedHandler(BaseHTTPRequestHandler):
+    delay = 0.2
+
+    def do_GET(self):
+        with _State.lock:
+            _State.arrivals[(self.headers.get('Host'), self.path)] = time.monotonic()
+            _State.active += 1
+            _State.peak = max(_State.peak, _State.active)
+        time.sleep(self.delay)
+        with _State.lock:
+            _State.active -= 1
+            _State.served += 1
+            served = _State.served
+        if self.path.startswith('/unsized'):
+            # Sem Content-Length: o corpo vai até a conexão fechar (HTTP/1.0)
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(RSS_BODY * 4)
+            return
+        if self.path.startswith('/missing'):
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.path.startswith('/etag') and self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if self.path.startswith('/etag'):
+            self.send_header('ETag', '"v1"')
+        if self.path.startswith('/rotating'):
+            # Ignora If-None-Match e troca o ETag a cada resposta, com o mesmo corpo
+            self.send_header('ETag', f'"r{served}"')
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('Content-Length', str(len(RSS_BODY)))
+        self.end_headers()
+        self.wfile.write(RSS_BODY)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def feed_server():
+    _State.active = _State.peak = _State.served = 0
+    _State.arrivals = {}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+def test_crawl_is_parallel_and_capped_per_host(feed_server):
+    crawler = FeedCrawler(max_workers=16, per_host_limit=3, parse_workers=2)
+    feeds = [FeedRequest(i, f"{feed_server}/feed/{i}") for i in range(9)]
+
+    start = time.monotonic()
+    results = crawler.crawl(feeds, limit=1)
+    elapsed = time.monotonic() - start
+
+    # 9 feeds, 3 por host, 0.2s cada -> ~0.6s (serial seria ~1.8s)
+    assert elapsed < 1.4
+    assert _State.peak <= 3
+    assert [r.feed_id for r in results] == list(range(9))
+    assert all(r.status == 'ok' for r in results)
+    assert all(len(r.entries) == 1 and r.bytes == len(RSS_BODY) for r in results)
+    assert results[0].entries[0]['link'] == 'http://example.com/1'
+    crawler.close()
+
+def test_busy_host_does_not_hold_workers_from_other_hosts(feed_server):
+    # Mesmo servidor com dois nomes: para o crawler são dois hosts
+    other = feed_server.replace('127.0.0.1', 'localhost')
+    crawler = FeedCrawler(max_workers=3, per_host_limit=2, parse_workers=2)
+    feeds = [FeedRequest(i, f"{feed_server}/busy/{i}") for i in range(6)]
+    feeds += [FeedRequest(10 + i, f"{other}/quick/{i}") for i in range(2)]
+
+    start = time.monotonic()
+    results = crawler.crawl(feeds, limit=1)
+
+    assert all(r.status == 'ok' for r in results)
+    quick = [t - start for (host, path), t in _State.arrivals.items() if path.startswith('/quick')]
+    # Sem fila por host, os workers ficariam presos no semáforo do host ocupado (~0.6s de espera)
+    assert len(quick) == 2 and max(quick) < 0.4
+    crawler.close()
+
+def test_pools_are_reused_across_crawls_until_close(feed_server):
+    crawler = FeedCrawler(per_host_limit=2, parse_workers=2)
+    crawler.crawl([FeedRequest(1, f"{feed_server}/a")])
+    pools = crawler._pools()
+    crawler.crawl([FeedRequest(2, f"{feed_server}/b")])
+    assert crawler._pools() == pools
+
+    crawler.close()
+    assert pools[0]._shutdown and pools[1]._shutdown
+    # Depois de fechado, um novo crawl cria pools novos
+    assert crawler.crawl([FeedRequest(3, f"{feed_server}/c")])[0].status == 'ok'
+    assert crawler._pools()[0] is not pools[0]
+    crawler.close()
+
+def test_oversized_bodies_are_aborted(feed_server):
+    crawler = FeedCrawler(max_bytes=len(RSS_BODY) + 10)
+    results = crawler.crawl([FeedRequest(1, f"{feed_server}/ok"), FeedRequest(2, f"{feed_server}/unsized")])
+
+    assert results[0].status == 'ok'
+    assert results[1].status == 'error' and 'FEED_MAX_BYTES' in results[1].error
+    tiny = FeedCrawler(max_bytes=100)
+    small = tiny.crawl([FeedRequest(3, f"{feed_server}/ok")])[0]
+    assert small.status == 'error' and 'excede' in small.error  # Content-Length já acusa
+    crawler.close()
+    tiny.close()
+
+def test_crawl_reports_http_errors(feed_server):
+    crawler = FeedCrawler(per_host_limit=2)
+    results = crawler.crawl([FeedRequest(1, f"{feed_server}/missing"), FeedRequest(2, f"{feed_server}/ok")])
+
+    assert results[0].status == 'error' and results[0].error == 'HTTP 404'
+    assert results[1].status == 'ok' and len(results[1].entries) == 2
+    assert results[1].latency > 0
+    crawler.close()
+
+def test_conditional_get_skips_unchanged_feeds(feed_server):
+    crawler = FeedCrawler()
+    first = crawler.crawl([FeedRequest(1, f"{feed_server}/etag"), FeedRequest(2, f"{feed_server}/plain")])
+    assert [r.status for r in first] == ['ok', 'ok']
+    assert first[0].etag == '"v1"'
+    assert first[1].etag is None and first[1].content_digest
+
+    # Segundo ciclo: 304 via ETag e digest idêntico para o servidor sem validadores
+    second = crawler.crawl([
+        FeedRequest(1, f"{feed_server}/etag", etag=first[0].etag, content_digest=first[0].content_digest),
+        FeedRequest(2, f"{feed_server}/plain", content_digest=first[1].content_digest),
+    ])
+    assert [r.status for r in second] == ['not_modified', 'not_modified']
+    assert second[0].bytes == 0
+    assert all(r.entries == [] for r in second)
+    crawler.close()
+
+def test_unchanged_body_still_saves_new_validators(feed_server, session_factory, monkeypatch):
+    monkeypatch.setattr(rss_provider, 'get_db', session_factory)
+    monkeypatch.setattr(rss_provider, 'get_read_db', session_factory)
+    db = session_factory()
+    db.add(RSSFeed(url=f"{feed_server}/rotating", name='Rotativo', is_active=True))
+    db.commit()
+    db.close()
+
+    def stored():
+        db = session_factory()
+        try:
+            return db.query(RSSFeed.etag, RSSFeed.content_digest).one()
+        finally:
+            db.close()
+
+    def make_due():
+        db = session_factory()
+        db.query(RSSFeed).update({RSSFeed.next_poll_at: datetime.now() - timedelta(minutes=1)})
+        db.commit()
+        db.close()
+
+    provider = rss_provider.RSSProvider()
+    assert len(provider.fetch()) == 2
+    etag, digest = stored()
+    assert etag == '"r1"'
+
+    # Mesmo corpo (digest igual) com ETag novo: nada a interpretar, mas o validador é atualizado
+    make_due()
+    assert provider.fetch() == []
+    assert provider.last_crawl_stats[0]['status'] == 'not_modified'
+    assert stored() == ('"r2"', digest)
+    provider.crawler.close()
+
+def test_restarted_provider_sees_due_feeds_before_first_fetch(session_factory, monkeypatch):
+    monkeypatch.setattr(rss_provider, 'get_read_db', session_factory)
+    db = session_factory()
+    db.add(RSSFeed(url='http://a/feed', name='Vencido', is_active=True,
+                   next_poll_at=datetime.now() - timedelta(minutes=5)))
+    db.add(RSSFeed(url='http://b/feed', name='Futuro', is_active=True,
+                   next_poll_at=datetime.now() + timedelta(hours=1)))
+    db.commit()
+    db.close()
+
+    # Processo novo: nenhum fetch completo ainda, o agendamento vem do banco
+    assert rss_provider.RSSProvider().has_due_feeds()
+
+    db = session_factory()
+    db.query(RSSFeed).filter(RSSFeed.name == 'Vencido').update({RSSFeed.is_active: False})
+    db.commit()
+    db.close()
+    assert not rss_provider.RSSProvider().has_due_feeds()
+
+def test_abandoned_fetch_keeps_feed_state_and_stays_due(feed_server, session_factory, monkeypatch):
+    monkeypatch.setattr(rss_provider, 'get_db', session_factory)
+    monkeypatch.setattr(rss_provider, 'get_read_db', session_factory)
+    db = session_factory()
+    db.add(RSSFeed(url=f"{feed_server}/etag", name='Lento', is_active=True))
+    db.commit()
+    db.close()
+
+    provider = rss_provider.RSSProvider()
+    ticket = FetchTicket()
+    assert ticket.abandon()  # o NewsService desistiu enquanto o feed baixava
+    assert provider.fetch(ticket=ticket) == []
+
+    db = session_factory()
+    row = db.query(RSSFeed).one()
+    db.close()
+    assert (row.etag, row.content_digest, row.next_poll_at, row.total_polls) == (None, None, None, 0)
+    assert provider.has_due_feeds()
+    # Próximo fetch baixa tudo de novo (sem If-None-Match) e entrega as notícias
+    assert len(provider.fetch()) == 2
+    provider.crawler.close()
+
+def test_items_of_an_expired_committed_fetch_come_with_the_next_fetch(feed_server, session_factory, monkeypatch):
+    monkeypatch.setattr(rss_provider, 'get_db', session_factory)
+    monkeypatch.setattr(rss_provider, 'get_read_db', session_factory)
+    db = session_factory()
+    db.add(RSSFeed(url=f"{feed_server}/etag", name='Lento', is_active=True))
+    db.commit()
+    db.close()
+
+    class ExpiringTicket(FetchTicket):
+        def commit(self):
+            won = super().commit()
+            self.expire()  # o NewsService desiste da espera logo depois do commit
+            return won
+
+    provider = rss_provider.RSSProvider()
+    assert provider.fetch(ticket=ExpiringTicket()) == []
+
+    db = session_factory()
+    db.query(RSSFeed).update({RSSFeed.next_poll_at: datetime.now() - timedelta(minutes=1)})
+    db.commit()
+    db.close()
+    # O estado foi gravado (próximo GET vem 304), mas os itens guardados saem agora
+    items = provider.fetch()
+    assert provider.last_crawl_stats[0]['status'] == 'not_modified'
+    assert [i.url for i in items] == ['http://example.com/1', 'http://example.com/2']
+    assert provider.fetch() == []
+    provider.crawler.close()
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from src.providers.feed_scheduler import FeedScheduler
+
+def make_row(feed_id, **kw):
+    base = dict(id=feed_id, url=f"http://feed/{feed_id}", name=f"Feed {feed_id}", poll_interval=None,
+                avg_update_interval=None, next_poll_at=None, last_polled_at=None, last_success_at=None,
+                last_entry_at=None, consecutive_failures=0, total_polls=0, total_items=0)
+    base.update(kw)
+    return SimpleNamespace(**base)
+
+def test_new_and_overdue_feeds_are_due_in_order():
+    now = datetime(2026, 1, 1, 12, 0)
+    sched = FeedScheduler()
+    sched.sync([
+        make_row(1, next_poll_at=now + timedelta(hours=1)),
+        make_row(2, next_poll_at=now - timedelta(minutes=5)),
+        make_row(3),
+    ])
+
+    due = sched.pop_due(now)
+    assert [s.feed_id for s in due] == [3, 2]
+    assert sched.next_due_at() == now + timedelta(hours=1)
+    assert sched.pop_due(now) == []
+
+def test_fast_feed_learns_short_interval_and_idle_feed_backs_off():
+    now = datetime(2026, 1, 1, 12, 0)
+    sched = FeedScheduler(min_interval=60, max_interval=86400, default_interval=3600, idle_backoff=2.0)
+    sched.sync([make_row(1)])
+    state = sched.pop_due(now)[0]
+
+    # Entradas a cada 10 minutos -> polling a cada ~5 minutos
+    times = [(now - timedelta(minutes=10 * i)).timestamp() for i in range(6)]
+    values = sched.record(state, 'ok', times, now)
+    assert values['poll_interval'] == 300
+    assert values['total_items'] == 6
+    assert values['next_poll_at'] == now + timedelta(seconds=300)
+
+    # Nenhuma entrada nova: recua
+    values = sched.record(state, 'not_modified', times, now)
+    assert values['poll_interval'] == 600
+    assert values['total_items'] == 6
+
+def test_failures_back_off_exponentially_and_show_in_health():
+    now = datetime(2026, 1, 1, 12, 0)
+    sched = FeedScheduler(min_interval=60, max_interval=7200, default_interval=600, failure_backoff=2.0)
+    sched.sync([make_row(1)])
+    state = sched.pop_due(now)[0]
+
+    delays = []
+    for _ in range(4):
+        values = sched.record(state, 'error', [], now)
+        delays.append((values['next_poll_at'] - now).total_seconds())
+
+    assert delays == [1200, 2400, 4800, 7200]
+    health = sched.health()[0]
+    assert health['consecutive_failures'] == 4
+    assert health['last_success_at'] is None
+    assert health['mean_items_per_poll'] == 0.0
+
+def test_requeued_feeds_are_due_again_once():
+    now = datetime(2026, 1, 1, 12, 0)
+    sched = FeedScheduler()
+    rows = [make_row(1, next_poll_at=now - timedelta(minutes=1)), make_row(2)]
+    sched.sync(rows)
+
+    due = sched.pop_due(now)
+    assert not sched.has_due(now)
+    # Poll descartado (sem record): os feeds voltam a vencer, mesmo após um sync no meio
+    sched.sync(rows)
+    sched.requeue([s.feed_id for s in due])
+    assert sorted(s.feed_id for s in sched.pop_due(now)) == [1, 2]
+    assert sched.pop_due(now) == []
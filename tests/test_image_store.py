@@ -0,0 +1,97 @@
+import io
+import os
+import threading
+from datetime import timedelta
+
+import pytest
+from PIL import Image
+
+from src.models.schema import ImageCache, PendingArticle
+from src.services.cache_manager import CacheManager, CachePolicy
+from src.services.image_queue import ImageJobQueue
+from src.services.image_store import ImageStore
+
+
+def _png(width=800, height=400, color=(200, 30, 30)):
+    buf = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def test_store_is_content_addressed_and_sharded(tmp_path):
+    store = ImageStore(str(tmp_path), fmt='png', widths=(), max_width=0, workers=0)
+    data = _png()
+    path = store.put(data)
+
+    rel = os.path.relpath(path, tmp_path).split(os.sep)
+    assert len(rel[0]) == 2 and len(rel[1]) == 2 and rel[2].startswith(rel[0] + rel[1])
+    assert open(path, 'rb').read() == data
+    # Mesma imagem, mesmo arquivo; imagem diferente nunca colide
+    assert store.put(data) == path
+    assert store.put(_png(color=(0, 0, 255))) != path
+    # Nenhum temporário sobra depois da troca atômica
+    assert not [n for _, _, names in os.walk(tmp_path) for n in names if n.endswith('.tmp') or 'staging' in n]
+
+
+@pytest.mark.parametrize('workers', [0, 1])
+def test_reencodes_and_writes_resized_variants(tmp_path, workers):
+    store = ImageStore(str(tmp_path), fmt='webp', widths=(600, 300, 2000), max_width=700, workers=workers)
+    try:
+        path = store.put(_png(1400, 700))
+    finally:
+        store.shutdown()
+
+    assert path.endswith('.webp')
+    with Image.open(path) as img:
+        assert img.format == 'WEBP' and img.size == (700, 350)
+    family = sorted(store.family(path))
+    assert [os.path.basename(p).split('.')[0].split('_')[-1] for p in family if '_' in os.path.basename(p)] == ['300', '600']
+    with Image.open(store.path_for(os.path.basename(path)[:64], 'webp', 300)) as small:
+        assert small.size == (300, 150)
+
+
+def test_queue_attaches_image_when_ready(session_factory, tmp_path):
+    release = threading.Event()
+
+    def render(title):
+        release.wait(5)
+        return f'/img/{title}.webp'
+
+    db = session_factory()
+    row = PendingArticle(title='t', status='PENDING')
+    db.add(row)
+    db.commit()
+    row_id = row.id
+    db.close()
+
+    jobs = ImageJobQueue(render, workers=1, session_factory=session_factory)
+    job = jobs.submit('t')
+    assert jobs.submit('t') is job  # pedido repetido reaproveita o job em voo
+    assert jobs.result_now(job, wait=0) is None
+
+    jobs.attach(job, PendingArticle, row_id)
+    release.set()
+    jobs.shutdown()
+
+    db = session_factory()
+    assert db.get(PendingArticle, row_id).image_path == '/img/t.webp'
+    db.close()
+    assert jobs.pending == 0
+
+
+def test_sweep_walks_shards_and_keeps_variants(session_factory, tmp_path):
+    root = tmp_path / 'images'
+    store = ImageStore(str(root), fmt='webp', widths=(200,), max_width=0, workers=0)
+    kept, evicted = store.put(_png(color=(1, 2, 3))), store.put(_png(color=(4, 5, 6)))
+    cm = CacheManager([CachePolicy('image', ImageCache, 'prompt_hash', timedelta(hours=1), 1,
+                                   file_column='image_path', files_dir=str(root), file_family=store.family)],
+                      session_factory=session_factory)
+    cm.store('image', 'old', image_path=evicted)
+    cm.store('image', 'new', image_path=kept)
+    cm.ORPHAN_GRACE = 0
+
+    result = cm.sweep('image')
+
+    assert result == {'expired': 0, 'evicted': 1, 'orphans': 0}
+    assert all(os.path.exists(p) for p in store.family(kept)) and len(store.family(kept)) == 2
+    assert not os.path.exists(evicted) and store.family(evicted) == [evicted]
@@ -0,0 +1,93 @@
+"""
+Migrações contra SQLite e PostgreSQL.
+
+O PostgreSQL vem de TEST_POSTGRES_URI (ex.: o serviço `postgres` do docker-compose)
+ou, na falta dela, de um servidor local descartável via `pgserver`, se instalado.
+Sem nenhum dos dois, os casos PostgreSQL são pulados.
+"""
+import os
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, inspect, make_url, text
+
+from src.config.database import Base, create_db_engine, resolve_database_url, BASE_DIR
+from src.models import migrations
+from src.models.migrations import MIGRATIONS_TABLE, current_version, head, run_migrations
+
+
+@pytest.fixture(scope='session')
+def postgres_uri(tmp_path_factory):
+    uri = os.getenv('TEST_POSTGRES_URI')
+    if uri:
+        yield uri
+        return
+    pgserver = pytest.importorskip('pgserver')
+    server = pgserver.get_server(str(tmp_path_factory.mktemp('pg')), cleanup_mode='stop')
+    yield server.get_uri().replace('postgresql://', 'postgresql+psycopg2://', 1)
+
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def engine(request, tmp_path):
+    if request.param == 'sqlite':
+        eng = create_db_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+        yield eng
+        eng.dispose()
+        return
+
+    base_uri = request.getfixturevalue('postgres_uri')
+    admin = create_engine(base_uri, isolation_level='AUTOCOMMIT')
+    name = f"s1m0n_test_{uuid.uuid4().hex[:8]}"
+    with admin.connect() as conn:
+        conn.execute(text(f'CREATE DATABASE {name}'))
+    eng = create_db_engine(make_url(base_uri).set(database=name).render_as_string(hide_password=False))
+    try:
+        yield eng
+    finally:
+        eng.dispose()
+        with admin.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS {name}'))
+        admin.dispose()
+
+
+def test_fresh_database_reaches_head(engine):
+    applied = run_migrations(engine)
+
+    assert applied == [m.version for m in migrations.MIGRATIONS]
+    assert current_version(engine) == head()
+    tables = set(inspect(engine).get_table_names())
+    assert set(Base.metadata.tables) <= tables
+    assert MIGRATIONS_TABLE in tables
+    assert run_migrations(engine) == []
+
+
+def test_legacy_tables_gain_new_columns(engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE rss_feeds (id INTEGER PRIMARY KEY, name VARCHAR(200), "
+                          "url VARCHAR(500), theme VARCHAR(100), is_active BOOLEAN, created_at TIMESTAMP)"))
+        conn.execute(text("INSERT INTO rss_feeds (id, name, url, is_active) VALUES (1, 'G1', 'https://g1', TRUE)"))
+
+    run_migrations(engine)
+
+    columns = {c['name'] for c in inspect(engine).get_columns('rss_feeds')}
+    assert {'etag', 'poll_interval', 'next_poll_at', 'total_items'} <= columns
+    assert 'ix_rss_feeds_active_next_poll' in {i['name'] for i in inspect(engine).get_indexes('rss_feeds')}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT name FROM rss_feeds WHERE id = 1")).scalar() == 'G1'
+
+
+def test_only_pending_migrations_run(engine, monkeypatch):
+    run_migrations(engine)
+    calls = []
+    extra = migrations.Migration(head() + 1, 'teste', lambda conn: calls.append(conn.dialect.name))
+    monkeypatch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS + [extra])
+
+    assert run_migrations(engine) == [extra.version]
+    assert run_migrations(engine) == []
+    assert len(calls) == 1
+
+
+def test_resolve_database_url():
+    assert resolve_database_url('sqlite:///content_robot.db') == f"sqlite:///{os.path.join(BASE_DIR, 'content_robot.db')}"
+    assert resolve_database_url('sqlite:////data/robot.db') == 'sqlite:////data/robot.db'
+    assert resolve_database_url('postgresql+psycopg2://u:p@db:5432/s1m0n') == 'postgresql+psycopg2://u:p@db:5432/s1m0n'
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.config.database import Base
+from src.config.settings_cache import SettingsCache
+from src.models import schema  # noqa: F401  (registra as tabelas em Base.metadata)
+from src.services.ai.router import POLICY_KEY, ModelRouter, RoutingPolicy
+
+
+@pytest.fixture
+def cache(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'router.db'}")
+    Base.metadata.create_all(engine)
+    return SettingsCache(sessionmaker(bind=engine))
+
+
+@pytest.fixture
+def router(cache):
+    cache.set('ai_model_mode', 'auto')
+    return ModelRouter(cache)
+
+
+def test_auto_mode_uses_input_size_and_queue_depth(router):
+    assert router.route(120) == ('flash', 'entrada curta')
+    assert router.route(2000).model == 'pro'
+
+    # Gerações em voo acima do limite: o excesso vai para o Flash
+    for _ in range(RoutingPolicy().max_queue_depth):
+        router.in_flight += 1
+    assert router.route(2000) == ('flash', 'fila cheia')
+
+
+def test_fixed_mode_and_budget(cache, router):
+    cache.set('ai_model_mode', 'pro')
+    assert router.route(50) == ('pro', 'modo fixo')
+    assert router.route(50, degraded=True).model == 'flash'
+
+
+def test_unhealthy_model_is_avoided(router):
+    for _ in range(5):
+        with pytest.raises(RuntimeError):
+            with router.track('pro'):
+                raise RuntimeError('503')
+    assert router.health('pro')['error_rate'] == 1.0
+    assert router.in_flight == 0
+    assert router.route(2000) == ('flash', 'pro instável')
+
+    # Os dois instáveis: volta às regras normais
+    for _ in range(5):
+        router.observe('flash', 1.0, False)
+    assert router.route(2000).model == 'pro'
+
+
+def test_avoided_model_recovers_when_samples_age_out(cache):
+    now = {'t': 1000.0}
+    cache.set('ai_model_mode', 'auto')
+    router = ModelRouter(cache, clock=lambda: now['t'])
+    for _ in range(5):
+        router.observe('pro', 1.0, False)
+    assert router.route(2000) == ('flash', 'pro instável')
+
+    now['t'] += RoutingPolicy().max_sample_age_s + 1
+    assert router.health('pro')['samples'] == 0
+    assert router.route(2000) == ('pro', 'reescrita longa')
+
+
+def test_policy_reloads_at_runtime(cache, router):
+    assert router.route(800).model == 'pro'
+    cache.set(POLICY_KEY, json.dumps({'short_input_tokens': 1000}))
+    assert router.route(800) == ('flash', 'entrada curta')
+
+    # Política inválida não derruba o roteamento: mantém a anterior
+    cache.set(POLICY_KEY, json.dumps({'nao_existe': 1}))
+    assert router.status()['policy']['short_input_tokens'] == 1000
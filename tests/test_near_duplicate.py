@@ -0,0 +1,54 @@
+from datetime import datetime
+import numpy as np
+from src.models.schema import PublishedArticle
+from src.providers.base_provider import NewsItem
+from src.services.near_duplicate import MinHasher, NearDuplicateDetector
+
+STORY = ("Banco Central mantém a taxa Selic em 10,5% ao ano pela terceira reunião seguida, "
+         "citando incertezas fiscais e a desancoragem das expectativas de inflação para 2025")
+OTHER = "Seleção brasileira vence o Uruguai por dois a zero em jogo das eliminatórias disputado em Montevidéu"
+
+
+def item(url, title, summary=""):
+    return NewsItem(url=url, title=title, source_name="t", published_date=datetime.now(), summary=summary)
+
+
+def test_minhash_estimates_jaccard():
+    hasher = MinHasher(num_perm=256)
+    a, b = hasher.signature(STORY), hasher.signature(STORY + " segundo analistas")
+    assert hasher.similarity(a, a) == 1.0
+    assert hasher.similarity(a, b) > 0.7
+    assert hasher.similarity(a, hasher.signature(OTHER)) < 0.1
+    assert hasher.signature("") is None
+
+
+def test_syndicated_story_collapses_to_first_representative(session_factory):
+    detector = NearDuplicateDetector(session_factory=session_factory)
+    items = [
+        item("rss/1", "Copom mantém Selic", STORY),
+        item("gnews/1", "Copom mantém Selic em 10,5%", "<p>" + STORY + "</p>"),
+        item("rss/2", "Futebol", OTHER),
+        item("newsapi/1", "Selic", STORY.replace("terceira", "3ª")),
+    ]
+
+    kept = detector.collapse(items)
+
+    assert [i.url for i in kept] == ["rss/1", "rss/2"]
+    assert detector.last_collapsed == 2
+    assert all(isinstance(i.signature, np.ndarray) for i in items)
+
+
+def test_already_published_story_is_dropped(session_factory):
+    hasher = MinHasher()
+    db = session_factory()
+    db.add(PublishedArticle(hash="h1", title="x", source_signature=hasher.signature("Copom mantém Selic " + STORY).tobytes()))
+    db.commit()
+    db.close()
+
+    detector = NearDuplicateDetector(session_factory=session_factory)
+    kept = detector.collapse([item("a", "Copom mantém Selic", STORY), item("b", "Futebol", OTHER)])
+    assert [i.url for i in kept] == ["b"]
+
+    # Publicação nova entra no índice sem recarregar do banco
+    detector.add("h2", kept[0].signature)
+    assert detector.collapse([item("c", "Futebol", OTHER)]) == []
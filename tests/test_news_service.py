@@ -0,0 +1,143 @@
+import time
+import threading
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from src.providers.base_provider import BaseNewsProvider, FetchTicket, NewsItem
+from src.services.news_service import NewsService
+
+
+class FakeProvider(BaseNewsProvider):
+    def __init__(self, name, urls, delay=0.0, fail=False):
+        self._name = name
+        self.urls = urls
+        self.delay = delay
+        self.fail = fail
+
+    @property
+    def provider_name(self) -> str:
+        return self._name
+
+    def fetch(self, limit: int = 5):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("boom")
+        return [NewsItem(url=u, title=u, source_name=self._name, published_date=datetime.now()) for u in self.urls]
+
+
+class CancellableProvider(FakeProvider):
+    """Baixa por `delay` s, grava o estado (se o ticket permitir) por `save_delay` s e devolve os itens."""
+    cancellable = True
+
+    def __init__(self, name, urls, delay=0.0, save_delay=0.0):
+        super().__init__(name, urls, delay=delay)
+        self.save_delay = save_delay
+        self.saved = self.delivered = None
+        self.finished = threading.Event()
+
+    def fetch(self, limit: int = 5, ticket: FetchTicket = None):
+        try:
+            time.sleep(self.delay)
+            self.saved = ticket.commit()
+            if not self.saved:
+                return []
+            time.sleep(self.save_delay)
+            self.delivered = ticket.deliver()
+            return [NewsItem(url=u, title=u, source_name=self._name, published_date=datetime.now())
+                    for u in self.urls]
+        finally:
+            self.finished.set()
+
+
+@pytest.fixture
+def service():
+    with patch('src.services.news_service.RSSProvider'), \
+         patch('src.services.news_service.GNewsProvider'), \
+         patch('src.services.news_service.CurrentsProvider'), \
+         patch('src.services.news_service.NewsAPIProvider'), \
+         patch('src.services.news_service.settings_cache') as mock_cache:
+        mock_cache.snapshot.return_value = {}
+        svc = NewsService()
+        svc.providers = [
+            FakeProvider('rss', ['a', 'b'], delay=0.05),
+            FakeProvider('gnews', ['b', 'c']),
+            FakeProvider('currents', [], fail=True),
+            FakeProvider('newsapi', ['c', 'd'], delay=0.01),
+        ]
+        svc.failure_counts = {p.provider_name: 0 for p in svc.providers}
+        yield svc
+
+
+def test_concurrent_matches_sequential_order_and_dedup(service):
+    sequential = [i.url for i in service.fetch_all(3, concurrent=False)]
+    concurrent = [i.url for i in service.fetch_all(3, concurrent=True)]
+
+    assert sequential == ['a', 'b', 'c', 'd']
+    assert concurrent == sequential
+
+    stats = service.get_stats()
+    assert stats['currents']['status'] == 'error'
+    assert stats['currents']['failures'] == 2
+    assert stats['rss']['items'] == 2
+
+
+def test_slow_provider_is_dropped_after_deadline(service):
+    from src.config.settings import settings
+    service.providers[1].delay = 2.0
+
+    with patch.object(settings, 'NEWS_PROVIDER_TIMEOUT', 0.3):
+        start = time.monotonic()
+        urls = [i.url for i in service.fetch_all(3, concurrent=True)]
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 1.5
+    assert urls == ['a', 'b', 'c', 'd']
+    stats = service.get_stats()
+    assert stats['gnews']['status'] == 'timeout'
+    assert stats['gnews']['failures'] == 1
+
+
+def test_late_cancellable_provider_does_not_persist_state(service):
+    from src.config.settings import settings
+    rss = CancellableProvider('rss', ['a', 'b'], delay=0.8)
+    service.providers[0] = rss
+
+    with patch.object(settings, 'NEWS_PROVIDER_TIMEOUT', 0.3):
+        urls = [i.url for i in service.fetch_all(3, concurrent=True)]
+
+    assert urls == ['b', 'c', 'd']
+    assert service.get_stats()['rss']['status'] == 'timeout'
+    # O download termina depois, mas o ticket já foi abandonado: nada é gravado
+    assert rss.finished.wait(2) and rss.saved is False
+
+
+def test_committed_provider_is_awaited_past_the_deadline(service):
+    from src.config.settings import settings
+    rss = CancellableProvider('rss', ['a', 'b'], delay=0.1, save_delay=0.5)
+    service.providers[0] = rss
+
+    with patch.object(settings, 'NEWS_PROVIDER_TIMEOUT', 0.3):
+        urls = [i.url for i in service.fetch_all(3, concurrent=True)]
+
+    # Estado já gravado quando o prazo estourou: os itens não podem ser descartados
+    assert rss.saved is True
+    assert urls == ['a', 'b', 'c', 'd']
+    stats = service.get_stats()
+    assert stats['rss']['status'] == 'ok' and stats['rss']['failures'] == 0
+
+
+def test_hanging_committed_provider_only_gets_the_grace_period(service):
+    from src.config.settings import settings
+    rss = CancellableProvider('rss', ['a', 'b'], delay=0.1, save_delay=1.5)
+    service.providers[0] = rss
+
+    with patch.object(settings, 'NEWS_PROVIDER_TIMEOUT', 0.3), patch.object(settings, 'NEWS_COMMIT_GRACE', 0.2):
+        start = time.monotonic()
+        urls = [i.url for i in service.fetch_all(3, concurrent=True)]
+        elapsed = time.monotonic() - start
+
+    assert elapsed < 1.0
+    assert urls == ['b', 'c', 'd']
+    assert service.get_stats()['rss']['status'] == 'timeout'
+    # O provedor terminou depois: sabe que ninguém mais espera e guarda os itens para o próximo fetch
+    assert rss.finished.wait(3) and rss.saved is True and rss.delivered is False
@@ -0,0 +1,85 @@
+import threading
+import time
+from src.models.schema import PublishedArticle
+from src.services.originality import OriginalityIndex
+
+TOPICS = ["economia", "futebol", "tecnologia", "clima", "saude", "educacao", "politica", "cinema"]
+
+
+def article(i):
+    topic = TOPICS[i % len(TOPICS)]
+    return " ".join(f"{topic}{i}_{w}" for w in range(80)) + f" texto sobre {topic}"
+
+
+def test_scores_against_whole_history_and_backfills_sketches(session_factory):
+    db = session_factory()
+    db.add_all([PublishedArticle(hash=f"h{i}", full_content=article(i)) for i in range(300)])
+    db.commit()
+    db.close()
+
+    index = OriginalityIndex(session_factory=session_factory)
+    sim, closest = index.max_similarity(article(7))
+
+    assert len(index) == 300
+    assert sim == 1.0 and closest == "h7"
+    assert index.max_similarity("algo completamente inédito e diferente")[0] < 0.2
+
+    db = session_factory()
+    assert db.query(PublishedArticle).filter(PublishedArticle.content_sketch.is_(None)).execution_options(full_scan_ok=True).count() == 0
+    db.close()
+
+
+def test_new_publications_are_appended_in_memory(session_factory):
+    index = OriginalityIndex(session_factory=session_factory)
+    assert index.max_similarity(article(1)) == (0.0, None)
+
+    for i in range(1500):  # força o crescimento da matriz
+        index.add(f"n{i}", index.sketch(article(i)))
+
+    sim, closest = index.max_similarity(article(1234))
+    assert len(index) == 1500
+    assert closest == "n1234" and sim == 1.0
+
+
+def test_concurrent_first_calls_load_history_once(session_factory, monkeypatch):
+    db = session_factory()
+    db.add_all([PublishedArticle(hash=f"h{i}", full_content=article(i)) for i in range(50)])
+    db.commit()
+    db.close()
+
+    index = OriginalityIndex(session_factory=session_factory)
+    loads = []
+    real_load = index.load
+    monkeypatch.setattr(index, 'load', lambda: (loads.append(1), time.sleep(0.05), real_load()))
+    start = threading.Barrier(4)
+
+    def worker():
+        start.wait()
+        assert index.max_similarity(article(3))[1] == "h3"
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert len(loads) == 1 and len(index) == 50
+
+
+def test_sketches_added_while_loading_are_kept(session_factory, monkeypatch):
+    db = session_factory()
+    db.add_all([PublishedArticle(hash=f"h{i}", full_content=article(i)) for i in range(20)])
+    db.commit()
+    db.close()
+
+    index = OriginalityIndex(session_factory=session_factory)
+    read_history = index._read_history
+
+    def publish_during_read():
+        result = read_history()
+        index.add("novo", index.sketch(article(99)))  # publicado enquanto o histórico era lido
+        index.add("h5", index.sketch(article(5)))  # já veio do banco: não duplica
+        return result
+
+    monkeypatch.setattr(index, '_read_history', publish_during_read)
+    index.load()
+
+    assert len(index) == 21
+    assert index.max_similarity(article(99)) == (1.0, "novo")
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from src.config.query_audit import QueryPlanAuditor
+from src.models.schema import CachedContent, Message, PendingArticle, PublishedArticle, RSSFeed, SystemSettings
+
+
+def _plan(db_engine, stmt):
+    compiled = stmt.compile(dialect=db_engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    with db_engine.connect() as conn:
+        return ' | '.join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params))
+
+
+@pytest.mark.parametrize('stmt, index', [
+    (select(PendingArticle).where(PendingArticle.status == 'APPROVED').order_by(PendingArticle.created_at),
+     'ix_pending_articles_status_created'),
+    (select(Message).where(Message.thread_id == 1).order_by(Message.timestamp),
+     'ix_messages_thread_timestamp'),
+    (select(PublishedArticle.title).where(PublishedArticle.published_date >= datetime.now() - timedelta(days=7))
+     .order_by(PublishedArticle.published_date.desc()),
+     'ix_published_articles_published_date'),
+    (select(CachedContent.id).where(CachedContent.expires_at < datetime.now()),
+     'ix_cached_content_expires_at'),
+    (select(RSSFeed).where(RSSFeed.is_active == True),
+     'ix_rss_feeds_active_next_poll'),
+])
+def test_access_patterns_use_indexes(db_engine, stmt, index):
+    plan = _plan(db_engine, stmt)
+    assert index in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+@pytest.mark.allow_full_scan
+def test_auditor_flags_scans_of_large_tables_only(db_engine, session_factory):
+    db = session_factory()
+    with QueryPlanAuditor(target=db_engine) as audit:
+        db.query(PublishedArticle).filter(PublishedArticle.title == 'x').all()
+        db.query(SystemSettings).filter(SystemSettings.description == 'x').all()
+        db.query(PublishedArticle.hash).execution_options(full_scan_ok=True).all()
+        db.query(PublishedArticle).filter(PublishedArticle.hash == 'h').first()
+    db.close()
+
+    assert audit.queries == 3
+    assert [f.table for f in audit.findings] == ['published_articles']
+    assert 'title' in audit.findings[0].statement
+    assert 'full scan' in audit.report()
@@ -0,0 +1,67 @@
+import time
+from src.config.settings_cache import SettingsCache
+from src.models.schema import RateLimitLog, SystemSettings
+from src.services.rate_limiter import TokenBucket, RateLimiter, parse_limit
+
+
+def test_token_bucket_blocks_until_refill():
+    bucket = TokenBucket(capacity=2, refill_rate=20)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() > 0
+
+    start = time.monotonic()
+    assert bucket.acquire()
+    assert time.monotonic() - start >= 0.03
+    assert bucket.acquire(timeout=0.001) is False
+
+
+def test_local_limiter_ignores_unknown_services():
+    limiter = RateLimiter({'gemini': (1, 60)}, persistent=False)
+    assert limiter.try_acquire('gemini') == 0
+    assert limiter.try_acquire('gemini') > 0
+    assert limiter.acquire('unknown') is True
+
+
+def test_bucket_state_is_shared_through_database(session_factory):
+    # Duas instâncias simulam main.py e o dashboard usando o mesmo banco
+    engine_proc = RateLimiter({'gemini': (2, 60)}, session_factory=session_factory)
+    dashboard_proc = RateLimiter({'gemini': (2, 60)}, session_factory=session_factory)
+
+    assert engine_proc.try_acquire('gemini') == 0
+    assert dashboard_proc.try_acquire('gemini') == 0
+    assert engine_proc.try_acquire('gemini') > 0
+    assert dashboard_proc.acquire('gemini', timeout=0.05) is False
+
+    db = session_factory()
+    row = db.query(RateLimitLog).filter_by(service='gemini').one()
+    assert row.tokens < 1 and row.version == 2
+    db.close()
+
+    # Um "reinício" continua vendo o saldo esgotado
+    restarted = RateLimiter({'gemini': (2, 60)}, session_factory=session_factory)
+    assert restarted.try_acquire('gemini') > 0
+
+
+def test_limits_are_read_from_system_settings(session_factory):
+    db = session_factory()
+    db.add(SystemSettings(key='rate_limit_youtube', value='1/3600'))
+    db.commit()
+    db.close()
+
+    cache = SettingsCache(session_factory=session_factory)
+    limiter = RateLimiter(session_factory=session_factory, cache=cache)
+    assert limiter.limit_for('youtube') == (1, 3600.0)
+    assert limiter.try_acquire('youtube') == 0
+    assert limiter.try_acquire('youtube') > 3000
+    assert parse_limit('abc') is None and parse_limit('10/0') is None
+
+
+def test_limit_changes_arrive_through_settings_cache(session_factory):
+    cache = SettingsCache(session_factory=session_factory, check_interval=0)
+    limiter = RateLimiter({'gemini': (1, 3600)}, session_factory=session_factory, persistent=True, cache=cache)
+    assert limiter.limit_for('gemini') == (1, 3600)
+
+    cache.set('rate_limit_gemini', '50/60')
+    assert limiter.limit_for('gemini') == (50, 60.0)
+    assert 'gemini' in limiter.status() and limiter.status()['gemini']['limit'] == '50/60s'
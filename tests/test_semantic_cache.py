@@ -0,0 +1,142 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.models.schema import CachedContent, PendingArticle, PublishedArticle
+from src.services.cache_manager import CacheManager, CachePolicy
+from src.services.semantic_cache import HashedVectorizer, SemanticCache
+
+STORY = ("Banco Central eleva a taxa Selic para 11,25% ao ano",
+         "O Comitê de Política Monetária do Banco Central decidiu nesta quarta-feira elevar a taxa básica "
+         "de juros em 0,5 ponto percentual, citando a inflação de serviços e o mercado de trabalho aquecido.")
+EDITED = ("Banco Central eleva Selic para 11,25% ao ano",
+          "O Comitê de Política Monetária (Copom) do Banco Central decidiu nesta quarta-feira elevar a taxa básica "
+          "de juros em 0,5 ponto percentual, citando a inflação de serviços e o mercado de trabalho aquecido.")
+OTHER = ("Seleção brasileira vence o Uruguai nas eliminatórias",
+         "Com gols no segundo tempo, a seleção venceu por 2 a 0 em Montevidéu e subiu para a terceira posição.")
+
+
+def test_vectors_are_normalised_and_order_stable():
+    v = HashedVectorizer(dims=512)
+    a, b = v.vector(' '.join(STORY)), v.vector(' '.join(EDITED))
+    assert abs(float(a @ a) - 1.0) < 1e-5
+    assert float(a @ b) > 0.85
+    assert float(a @ v.vector(' '.join(OTHER))) < 0.3
+    assert v.vector('') is None
+
+
+def test_match_counts_hits_near_hits_and_misses(session_factory):
+    manager = CacheManager([CachePolicy('article', CachedContent, 'content_hash', timedelta(hours=1), 100)],
+                           session_factory=session_factory)
+    cache = SemanticCache(threshold=0.85, near=0.5, session_factory=session_factory, metrics=manager)
+    cache.add('k1', SemanticCache.input_text(*STORY))
+
+    assert cache.match(SemanticCache.input_text(*EDITED))[0] == 'k1'
+    assert cache.match(SemanticCache.input_text(STORY[0], STORY[1][:90])) is None
+    assert cache.match(SemanticCache.input_text(*STORY), exclude='k1') is None
+    assert cache.match(SemanticCache.input_text(*OTHER)) is None
+
+    assert cache.stats == {'hits': 1, 'near_hits': 1, 'misses': 2}
+    manager.flush_metrics()
+    stats = manager.stats()['article']
+    assert (stats['semantic_hits'], stats['near_hits']) == (1, 1)
+
+
+def test_load_reads_valid_unexpired_inputs_and_discard_compacts(session_factory):
+    db = session_factory()
+    now = datetime.now()
+    db.add_all([
+        CachedContent(content_hash='live', input_title=STORY[0], input_content_snippet=STORY[1],
+                      expires_at=now + timedelta(hours=1), is_valid=True),
+        CachedContent(content_hash='old', input_title=OTHER[0], input_content_snippet=OTHER[1],
+                      expires_at=now - timedelta(hours=1), is_valid=True),
+        CachedContent(content_hash='legacy', input_title=OTHER[0], expires_at=now + timedelta(hours=1), is_valid=True),
+    ])
+    db.commit()
+    db.close()
+
+    cache = SemanticCache(session_factory=session_factory)
+    cache.load()
+    assert len(cache) == 1
+    assert cache.nearest(SemanticCache.input_text(*EDITED))[0] == 'live'
+
+    cache.add('other', SemanticCache.input_text(*OTHER))
+    cache.discard('live')
+    assert len(cache) == 1
+    assert cache.nearest(SemanticCache.input_text(*OTHER))[0] == 'other'
+
+
+@pytest.mark.parametrize('twin, skipped', [
+    (lambda: PublishedArticle(hash='h1', content_hash='k1'), True),
+    (lambda: PendingArticle(content_hash='k1', status='PENDING'), True),
+    (lambda: PendingArticle(content_hash='k1', status='APPROVED'), True),
+    (lambda: PendingArticle(content_hash='k1', status='REJECTED'), False),
+    (lambda: PendingArticle(content_hash='k1', status='FAILED'), False),
+    (None, False),  # gerado, mas nunca chegou a ser persistido
+])
+def test_semantic_hit_is_skipped_only_while_its_twin_is_published_or_queued(session_factory, monkeypatch, twin, skipped):
+    from src.services import ai_service as ai_module
+
+    if twin:
+        db = session_factory()
+        db.add(twin())
+        db.commit()
+        db.close()
+    cache = SemanticCache(session_factory=session_factory)
+    cache.add('k1', SemanticCache.input_text(*STORY))
+    monkeypatch.setattr(ai_module, 'semantic_cache', cache)
+    monkeypatch.setattr(ai_module, 'get_read_db', session_factory)
+    body = '{"titulo": "Selic sobe", "conteudo_completo": "<p>texto</p>"}'
+    monkeypatch.setattr(ai_module.article_cache, 'get',
+                        lambda key: {'cached_result': body, 'ai_provider': 'gemini'} if key == 'k1' else None)
+    service = ai_module.AIService.__new__(ai_module.AIService)
+    service._check_double_layer_originality = MagicMock(return_value=0.8)
+    generated = {'cached_result': '{"titulo": "novo"}'}
+    service._generate_article = MagicMock(return_value=generated)
+
+    entry = service._semantic_or_generate(SimpleNamespace(title=EDITED[0], summary=EDITED[1]), 'k2')
+
+    service._generate_article.assert_not_called()
+    if skipped:
+        assert entry is None
+        service._check_double_layer_originality.assert_not_called()
+    else:
+        # Texto de um gêmeo rejeitado/não publicado é reaproveitado, checado de novo contra fonte e histórico
+        assert entry['cached_result'] == body and entry['prompt_id'] == 'semantic:k1'
+        service._check_double_layer_originality.assert_called_once_with(EDITED[1], '<p>texto</p>')
+
+    assert service._semantic_or_generate(SimpleNamespace(title=OTHER[0], summary=OTHER[1]), 'k3') is generated
+    assert cache.nearest(SemanticCache.input_text(*OTHER))[0] == 'k3'
+
+
+def test_reused_body_failing_originality_is_dropped(session_factory, monkeypatch):
+    from src.services import ai_service as ai_module
+
+    cache = SemanticCache(session_factory=session_factory)
+    cache.add('k1', SemanticCache.input_text(*STORY))
+    monkeypatch.setattr(ai_module, 'semantic_cache', cache)
+    monkeypatch.setattr(ai_module, 'get_read_db', session_factory)
+    monkeypatch.setattr(ai_module.article_cache, 'get',
+                        lambda key: {'cached_result': '{"conteudo_completo": "x"}'} if key == 'k1' else None)
+    service = ai_module.AIService.__new__(ai_module.AIService)
+    service._check_double_layer_originality = MagicMock(return_value=0.1)
+    service._generate_article = MagicMock()
+
+    assert service._semantic_or_generate(SimpleNamespace(title=EDITED[0], summary=EDITED[1]), 'k2') is None
+    service._generate_article.assert_not_called()
+
+
+def test_concurrent_first_lookups_load_once(session_factory, monkeypatch):
+    cache = SemanticCache(session_factory=session_factory)
+    loads = []
+    real_load = cache.load
+    monkeypatch.setattr(cache, 'load', lambda: (loads.append(1), time.sleep(0.05), real_load()))
+
+    threads = [threading.Thread(target=cache.nearest, args=(SemanticCache.input_text(*STORY),)) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert loads == [1] and cache.loaded
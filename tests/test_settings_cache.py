@@ -0,0 +1,71 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.config.settings_cache import SettingsCache, VERSION_KEY
+from src.models.schema import SystemSettings
+
+
+def test_typed_reads_and_defaults(session_factory):
+    db = session_factory()
+    db.add_all([SystemSettings(key='cycle_interval', value='45'),
+                SystemSettings(key='enable_gnews', value='False')])
+    db.commit()
+    db.close()
+
+    cache = SettingsCache(session_factory)
+    assert cache.get_int('cycle_interval', 120) == 45
+    assert cache.get_bool('enable_gnews', True) is False
+    assert cache.get_str('wp_publish_mode', 'publish') == 'publish'
+    assert cache.get_int('missing', 7) == 7
+
+
+def test_set_bumps_version_and_other_instances_reload(session_factory):
+    writer = SettingsCache(session_factory)
+    reader = SettingsCache(session_factory, check_interval=0)
+    assert reader.get('ai_model_mode') is None
+
+    writer.set('ai_model_mode', 'flash')
+    writer.set('ai_model_mode', 'pro')
+
+    db = session_factory()
+    assert db.query(SystemSettings.value).filter_by(key=VERSION_KEY).scalar() == '2'
+    db.close()
+
+    assert reader.get('ai_model_mode') == 'pro'
+    assert VERSION_KEY not in reader.snapshot()
+
+
+def test_reader_skips_reload_within_check_interval(session_factory):
+    writer = SettingsCache(session_factory)
+    reader = SettingsCache(session_factory, check_interval=3600)
+    reader.refresh()
+
+    writer.set('cycle_interval', '30')
+    assert reader.get('cycle_interval') is None
+
+    reader.refresh(force=True)
+    assert reader.get('cycle_interval') == '30'
+
+
+def test_subscribers_notified_on_change(session_factory):
+    writer = SettingsCache(session_factory)
+    reader = SettingsCache(session_factory, check_interval=0)
+    events = []
+    reader.subscribe(lambda key, old, new: events.append((key, old, new)), keys=['cycle_interval'])
+    reader.refresh()
+
+    writer.set('cycle_interval', '60')
+    writer.set('wp_publish_mode', 'draft')
+    assert reader.refresh() is True
+    assert events == [('cycle_interval', None, '60')]
+
+    local = []
+    writer.subscribe(lambda key, old, new: local.append((key, old, new)))
+    writer.set('cycle_interval', '90')
+    assert local == [('cycle_interval', '60', '90')]
+
+
+def test_missing_table_falls_back_to_defaults(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    cache = SettingsCache(sessionmaker(bind=engine))
+    assert cache.get_str('ai_model_mode', 'pro') == 'pro'
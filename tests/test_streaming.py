@@ -0,0 +1,97 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services.ai.streaming import IncrementalJSONParser, StreamFormatError, parse_stream
+from src.services.ai_service import ARTICLE_REQUIRED, ARTICLE_SCHEMA, AIService
+
+ARTICLE = {
+    'titulo': 'Selic sobe para 11,25% — o que muda {agora}',
+    'palavras_chave': ['juros', 'copom'],
+    'meta_description': 'Entenda a "alta" da Selic',
+    'categoria': 'Business',
+    'qualidade_score': 90,
+    'originalidade_score': '95',
+    'conteudo_completo': '<p>Texto com \\"escape\\" e } chaves ]</p>',
+}
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize('size', [1, 7, 1000])
+def test_fields_arrive_in_order_for_any_chunking(size):
+    text = '```json\n' + json.dumps(ARTICLE, ensure_ascii=False, indent=2) + '\n```'
+    seen = []
+    result = parse_stream(_chunks(text, size), ARTICLE_SCHEMA, ARTICLE_REQUIRED, lambda k, v: seen.append(k))
+
+    assert result == ARTICLE
+    assert seen == list(ARTICLE)
+
+
+def test_title_is_delivered_before_the_body_arrives():
+    parser = IncrementalJSONParser(ARTICLE_SCHEMA, on_field=lambda k, v: None)
+    parser.feed('{"titulo": "Primeiro", "conteudo_completo": "<p>ainda escre')
+    assert parser.fields == {'titulo': 'Primeiro'}
+    assert not parser.done
+
+
+def _recording(chunks, consumed):
+    for chunk in chunks:
+        consumed.append(chunk)
+        yield chunk
+
+
+@pytest.mark.parametrize('text', [
+    'Claro! Aqui está o artigo que você pediu: {"titulo": "x"}',
+    '{"titulo": ["lista", "errada"], "conteudo_completo": "..."}',
+    '{"titulo": "x" "conteudo_completo": "..."}',
+])
+def test_malformed_output_aborts_early(text):
+    consumed = []
+    chunks = _chunks(text + ' ' + 'x' * 5000, 10)
+    with pytest.raises(StreamFormatError):
+        parse_stream(_recording(chunks, consumed), ARTICLE_SCHEMA, ARTICLE_REQUIRED)
+    assert len(consumed) < 8
+
+
+def test_missing_required_field_and_truncated_output_fail():
+    with pytest.raises(StreamFormatError, match='conteudo_completo'):
+        parse_stream(['{"titulo": "x"}'], ARTICLE_SCHEMA, ARTICLE_REQUIRED)
+    with pytest.raises(StreamFormatError, match='incompleto'):
+        parse_stream(['{"titulo": "x", "conteudo_completo": "<p>cort'], ARTICLE_SCHEMA, ARTICLE_REQUIRED)
+
+
+def test_stream_stops_after_closing_brace():
+    consumed = []
+    parse_stream(_recording(['{"titulo": "x", ', '"conteudo_completo": "y"}', '\n```', 'lixo'], consumed),
+                 ARTICLE_SCHEMA, ARTICLE_REQUIRED)
+    assert len(consumed) == 2
+
+
+def test_ai_service_regenerates_after_format_error():
+    service = AIService.__new__(AIService)
+    client = MagicMock()
+    client.stream.side_effect = [
+        iter(['Aqui está: ', '{"titulo": "x"}']),
+        iter(['{"titulo": "ok", ', '"conteudo_completo": "<p>corpo</p>"}']),
+    ]
+    assert service._stream_json('prompt', client=client)['titulo'] == 'ok'
+    assert client.stream.call_count == 2
+
+
+def test_abandoned_attempt_does_not_trigger_early_fields():
+    service = AIService.__new__(AIService)
+    client = MagicMock()
+    client.stream.side_effect = [
+        # Título fecha, mas `palavras_chave` chega com o tipo errado: tentativa abortada
+        iter(['{"titulo": "Descartado", "palavras_chave": "juros"']),
+        iter([json.dumps(ARTICLE)]),
+    ]
+    seen = []
+    result = service._stream_json('prompt', on_field=lambda k, v: seen.append(k), client=client)
+
+    assert result == ARTICLE and client.stream.call_count == 2
+    assert seen == list(ARTICLE)  # nada da primeira tentativa
@@ -0,0 +1,126 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+from src.models.schema import CachedContent
+from src.services.cache_manager import CacheManager, CachePolicy
+from src.services.tiered_cache import TieredCache
+
+
+@pytest.fixture
+def manager(session_factory):
+    policy = CachePolicy('article', CachedContent, 'content_hash', timedelta(hours=1), 100, valid_column='is_valid')
+    return CacheManager([policy], session_factory=session_factory)
+
+
+def _row(manager, key):
+    db = manager.session_factory()
+    try:
+        return db.query(CachedContent).filter(CachedContent.content_hash == key).first()
+    finally:
+        db.close()
+
+
+def test_memory_tier_serves_without_touching_the_database(db_engine, manager):
+    cache = TieredCache('article', manager)
+    manager.store('article', 'k1', cached_result='{}', input_title='t')
+
+    assert cache.get('k1')['cached_result'] == '{}'
+    queries = []
+    event.listen(db_engine, 'before_cursor_execute', lambda *a: queries.append(a[2]))
+    assert cache.get('k1')['cached_result'] == '{}'
+    cache.flush()
+
+    assert all(q.lstrip().upper().startswith('UPDATE') for q in queries)
+    assert cache.stats['table_hits'] == 1 and cache.stats['memory_hits'] == 1
+    assert _row(manager, 'k1').hit_count == 2
+
+
+def test_invalidated_entries_leave_the_memory_tier(manager):
+    cache = TieredCache('article', manager)
+    manager.store('article', 'k1', cached_result='{}', input_title='t')
+    manager.store('article', 'k2', cached_result='{}', input_title='t')
+    assert cache.get('k1') and cache.get('k2')
+
+    cache.invalidate('k1')  # neste processo: sai da memória na hora
+    assert cache.get('k1') is None
+
+    manager.invalidate('article', 'k2')  # outro processo: o lote de hits percebe
+    assert cache.get('k2') is not None
+    cache.flush()
+    assert cache.get('k2') is None and len(cache) == 0
+
+
+def test_concurrent_misses_compute_once(manager):
+    cache = TieredCache('article', manager)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'cached_result': '{"titulo": "x"}', 'input_title': 'x'}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', compute))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8 and all(r['cached_result'] == '{"titulo": "x"}' for r in results)
+    assert _row(manager, 'k') is not None
+
+
+def test_errors_reach_waiting_callers_and_none_is_not_cached(manager):
+    cache = TieredCache('article', manager)
+    started = threading.Event()
+
+    def boom():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError('quota')
+
+    errors = []
+
+    def follower():
+        started.wait()
+        try:
+            cache.get_or_compute('k', lambda: {'cached_result': 'nunca'})
+        except RuntimeError as e:
+            errors.append(e)
+
+    t = threading.Thread(target=follower)
+    t.start()
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('k', boom)
+    t.join()
+    assert len(errors) == 1
+
+    assert cache.get_or_compute('k', lambda: None) is None
+    assert cache.get('k') is None and _row(manager, 'k') is None
+
+
+def test_write_behind_persists_on_flush(manager):
+    cache = TieredCache('article', manager, write_behind=True)
+    cache.put('k', {'cached_result': '{}', 'input_title': 't'})
+    assert cache.get('k')['cached_result'] == '{}'
+
+    cache.flush()
+    row = _row(manager, 'k')
+    assert row is not None and row.hit_count == 1 and row.expires_at is not None
+
+
+def test_memory_tier_is_bounded_lru(manager):
+    cache = TieredCache('article', manager, capacity=2)
+    for key in ('a', 'b'):
+        cache.put(key, {'cached_result': key})
+    cache.get('a')
+    cache.put('c', {'cached_result': 'c'})
+
+    assert len(cache) == 2
+    assert cache._memory_get('b') is None
+    assert cache._memory_get('a') is not None
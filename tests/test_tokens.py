@@ -0,0 +1,49 @@
+import random
+
+from src.services.ai.tokens import SOURCE_END, SOURCE_START, TokenEstimator, raw_token_count
+
+TEXT = "O Banco Central elevou a Selic para 11,25% ao ano, citando a inflação de serviços."
+
+
+def test_raw_count_is_word_and_digit_aware():
+    assert raw_token_count("o a de") == 3
+    assert raw_token_count("2026") == 4
+    assert raw_token_count("inconstitucionalmente") == 6
+    assert raw_token_count("") == 0
+
+
+def test_calibration_tracks_the_real_ratio_with_an_error_bound():
+    estimator = TokenEstimator(min_samples=5)
+    assert estimator.calibration() == (1.0, 0.25, 0)
+
+    rng = random.Random(3)
+    for _ in range(200):
+        estimator.observe(TEXT, round(raw_token_count(TEXT) * rng.uniform(1.15, 1.25)))
+    ratio, error, n = estimator.calibration()
+    assert n == 200 and 1.18 < ratio < 1.22 and 0 < error < 0.1
+
+    actual = raw_token_count(TEXT) * 1.25
+    assert estimator.estimate(TEXT) < actual <= estimator.upper_bound(TEXT)
+
+
+def test_fit_prompt_keeps_instructions_and_trims_the_source():
+    estimator = TokenEstimator()
+    head = "Instruções: reescreva o texto.\n" + SOURCE_START
+    tail = SOURCE_END + '\nSAÍDA JSON: {"titulo": "..."}'
+    prompt = head + " ".join(["notícia"] * 2000) + tail
+
+    fitted, truncated = estimator.fit_prompt(prompt, 300)
+    assert truncated
+    assert fitted.startswith(head) and fitted.endswith(tail)
+    assert estimator.upper_bound(fitted) <= 300
+    assert fitted.endswith("notícia [...]" + tail)
+
+    assert estimator.fit_prompt("curto", 300) == ("curto", False)
+
+
+def test_fit_prompt_without_markers_keeps_both_ends():
+    estimator = TokenEstimator()
+    prompt = "INÍCIO " + "meio " * 3000 + "FIM"
+    fitted, truncated = estimator.fit_prompt(prompt, 200)
+    assert truncated and fitted.startswith("INÍCIO") and fitted.endswith("FIM")
+    assert estimator.upper_bound(fitted) <= 200
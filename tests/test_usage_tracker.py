@@ -0,0 +1,124 @@
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.models.schema import APIUsageLog, PublishedArticle
+from src.services import usage_tracker as ut
+from src.services.usage_tracker import BUDGET_DEGRADE, BUDGET_OK, BUDGET_PAUSE, UsageTracker
+
+
+@pytest.fixture
+def clock():
+    now = {'value': datetime(2026, 3, 15, 10, 0)}
+    return now
+
+
+@pytest.fixture
+def tracker(session_factory, clock):
+    return UsageTracker(session_factory=session_factory, clock=lambda: clock['value'])
+
+
+def _budgets(daily=0.0, monthly=0.0, degrade_at=0.8):
+    return patch.object(UsageTracker, 'budgets', staticmethod(lambda: (daily, monthly, degrade_at)))
+
+
+def test_calls_roll_up_per_day_and_model(tracker, session_factory, clock):
+    tracker.record('gemini', 'gemini-pro', 1_000_000, 0)
+    tracker.record('gemini', 'gemini-pro', 0, 1_000_000)
+    tracker.record('gemini', 'gemini-1.5-flash', 2000, 1000)
+    clock['value'] += timedelta(days=1)
+    tracker.record('gemini', 'gemini-pro', 10, 10)
+
+    db = session_factory()
+    rows = db.query(APIUsageLog).filter(APIUsageLog.date >= datetime(2026, 3, 1),
+                                       APIUsageLog.model == 'gemini-pro').order_by(APIUsageLog.date).all()
+    db.close()
+    assert [(r.calls, r.prompt_tokens, r.response_tokens, r.tokens_used) for r in rows] == [
+        (2, 1_000_000, 1_000_000, 2_000_000), (1, 10, 10, 20)]
+    assert rows[0].cost_usd == pytest.approx(2.0)
+
+    with _budgets():
+        report = tracker.report(days=7)
+    assert len(report['daily']) == 3
+    pro = next(m for m in report['month']['by_model'] if m['model'] == 'gemini-pro')
+    assert pro['calls'] == 3
+    assert report['month']['cost_usd'] == pytest.approx(2.0 + 2000 * 0.075e-6 + 1000 * 0.30e-6 + 20 * 1e-6)
+
+
+def test_concurrent_records_are_not_lost(tracker, session_factory):
+    start = threading.Barrier(8)
+
+    def worker():
+        start.wait()
+        for _ in range(25):
+            tracker.record('gemini', 'gemini-1.5-flash', 10, 5)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    assert tracker.calls_today('gemini') == 200
+    db = session_factory()
+    row = db.query(APIUsageLog).filter(APIUsageLog.date == datetime(2026, 3, 15), APIUsageLog.service == 'gemini',
+                                       APIUsageLog.model == 'gemini-1.5-flash').one()
+    db.close()
+    assert (row.prompt_tokens, row.response_tokens, row.tokens_used) == (2000, 1000, 3000)
+
+
+def test_budget_degrades_then_pauses(tracker):
+    with _budgets(daily=1.0):
+        assert tracker.budget_state() == BUDGET_OK
+        tracker.record('gemini', 'gemini-pro', 1_000_000, 0)  # US$ 0.50
+        assert tracker.budget_state() == BUDGET_OK
+        tracker.record('gemini', 'gemini-pro', 0, 200_000)  # + US$ 0.30
+        assert tracker.budget_state() == BUDGET_DEGRADE
+        tracker.record('gemini', 'gemini-pro', 0, 200_000)
+        assert tracker.budget_state() == BUDGET_PAUSE
+
+
+def test_monthly_budget_counts_earlier_days(tracker, clock):
+    tracker.record('gemini', 'gemini-pro', 2_000_000, 0)
+    clock['value'] += timedelta(days=1)
+    with _budgets(daily=5.0, monthly=1.0):
+        assert tracker.spend() == (0.0, pytest.approx(1.0))
+        assert tracker.budget_state() == BUDGET_PAUSE
+
+
+def test_cost_per_published_article(tracker, session_factory, clock):
+    tracker.record('gemini', 'gemini-pro', 1_000_000, 1_000_000)
+    db = session_factory()
+    db.add_all([PublishedArticle(hash=f"h{i}", title='t', published_date=clock['value']) for i in range(4)])
+    db.commit()
+    db.close()
+
+    with _budgets():
+        report = tracker.report(days=30)
+    assert report['published_articles'] == 4
+    assert report['cost_per_article_usd'] == pytest.approx(0.5)
+
+
+def test_price_override_and_usage_metadata():
+    with patch.object(ut.settings_cache, 'get_str', return_value='1/2'):
+        assert UsageTracker().cost('qualquer', 1_000_000, 1_000_000) == pytest.approx(3.0)
+    meta = SimpleNamespace(prompt_token_count=120, candidates_token_count=450)
+    assert ut.usage_from_response(SimpleNamespace(usage_metadata=meta)) == (120, 450)
+    assert ut.usage_from_response(object()) == (0, 0)
+
+
+@patch('src.services.ai.clients.usage_tracker')
+@patch('src.services.ai.clients.rate_limiter')
+@patch('src.services.ai.clients.genai')
+def test_client_records_tokens_from_the_response(mock_genai, _limiter, mock_usage):
+    from src.services.ai.clients import GeminiProClient
+
+    meta = SimpleNamespace(prompt_token_count=30, candidates_token_count=5)
+    mock_model = MagicMock()
+    mock_model.generate_content.return_value = SimpleNamespace(text='ok', usage_metadata=meta)
+    mock_genai.GenerativeModel.return_value = mock_model
+
+    GeminiProClient(api_key='k').generate('prompt')
+    mock_usage.record.assert_called_once_with('gemini', 'gemini-pro', 30, 5)
+    mock_model.count_tokens.assert_not_called()
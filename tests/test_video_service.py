@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.models.schema import YouTubeCache
+from src.services.cache_manager import CacheManager, CachePolicy
+from src.services.tiered_cache import TieredCache
+from src.services.usage_tracker import UsageTracker
+from src.services.video_service import VideoService, normalize_query, query_key
+
+
+class FakeYouTube:
+    """Imita search().list() e new_batch_http_request() do googleapiclient."""
+
+    def __init__(self, videos):
+        self.videos = videos  # termo -> videoId
+        self.batches = []
+
+    def search(self):
+        return self
+
+    def list(self, q, **kwargs):
+        return q
+
+    def new_batch_http_request(self, callback):
+        fake = self
+
+        class Batch:
+            def __init__(self):
+                self.requests = []
+
+            def add(self, query, request_id):
+                self.requests.append((request_id, query))
+
+            def execute(self):
+                fake.batches.append([q for _, q in self.requests])
+                for request_id, query in self.requests:
+                    hits = [v for term, v in fake.videos.items() if term in query.split()]
+                    items = [{'id': {'videoId': hits[0]}, 'snippet': {'title': query}}] if hits else []
+                    callback(request_id, {'items': items}, None)
+
+        return Batch()
+
+
+@pytest.fixture
+def service(session_factory, monkeypatch):
+    monkeypatch.setattr('src.services.video_service.rate_limiter', MagicMock())
+
+    def build(videos, **kw):
+        manager = CacheManager([CachePolicy('video', YouTubeCache, 'query_hash', timedelta(days=14), 100)],
+                               session_factory=session_factory)
+        client = FakeYouTube(videos)
+        svc = VideoService(cache=TieredCache('video', manager), usage=UsageTracker(session_factory=session_factory),
+                           client=client, **kw)
+        return svc, client, manager
+    return build
+
+
+def test_normalization_ignores_case_stopwords_and_order():
+    a = normalize_query('Novo Gemini do Google: a IA que programa', ['Google', 'IA'])
+    b = normalize_query('gemini google ia programa', ['ia', 'GOOGLE'])
+    assert a == b == 'gemini google ia programa'
+    assert normalize_query('Ação na Bolsa') == normalize_query('acao bolsa')
+
+
+def test_cycle_lookups_share_one_batch_and_cache_negatives(service):
+    svc, client, manager = service({'gemini': 'vid1'}, window=0.2, batch_size=10)
+    results = {}
+
+    def lookup(title, kw):
+        results[title] = svc.find_video(title, kw)
+
+    threads = [threading.Thread(target=lookup, args=args) for args in
+               [('Gemini do Google', ['IA']), ('google gemini', ['ia']), ('Receita de bolo', None)]]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    # Duas variações da mesma busca + uma sem vídeo: um lote, duas requisições
+    assert [sorted(b) for b in client.batches] == [['bolo receita', 'gemini google ia']]
+    assert results['Gemini do Google'] == results['google gemini'] == 'https://www.youtube.com/watch?v=vid1'
+    assert results['Receita de bolo'] is None
+
+    # O resultado vazio fica cacheado com validade curta
+    negative = manager.lookup('video', query_key('bolo receita'))
+    assert negative['video_url'] is None
+    assert negative['expires_at'] < datetime.now() + timedelta(days=1)
+    assert svc.find_videos([('Receita de Bolo', None), ('Gemini Google', ['IA'])]) == [
+        None, 'https://www.youtube.com/watch?v=vid1']
+    assert len(client.batches) == 1
+
+
+def test_daily_quota_caps_searches(service, monkeypatch):
+    monkeypatch.setattr('src.config.settings.settings.YOUTUBE_DAILY_QUOTA', 300)
+    svc, client, _ = service({}, window=10, batch_size=10)
+
+    assert svc.find_videos([(f'assunto{i}', None) for i in range(5)]) == [None] * 5
+    assert len(client.batches[0]) == 3
+    assert svc.usage.calls_today('youtube') == 3
+    assert svc.quota_left() == 0
+
+    # Sem cota: nada é enviado nem cacheado como negativo
+    assert svc.find_videos([('assunto9', None)]) == [None]
+    assert len(client.batches) == 1
+
+
+def test_concurrent_batches_cannot_spend_the_same_quota(service, monkeypatch):
+    monkeypatch.setattr('src.config.settings.settings.YOUTUBE_DAILY_QUOTA', 300)
+    svc, client, _ = service({}, window=10, batch_size=10)
+    real_batch = client.new_batch_http_request
+
+    def slow_batch(callback):
+        batch = real_batch(callback)
+        execute = batch.execute
+        batch.execute = lambda: (time.sleep(0.1), execute())
+        return batch
+
+    client.new_batch_http_request = slow_batch
+    start = threading.Barrier(2)
+
+    def flush(prefix):
+        start.wait()
+        svc._run_batch(OrderedDict((f'{prefix}{i}', f'{prefix} {i}') for i in range(3)))
+
+    threads = [threading.Thread(target=flush, args=(p,)) for p in ('janela', 'tamanho')]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    assert sum(len(b) for b in client.batches) == 3
+    assert svc.usage.calls_today('youtube') == 3 and svc.quota_left() == 0
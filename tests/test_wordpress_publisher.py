@@ -0,0 +1,272 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pytest
+
+from src.models.schema import PendingArticle, PublishedArticle
+from src.services import content_engine as ce
+from src.services.wordpress_publisher import WordPressPublisher, WPPost, WPResult, post_slug
+
+
+class FakeWP:
+    """Estado do WordPress falso: posts, mídias, conexões e falhas injetadas."""
+
+    def __init__(self):
+        self.posts, self.media = [], []
+        self.connections = set()
+        self.auth = set()
+        self.lock = threading.Lock()
+        self.active = self.peak = 0
+        self.delay = 0.0
+        self.fail_after_create = 0  # próximos N POST /posts criam o post mas respondem 503
+
+
+class WPHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    wp: FakeWP = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _enter(self):
+        wp = self.wp
+        with wp.lock:
+            wp.connections.add(self.client_address)
+            wp.auth.add(self.headers.get('Authorization'))
+            wp.active += 1
+            wp.peak = max(wp.peak, wp.active)
+        time.sleep(wp.delay)
+
+    def _leave(self):
+        with self.wp.lock:
+            self.wp.active -= 1
+
+    def do_GET(self):
+        self._enter()
+        try:
+            url = urlparse(self.path)
+            slug = parse_qs(url.query).get('slug', [''])[0]
+            items = self.wp.posts if url.path.endswith('/posts') else self.wp.media
+            self._reply(200, [i for i in items if i['slug'] == slug])
+        finally:
+            self._leave()
+
+    def do_POST(self):
+        self._enter()
+        try:
+            wp, path = self.wp, urlparse(self.path).path
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if path.endswith('/media'):
+                filename = re.search(r'filename="([^"]+)"', self.headers['Content-Disposition']).group(1)
+                with wp.lock:
+                    item = {'id': 1000 + len(wp.media), 'slug': filename.rsplit('.', 1)[0], 'bytes': len(body)}
+                    wp.media.append(item)
+                return self._reply(201, item)
+            match = re.search(r'/posts/(\d+)$', path)
+            if match:
+                post = next(p for p in wp.posts if p['id'] == int(match.group(1)))
+                post.update(json.loads(body))
+                return self._reply(200, post)
+            payload = json.loads(body)
+            with wp.lock:
+                post = {**payload, 'id': len(wp.posts) + 1, 'link': f"http://wp.test/{payload['slug']}/"}
+                wp.posts.append(post)
+                fail = wp.fail_after_create > 0
+                wp.fail_after_create -= fail
+            if fail:
+                return self._reply(503, {'code': 'upstream_timeout'})
+            self._reply(201, post)
+        finally:
+            self._leave()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def wp_server():
+    wp = FakeWP()
+    handler = type('Handler', (WPHandler,), {'wp': wp})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield wp, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def _publisher(url, **kw):
+    return WordPressPublisher(url, 'editor', 'app pass', timeout=5, retry_base_delay=0.01, **kw)
+
+
+def test_publish_uploads_media_and_reuses_connection(wp_server, tmp_path):
+    wp, url = wp_server
+    image = tmp_path / 'img.webp'
+    image.write_bytes(b'RIFF....WEBP')
+    publisher = _publisher(url)
+
+    first = publisher.publish(WPPost(key='a' * 32, title='Olá, Mundo!', content='<p>x</p>', image_path=str(image)))
+    second = publisher.publish(WPPost(key='b' * 32, title='Outro', content='<p>y</p>'))
+
+    assert first.ok and first.created and first.url == 'http://wp.test/ola-mundo-aaaaaaaa/'
+    assert wp.posts[0]['featured_media'] == first.media_id == wp.media[0]['id']
+    assert wp.media[0]['slug'] == 's1m0n-' + 'a' * 32 and wp.media[0]['bytes'] == len(b'RIFF....WEBP')
+    assert second.ok and 'featured_media' not in wp.posts[1]
+    assert len(wp.connections) == 1  # keep-alive: uma conexão para todas as chamadas
+    assert len(wp.auth) == 1 and next(iter(wp.auth)).startswith('Basic ')
+
+
+def test_retry_after_lost_response_does_not_double_post(wp_server):
+    wp, url = wp_server
+    wp.fail_after_create = 1
+    publisher = _publisher(url)
+    post = WPPost(key='c' * 32, title='Notícia', content='<p>z</p>')
+
+    result = publisher.publish(post)
+
+    assert result.ok and not result.created
+    assert [p['slug'] for p in wp.posts] == [post_slug(post)]
+    # Publicar de novo o mesmo artigo também não duplica
+    assert publisher.publish(post).post_id == result.post_id and len(wp.posts) == 1
+
+
+def test_publish_many_caps_concurrency(wp_server):
+    wp, url = wp_server
+    wp.delay = 0.05
+    publisher = _publisher(url, pool_size=3)
+    posts = [WPPost(key=f'{i:032d}', title=f'Artigo {i}', content='<p/>') for i in range(9)]
+
+    results = publisher.publish_many(posts, concurrency=3)
+
+    assert [r.key for r in results] == [p.key for p in posts] and all(r.ok for r in results)
+    assert len(wp.posts) == 9 and wp.peak <= 3
+
+
+def test_engine_publishes_approved_pending_articles(wp_server, session_factory, monkeypatch):
+    wp, url = wp_server
+    monkeypatch.setattr(ce, 'get_db', session_factory)
+
+    db = session_factory()
+    for i, status in enumerate(['APPROVED', 'PENDING', 'APPROVED']):
+        db.add(PendingArticle(title=f'Artigo {i}', original_url=f'http://fonte/{i}', source_name='Fonte',
+                              content_json=json.dumps({'conteudo_completo': f'<p>{i}</p>'}), status=status))
+    db.commit()
+    db.close()
+
+    engine = ce.ContentEngine.__new__(ce.ContentEngine)
+    added = []
+    engine.dedup_index = SimpleNamespace(add=added.append)
+    engine.ai_service = SimpleNamespace(originality=SimpleNamespace(sketch=lambda text: None, add=lambda *a: None))
+    monkeypatch.setattr(ce.ContentEngine, 'publisher', _publisher(url))
+
+    assert engine.publish_approved() == 2
+    assert engine.publish_approved() == 0  # já publicados: nada a fazer
+
+    db = session_factory()
+    statuses = [s for (s,) in db.query(PendingArticle.status).order_by(PendingArticle.id).execution_options(
+        full_scan_ok=True)]
+    published = db.query(PublishedArticle).filter(PublishedArticle.hash.in_(added)).all()
+    db.close()
+    assert statuses == ['PUBLISHED', 'PENDING', 'PUBLISHED']
+    assert sorted(p.wordpress_url for p in published) == sorted(p['link'] for p in wp.posts)
+    assert len(wp.posts) == 2
+
+
+def _approval_queue(session_factory, monkeypatch, statuses, signature=None):
+    monkeypatch.setattr(ce, 'get_db', session_factory)
+    db = session_factory()
+    for i, status in enumerate(statuses):
+        db.add(PendingArticle(title=f'Artigo {i}', original_url=f'http://fonte/{i}', source_name='Fonte',
+                              content_json=json.dumps({'conteudo_completo': f'<p>{i}</p>'}), status=status,
+                              content_hash=f'{i:032x}',
+                              source_signature=signature.tobytes() if signature is not None else None))
+    db.commit()
+    db.close()
+
+
+def _statuses(factory):
+    db = factory()
+    try:
+        return [tuple(r) for r in db.query(PendingArticle.status, PendingArticle.publish_attempts).order_by(
+            PendingArticle.id).execution_options(full_scan_ok=True)]
+    finally:
+        db.close()
+
+
+def test_approved_article_carries_its_source_signature(wp_server, session_factory, monkeypatch):
+    _, url = wp_server
+    signature = np.arange(16, dtype=np.uint32)
+    _approval_queue(session_factory, monkeypatch, ['APPROVED'], signature)
+
+    engine = ce.ContentEngine.__new__(ce.ContentEngine)
+    near = []
+    engine.dedup_index = SimpleNamespace(add=lambda key: None)
+    engine.news_service = SimpleNamespace(near_duplicates=SimpleNamespace(add=lambda key, sig: near.append(sig)))
+    engine.ai_service = SimpleNamespace(originality=SimpleNamespace(sketch=lambda text: None, add=lambda *a: None))
+    monkeypatch.setattr(ce.ContentEngine, 'publisher', _publisher(url))
+
+    assert engine.publish_approved() == 1
+
+    db = session_factory()
+    stored, content_hash = db.query(PublishedArticle.source_signature, PublishedArticle.content_hash).execution_options(
+        full_scan_ok=True).one()
+    db.close()
+    # Entra no índice LSH como qualquer publicação automática
+    assert len(near) == 1 and np.array_equal(near[0], signature)
+    assert stored == signature.tobytes()
+    # O cache semântico reconhece o texto como já publicado pela entrada de cache
+    assert content_hash == f'{0:032x}'
+
+
+def test_failing_approved_article_leaves_the_queue_after_max_attempts(session_factory, monkeypatch):
+    _approval_queue(session_factory, monkeypatch, ['APPROVED'])
+    monkeypatch.setattr(ce.settings, 'WP_MAX_PUBLISH_ATTEMPTS', 3)
+    sent = []
+
+    def publish_many(posts, concurrency):
+        sent.extend(posts)
+        return [WPResult(key=p.key, ok=False, error='HTTP 400') for p in posts]
+
+    engine = ce.ContentEngine.__new__(ce.ContentEngine)
+    monkeypatch.setattr(ce.ContentEngine, 'publisher', SimpleNamespace(publish_many=publish_many))
+
+    for attempt in (1, 2):
+        assert engine.publish_approved() == 0
+        assert _statuses(session_factory) == [('APPROVED', attempt)]
+    assert engine.publish_approved() == 0
+    assert _statuses(session_factory) == [('FAILED', 3)]
+    assert engine.publish_approved() == 0 and len(sent) == 3  # não volta a ser tentado
+
+
+def test_dashboard_approves_and_rejects_pending_articles(session_factory, monkeypatch):
+    from src.interface import dashboard_app
+
+    _approval_queue(session_factory, monkeypatch, ['PENDING', 'PENDING', 'FAILED'])
+    monkeypatch.setattr(dashboard_app, 'get_db', session_factory)
+    client = dashboard_app.app.test_client()
+
+    def post(path, body):
+        return client.post(path, json=body, base_url='https://localhost')
+
+    assert post('/api/approve', {'id': 1, 'content': '<p>revisado</p>'}).get_json()['status'] == 'APPROVED'
+    assert post('/api/reject', {'id': 2}).get_json()['status'] == 'REJECTED'
+    assert post('/api/approve', {'id': 3}).status_code == 200  # FAILED aprovado de novo volta à fila
+    assert post('/api/approve', {'id': 2}).status_code == 409  # rejeitado não é publicado
+    assert post('/api/approve', {'id': 99}).status_code == 404
+    assert post('/api/approve', {'id': '1'}).status_code == 400
+
+    db = session_factory()
+    first = db.query(PendingArticle).filter(PendingArticle.id == 1).one()
+    content = json.loads(first.content_json)['conteudo_completo']
+    db.close()
+    assert content == '<p>revisado</p>'
+    assert _statuses(session_factory) == [('APPROVED', 0), ('REJECTED', 0), ('APPROVED', 0)]